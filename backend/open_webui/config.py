@@ -734,6 +734,26 @@ AZURE_STORAGE_ENDPOINT = os.environ.get("AZURE_STORAGE_ENDPOINT", None)
 AZURE_STORAGE_CONTAINER_NAME = os.environ.get("AZURE_STORAGE_CONTAINER_NAME", None)
 AZURE_STORAGE_KEY = os.environ.get("AZURE_STORAGE_KEY", None)
 
+# Local copies of files stored in S3/GCS/Azure are kept up to N MB in total
+try:
+    STORAGE_LOCAL_CACHE_MAX_SIZE = int(
+        os.environ.get("STORAGE_LOCAL_CACHE_MAX_SIZE", "5120")
+    )
+except Exception:
+    STORAGE_LOCAL_CACHE_MAX_SIZE = 5120
+
+# Serve file contents by redirecting to short-lived presigned S3/GCS/Azure URLs
+ENABLE_STORAGE_PRESIGNED_URLS = (
+    os.environ.get("ENABLE_STORAGE_PRESIGNED_URLS", "False").lower() == "true"
+)
+
+try:
+    STORAGE_PRESIGNED_URL_EXPIRY = int(
+        os.environ.get("STORAGE_PRESIGNED_URL_EXPIRY", "3600")
+    )
+except Exception:
+    STORAGE_PRESIGNED_URL_EXPIRY = 3600
+
 ####################################
 # File Upload DIR
 ####################################
@@ -1995,6 +2015,14 @@ ENABLE_RAG_HYBRID_SEARCH = PersistentConfig(
     os.environ.get("ENABLE_RAG_HYBRID_SEARCH", "").lower() == "true",
 )
 
+# Per-collection BM25 indexes used by hybrid search
+RAG_BM25_INDEX_DIR = os.environ.get("RAG_BM25_INDEX_DIR", f"{CACHE_DIR}/bm25")
+
+try:
+    RAG_BM25_INDEX_CACHE_SIZE = int(os.environ.get("RAG_BM25_INDEX_CACHE_SIZE", "64"))
+except Exception:
+    RAG_BM25_INDEX_CACHE_SIZE = 64
+
 RAG_FULL_CONTEXT = PersistentConfig(
     "RAG_FULL_CONTEXT",
     "rag.full_context",
@@ -2076,6 +2104,30 @@ RAG_EMBEDDING_PREFIX_FIELD_NAME = os.environ.get(
     "RAG_EMBEDDING_PREFIX_FIELD_NAME", None
 )
 
+# Cache of query embeddings, kept in memory and in Redis when configured
+try:
+    RAG_EMBEDDING_CACHE_SIZE = int(os.environ.get("RAG_EMBEDDING_CACHE_SIZE", "10000"))
+except Exception:
+    RAG_EMBEDDING_CACHE_SIZE = 10000
+
+try:
+    RAG_EMBEDDING_CACHE_TTL = int(os.environ.get("RAG_EMBEDDING_CACHE_TTL", "86400"))
+except Exception:
+    RAG_EMBEDDING_CACHE_TTL = 86400
+
+# Reuse the stored embeddings of identical chunks during ingestion
+ENABLE_RAG_CHUNK_EMBEDDING_STORE = (
+    os.environ.get("ENABLE_RAG_CHUNK_EMBEDDING_STORE", "True").lower() == "true"
+)
+
+# Stored chunk embeddings older than this are removed (seconds, 0 keeps them)
+try:
+    RAG_CHUNK_EMBEDDING_STORE_TTL = int(
+        os.environ.get("RAG_CHUNK_EMBEDDING_STORE_TTL", str(30 * 24 * 60 * 60))
+    )
+except Exception:
+    RAG_CHUNK_EMBEDDING_STORE_TTL = 30 * 24 * 60 * 60
+
 RAG_RERANKING_ENGINE = PersistentConfig(
     "RAG_RERANKING_ENGINE",
     "rag.reranking_engine",
@@ -2090,6 +2142,20 @@ RAG_RERANKING_MODEL = PersistentConfig(
 if RAG_RERANKING_MODEL.value != "":
     log.info(f"Reranking model set: {RAG_RERANKING_MODEL.value}")
 
+# Query/document pairs scored per reranking model call
+try:
+    RAG_RERANKING_BATCH_SIZE = int(os.environ.get("RAG_RERANKING_BATCH_SIZE", "32"))
+except Exception:
+    RAG_RERANKING_BATCH_SIZE = 32
+
+# (query, chunk) reranking scores kept per reranking model
+try:
+    RAG_RERANKING_SCORE_CACHE_SIZE = int(
+        os.environ.get("RAG_RERANKING_SCORE_CACHE_SIZE", "10000")
+    )
+except Exception:
+    RAG_RERANKING_SCORE_CACHE_SIZE = 10000
+
 
 RAG_RERANKING_MODEL_AUTO_UPDATE = (
     not OFFLINE_MODE
@@ -2760,6 +2826,18 @@ WHISPER_VAD_FILTER = PersistentConfig(
 
 WHISPER_LANGUAGE = os.getenv("WHISPER_LANGUAGE", "").lower() or None
 
+# Long recordings are transcribed in chunks of at most this many seconds,
+# sent to the STT engine by a pool of this many workers
+try:
+    AUDIO_STT_CHUNK_SECONDS = int(os.getenv("AUDIO_STT_CHUNK_SECONDS", "300"))
+except Exception:
+    AUDIO_STT_CHUNK_SECONDS = 300
+
+try:
+    AUDIO_STT_MAX_WORKERS = int(os.getenv("AUDIO_STT_MAX_WORKERS", "4"))
+except Exception:
+    AUDIO_STT_MAX_WORKERS = 4
+
 # Add Deepgram configuration
 DEEPGRAM_API_KEY = PersistentConfig(
     "DEEPGRAM_API_KEY",
@@ -2884,6 +2962,17 @@ AUDIO_TTS_AZURE_SPEECH_OUTPUT_FORMAT = PersistentConfig(
     ),
 )
 
+# Synthesized speech kept on disk, in MB and seconds (0 for no limit)
+try:
+    AUDIO_TTS_CACHE_MAX_SIZE = int(os.getenv("AUDIO_TTS_CACHE_MAX_SIZE", "1024"))
+except Exception:
+    AUDIO_TTS_CACHE_MAX_SIZE = 1024
+
+try:
+    AUDIO_TTS_CACHE_TTL = int(os.getenv("AUDIO_TTS_CACHE_TTL", str(30 * 24 * 60 * 60)))
+except Exception:
+    AUDIO_TTS_CACHE_TTL = 30 * 24 * 60 * 60
+
 
 ####################################
 # LDAP
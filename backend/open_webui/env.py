@@ -316,6 +316,27 @@ ENABLE_REALTIME_CHAT_SAVE = (
     os.environ.get("ENABLE_REALTIME_CHAT_SAVE", "False").lower() == "true"
 )
 
+# Streamed message writes are coalesced and flushed at most every N seconds,
+# 0 disables the buffer and writes every delta through to the database.
+CHAT_MESSAGE_WRITE_BUFFER_INTERVAL = os.environ.get(
+    "CHAT_MESSAGE_WRITE_BUFFER_INTERVAL", "1"
+)
+
+try:
+    CHAT_MESSAGE_WRITE_BUFFER_INTERVAL = float(CHAT_MESSAGE_WRITE_BUFFER_INTERVAL)
+except Exception:
+    CHAT_MESSAGE_WRITE_BUFFER_INTERVAL = 1.0
+
+# Number of buffered characters that forces a flush before the interval elapses
+CHAT_MESSAGE_WRITE_BUFFER_MAX_SIZE = os.environ.get(
+    "CHAT_MESSAGE_WRITE_BUFFER_MAX_SIZE", "4096"
+)
+
+try:
+    CHAT_MESSAGE_WRITE_BUFFER_MAX_SIZE = int(CHAT_MESSAGE_WRITE_BUFFER_MAX_SIZE)
+except Exception:
+    CHAT_MESSAGE_WRITE_BUFFER_MAX_SIZE = 4096
+
 ####################################
 # REDIS
 ####################################
@@ -405,6 +426,19 @@ WEBSOCKET_SENTINEL_HOSTS = os.environ.get("WEBSOCKET_SENTINEL_HOSTS", "")
 
 WEBSOCKET_SENTINEL_PORT = os.environ.get("WEBSOCKET_SENTINEL_PORT", "26379")
 
+# Merge consecutive chat:completion events of a message emitted within the
+# window (in milliseconds) into a single socket frame
+ENABLE_CHAT_EVENT_COALESCING = (
+    os.environ.get("ENABLE_CHAT_EVENT_COALESCING", "False").lower() == "true"
+)
+
+try:
+    CHAT_EVENT_COALESCING_WINDOW = int(
+        os.environ.get("CHAT_EVENT_COALESCING_WINDOW", "25")
+    )
+except Exception:
+    CHAT_EVENT_COALESCING_WINDOW = 25
+
 AIOHTTP_CLIENT_TIMEOUT = os.environ.get("AIOHTTP_CLIENT_TIMEOUT", "")
 
 if AIOHTTP_CLIENT_TIMEOUT == "":
@@ -453,6 +487,41 @@ AIOHTTP_CLIENT_SESSION_TOOL_SERVER_SSL = (
     os.environ.get("AIOHTTP_CLIENT_SESSION_TOOL_SERVER_SSL", "True").lower() == "true"
 )
 
+# Seconds between background refreshes of the tool servers' OpenAPI specs (0 disables)
+TOOL_SERVER_REFRESH_INTERVAL = os.environ.get("TOOL_SERVER_REFRESH_INTERVAL", "300")
+
+try:
+    TOOL_SERVER_REFRESH_INTERVAL = int(TOOL_SERVER_REFRESH_INTERVAL)
+except Exception:
+    TOOL_SERVER_REFRESH_INTERVAL = 300
+
+# Shared upstream sessions (OpenAI/Ollama), one connection pool per base URL
+try:
+    AIOHTTP_CLIENT_POOL_LIMIT = int(os.environ.get("AIOHTTP_CLIENT_POOL_LIMIT", "100"))
+except Exception:
+    AIOHTTP_CLIENT_POOL_LIMIT = 100
+
+try:
+    AIOHTTP_CLIENT_POOL_LIMIT_PER_HOST = int(
+        os.environ.get("AIOHTTP_CLIENT_POOL_LIMIT_PER_HOST", "0")
+    )
+except Exception:
+    AIOHTTP_CLIENT_POOL_LIMIT_PER_HOST = 0
+
+try:
+    AIOHTTP_CLIENT_POOL_KEEPALIVE_TIMEOUT = float(
+        os.environ.get("AIOHTTP_CLIENT_POOL_KEEPALIVE_TIMEOUT", "30")
+    )
+except Exception:
+    AIOHTTP_CLIENT_POOL_KEEPALIVE_TIMEOUT = 30.0
+
+try:
+    AIOHTTP_CLIENT_POOL_DNS_CACHE_TTL = int(
+        os.environ.get("AIOHTTP_CLIENT_POOL_DNS_CACHE_TTL", "300")
+    )
+except Exception:
+    AIOHTTP_CLIENT_POOL_DNS_CACHE_TTL = 300
+
 
 ####################################
 # SENTENCE TRANSFORMERS
@@ -566,3 +635,120 @@ EXTERNAL_PWA_MANIFEST_URL = os.environ.get("EXTERNAL_PWA_MANIFEST_URL")
 ####################################
 LITELLM_URL = os.environ.get("LITELLM_URL", "http://localhost:8000")
 LITELLM_MASTER_KEY = os.environ.get("LITELLM_MASTER_KEY", "")
+
+####################################
+# MODEL PRICING
+####################################
+
+# Price sheet loaded at startup, defaults to the last refreshed copy in DATA_DIR
+# and then to the sheet bundled with the package
+MODEL_PRICE_SHEET_PATH = os.environ.get(
+    "MODEL_PRICE_SHEET_PATH", f"{DATA_DIR}/model_prices.json"
+)
+
+# Remote price sheet (LiteLLM format), only fetched in the background; the
+# bundled sheet only covers common models. Set to "" to stay offline.
+MODEL_PRICE_SHEET_URL = os.environ.get(
+    "MODEL_PRICE_SHEET_URL",
+    "https://raw.githubusercontent.com/BerriAI/litellm/main/model_prices_and_context_window.json",
+)
+
+MODEL_PRICE_SHEET_REFRESH_INTERVAL = os.environ.get(
+    "MODEL_PRICE_SHEET_REFRESH_INTERVAL", "86400"
+)
+
+try:
+    MODEL_PRICE_SHEET_REFRESH_INTERVAL = int(MODEL_PRICE_SHEET_REFRESH_INTERVAL)
+except Exception:
+    MODEL_PRICE_SHEET_REFRESH_INTERVAL = 86400
+
+# Extra model aliases as JSON, e.g. {"my-gpt": "gpt-4o"}
+MODEL_PRICE_ALIASES = os.environ.get("MODEL_PRICE_ALIASES", "")
+
+try:
+    MODEL_PRICE_ALIASES = json.loads(MODEL_PRICE_ALIASES) if MODEL_PRICE_ALIASES else {}
+except Exception:
+    MODEL_PRICE_ALIASES = {}
+
+# Price of the models missing from the price sheet as JSON, e.g.
+# {"input_cost_per_token": 1e-6, "output_cost_per_token": 2e-6}. Unset, requests
+# for them are rejected.
+MODEL_PRICE_DEFAULT = os.environ.get("MODEL_PRICE_DEFAULT", "")
+
+try:
+    MODEL_PRICE_DEFAULT = (
+        json.loads(MODEL_PRICE_DEFAULT) if MODEL_PRICE_DEFAULT else None
+    )
+except Exception:
+    MODEL_PRICE_DEFAULT = None
+
+####################################
+# CREDIT LEDGER
+####################################
+
+# Debits are applied to an in-memory (or Redis, if REDIS_URL is set) balance
+# and settled to the database in batches every N seconds
+CREDIT_LEDGER_SETTLE_INTERVAL = os.environ.get("CREDIT_LEDGER_SETTLE_INTERVAL", "5")
+
+try:
+    CREDIT_LEDGER_SETTLE_INTERVAL = float(CREDIT_LEDGER_SETTLE_INTERVAL)
+except Exception:
+    CREDIT_LEDGER_SETTLE_INTERVAL = 5.0
+
+CREDIT_LEDGER_SETTLE_BATCH_SIZE = os.environ.get(
+    "CREDIT_LEDGER_SETTLE_BATCH_SIZE", "500"
+)
+
+try:
+    CREDIT_LEDGER_SETTLE_BATCH_SIZE = int(CREDIT_LEDGER_SETTLE_BATCH_SIZE)
+except Exception:
+    CREDIT_LEDGER_SETTLE_BATCH_SIZE = 500
+
+# How long plan/status/quota of a wallet are cached before being re-read
+CREDIT_LEDGER_ACCOUNT_TTL = os.environ.get("CREDIT_LEDGER_ACCOUNT_TTL", "60")
+
+try:
+    CREDIT_LEDGER_ACCOUNT_TTL = int(CREDIT_LEDGER_ACCOUNT_TTL)
+except Exception:
+    CREDIT_LEDGER_ACCOUNT_TTL = 60
+
+####################################
+# MODEL CATALOG
+####################################
+
+# Model lists of each OpenAI/Ollama connection are cached for N seconds
+MODEL_CATALOG_CACHE_TTL = os.environ.get("MODEL_CATALOG_CACHE_TTL", "60")
+
+try:
+    MODEL_CATALOG_CACHE_TTL = int(MODEL_CATALOG_CACHE_TTL)
+except Exception:
+    MODEL_CATALOG_CACHE_TTL = 60
+
+# Past the TTL, cached model lists are still served for up to N seconds while
+# they are refreshed in the background
+MODEL_CATALOG_CACHE_STALE_TTL = os.environ.get("MODEL_CATALOG_CACHE_STALE_TTL", "3600")
+
+try:
+    MODEL_CATALOG_CACHE_STALE_TTL = int(MODEL_CATALOG_CACHE_STALE_TTL)
+except Exception:
+    MODEL_CATALOG_CACHE_STALE_TTL = 3600
+
+####################################
+# INGESTION JOBS
+####################################
+
+# Files of a background ingestion job loaded/embedded concurrently
+INGESTION_JOB_CONCURRENCY = os.environ.get("INGESTION_JOB_CONCURRENCY", "4")
+
+try:
+    INGESTION_JOB_CONCURRENCY = max(int(INGESTION_JOB_CONCURRENCY), 1)
+except Exception:
+    INGESTION_JOB_CONCURRENCY = 4
+
+# A running job not checkpointed for N seconds (e.g. its worker died) is resumed
+INGESTION_JOB_STALE_TIMEOUT = os.environ.get("INGESTION_JOB_STALE_TIMEOUT", "120")
+
+try:
+    INGESTION_JOB_STALE_TIMEOUT = int(INGESTION_JOB_STALE_TIMEOUT)
+except Exception:
+    INGESTION_JOB_STALE_TIMEOUT = 120
@@ -51,9 +51,20 @@ from starlette.responses import Response, StreamingResponse
 from open_webui.utils import logger
 from open_webui.utils.audit import AuditLevel, AuditLoggingMiddleware
 from open_webui.utils.logger import start_logger
+from open_webui.utils.message_buffer import MessageBuffer
+from open_webui.utils.pricing import (
+    TOKENIZERS,
+    load_price_overrides,
+    periodic_price_sheet_refresh,
+)
+from open_webui.utils.ledger import Ledger, periodic_credit_settlement
+from open_webui.utils.ingestion import periodic_ingestion_job_recovery
+from open_webui.utils.tools import periodic_tool_server_refresh
+from open_webui.utils.session_pool import SessionPool
 from open_webui.socket.main import (
     app as socket_app,
     periodic_usage_pool_cleanup,
+    start_session_pools,
 )
 from open_webui.routers import (
     audio,
@@ -89,6 +100,8 @@ from open_webui.routers.retrieval import (
     get_ef,
     get_rf,
 )
+from open_webui.retrieval.embedding_cache import EMBEDDING_CACHE
+from open_webui.retrieval.utils import periodic_chunk_embedding_cleanup
 
 from open_webui.internal.db import Session, engine
 
@@ -492,10 +505,25 @@ async def lifespan(app: FastAPI):
         limiter = anyio.to_thread.current_default_thread_limiter()
         limiter.total_tokens = THREAD_POOL_SIZE
 
+    start_session_pools()
     asyncio.create_task(periodic_usage_pool_cleanup())
 
+    load_price_overrides()
+    asyncio.create_task(asyncio.to_thread(TOKENIZERS.preload))
+    asyncio.create_task(periodic_price_sheet_refresh())
+    asyncio.create_task(periodic_credit_settlement())
+    asyncio.create_task(periodic_ingestion_job_recovery(app))
+    asyncio.create_task(periodic_tool_server_refresh(app))
+    asyncio.create_task(periodic_chunk_embedding_cleanup())
+    # Chats saved before the search index existed
+    asyncio.create_task(asyncio.to_thread(Chats.backfill_search_index))
+
     yield
 
+    MessageBuffer.flush_all()
+    Ledger.settle_all()
+    await SessionPool.close()
+
 
 app = FastAPI(
     title="Open WebUI",
@@ -821,6 +849,7 @@ app.state.EMBEDDING_FUNCTION = get_embedding_function(
         else app.state.config.RAG_OLLAMA_API_KEY
     ),
     app.state.config.RAG_EMBEDDING_BATCH_SIZE,
+    embedding_cache=EMBEDDING_CACHE,
 )
 
 ########################################
@@ -0,0 +1,59 @@
+"""Add ingestion_job and ingestion_job_item tables
+
+Revision ID: 0a7c5e9b3d14
+Revises: f2a8d3c61b07
+Create Date: 2026-10-17 15:36:20.941052
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0a7c5e9b3d14"
+down_revision: Union[str, None] = "f2a8d3c61b07"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.create_table(
+        "ingestion_job",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("user_id", sa.String(), nullable=True),
+        sa.Column("type", sa.String(), nullable=True),
+        sa.Column("status", sa.String(), nullable=True),
+        sa.Column("total", sa.BigInteger(), nullable=True),
+        sa.Column("processed", sa.BigInteger(), nullable=True),
+        sa.Column("failed", sa.BigInteger(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("updated_at", sa.BigInteger(), nullable=True),
+        sa.Column("created_at", sa.BigInteger(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+    op.create_table(
+        "ingestion_job_item",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("job_id", sa.String(), nullable=True),
+        sa.Column("collection_name", sa.String(), nullable=True),
+        sa.Column("file_id", sa.String(), nullable=True),
+        sa.Column("status", sa.String(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("updated_at", sa.BigInteger(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ingestion_job_item_job_id_status_idx",
+        "ingestion_job_item",
+        ["job_id", "status"],
+    )
+
+
+def downgrade():
+    op.drop_index(
+        "ingestion_job_item_job_id_status_idx", table_name="ingestion_job_item"
+    )
+    op.drop_table("ingestion_job_item")
+    op.drop_table("ingestion_job")
@@ -0,0 +1,104 @@
+"""Add chat_search full-text index
+
+Revision ID: 1c6e2f8a4b93
+Revises: 0a7c5e9b3d14
+Create Date: 2026-10-17 17:02:31.118406
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "1c6e2f8a4b93"
+down_revision: Union[str, None] = "0a7c5e9b3d14"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    # Rows are filled in by the backfill job at startup (Chats.backfill_search_index)
+    op.create_table(
+        "chat_search",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("chat_id", sa.Text(), nullable=False),
+        sa.Column("message_id", sa.Text(), nullable=False),
+        sa.Column("user_id", sa.Text(), nullable=True),
+        sa.Column("title", sa.Text(), nullable=True),
+        sa.Column("content", sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "chat_search_chat_id_message_id_idx",
+        "chat_search",
+        ["chat_id", "message_id"],
+    )
+    op.create_index("chat_search_user_id_idx", "chat_search", ["user_id"])
+
+    dialect_name = op.get_bind().dialect.name
+    if dialect_name == "sqlite":
+        # External content FTS5 table over chat_search, kept in sync by triggers
+        op.execute(
+            """
+            CREATE VIRTUAL TABLE chat_search_fts USING fts5(
+                title, content,
+                content='chat_search', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+            """
+        )
+        op.execute(
+            """
+            CREATE TRIGGER chat_search_ai AFTER INSERT ON chat_search BEGIN
+                INSERT INTO chat_search_fts(rowid, title, content)
+                VALUES (new.id, new.title, new.content);
+            END
+            """
+        )
+        op.execute(
+            """
+            CREATE TRIGGER chat_search_ad AFTER DELETE ON chat_search BEGIN
+                INSERT INTO chat_search_fts(chat_search_fts, rowid, title, content)
+                VALUES ('delete', old.id, old.title, old.content);
+            END
+            """
+        )
+        op.execute(
+            """
+            CREATE TRIGGER chat_search_au AFTER UPDATE ON chat_search BEGIN
+                INSERT INTO chat_search_fts(chat_search_fts, rowid, title, content)
+                VALUES ('delete', old.id, old.title, old.content);
+                INSERT INTO chat_search_fts(rowid, title, content)
+                VALUES (new.id, new.title, new.content);
+            END
+            """
+        )
+    elif dialect_name == "postgresql":
+        op.execute(
+            """
+            ALTER TABLE chat_search ADD COLUMN search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(content, '')), 'B')
+            ) STORED
+            """
+        )
+        op.execute(
+            "CREATE INDEX chat_search_vector_idx ON chat_search USING GIN (search_vector)"
+        )
+
+
+def downgrade():
+    dialect_name = op.get_bind().dialect.name
+    if dialect_name == "sqlite":
+        op.execute("DROP TRIGGER IF EXISTS chat_search_au")
+        op.execute("DROP TRIGGER IF EXISTS chat_search_ad")
+        op.execute("DROP TRIGGER IF EXISTS chat_search_ai")
+        op.execute("DROP TABLE IF EXISTS chat_search_fts")
+    elif dialect_name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS chat_search_vector_idx")
+
+    op.drop_index("chat_search_user_id_idx", table_name="chat_search")
+    op.drop_index("chat_search_chat_id_message_id_idx", table_name="chat_search")
+    op.drop_table("chat_search")
@@ -0,0 +1,30 @@
+"""Add chat list indexes
+
+Revision ID: 2b9d4e6f1a37
+Revises: 1c6e2f8a4b93
+Create Date: 2026-10-17 17:48:09.264751
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "2b9d4e6f1a37"
+down_revision: Union[str, None] = "1c6e2f8a4b93"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.create_index(
+        "chat_user_id_archived_pinned_updated_at_idx",
+        "chat",
+        ["user_id", "archived", "pinned", "updated_at"],
+    )
+    op.create_index("chat_user_id_folder_id_idx", "chat", ["user_id", "folder_id"])
+
+
+def downgrade():
+    op.drop_index("chat_user_id_folder_id_idx", table_name="chat")
+    op.drop_index("chat_user_id_archived_pinned_updated_at_idx", table_name="chat")
@@ -0,0 +1,29 @@
+"""Add chat_message.upserted_at
+
+Revision ID: 3d5f7a9c2e48
+Revises: 2b9d4e6f1a37
+Create Date: 2026-10-17 21:06:52.417093
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "3d5f7a9c2e48"
+down_revision: Union[str, None] = "2b9d4e6f1a37"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.add_column(
+        "chat_message", sa.Column("upserted_at", sa.BigInteger(), nullable=True)
+    )
+    # Rows written so far can't be told apart, keep treating them as upserts
+    op.execute("UPDATE chat_message SET upserted_at = updated_at")
+
+
+def downgrade():
+    op.drop_column("chat_message", "upserted_at")
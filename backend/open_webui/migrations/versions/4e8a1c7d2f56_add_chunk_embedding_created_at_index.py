@@ -0,0 +1,24 @@
+"""Add chunk_embedding.created_at index
+
+Revision ID: 4e8a1c7d2f56
+Revises: 3d5f7a9c2e48
+Create Date: 2026-10-17 22:14:05.281964
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "4e8a1c7d2f56"
+down_revision: Union[str, None] = "3d5f7a9c2e48"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.create_index("chunk_embedding_created_at_idx", "chunk_embedding", ["created_at"])
+
+
+def downgrade():
+    op.drop_index("chunk_embedding_created_at_idx", table_name="chunk_embedding")
@@ -0,0 +1,83 @@
+"""Add chat_message table
+
+Revision ID: d31026856c01
+Revises: b539b26ab39d
+Create Date: 2026-10-17 09:12:44.512301
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.sql import table, select
+
+revision: str = "d31026856c01"
+down_revision: Union[str, None] = "b539b26ab39d"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    # Existing messages stay in `chat.chat`, rows are only created by
+    # per-message writes and are read on top of the chat JSON.
+    op.create_table(
+        "chat_message",
+        sa.Column("chat_id", sa.Text(), nullable=False),
+        sa.Column("id", sa.Text(), nullable=False),
+        sa.Column("data", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.BigInteger(), nullable=True),
+        sa.Column("updated_at", sa.BigInteger(), nullable=True),
+        sa.PrimaryKeyConstraint("chat_id", "id"),
+    )
+
+
+def downgrade():
+    # Fold the per-message rows back into the chat JSON before dropping them
+    conn = op.get_bind()
+
+    chat_table = table(
+        "chat",
+        sa.Column("id", sa.String()),
+        sa.Column("chat", sa.JSON()),
+    )
+    chat_message_table = table(
+        "chat_message",
+        sa.Column("chat_id", sa.Text()),
+        sa.Column("id", sa.Text()),
+        sa.Column("data", sa.JSON()),
+        sa.Column("updated_at", sa.BigInteger()),
+    )
+
+    rows = conn.execute(
+        select(
+            chat_message_table.c.chat_id,
+            chat_message_table.c.id,
+            chat_message_table.c.data,
+        ).order_by(chat_message_table.c.updated_at.asc())
+    ).fetchall()
+
+    messages_by_chat_id = {}
+    for row in rows:
+        messages_by_chat_id.setdefault(row.chat_id, []).append(row)
+
+    for chat_id, messages in messages_by_chat_id.items():
+        result = conn.execute(
+            select(chat_table.c.chat).where(chat_table.c.id == chat_id)
+        ).first()
+        if result is None or result.chat is None:
+            continue
+
+        chat = result.chat
+        history = chat.get("history", {})
+        history.setdefault("messages", {})
+        for message in messages:
+            history["messages"][message.id] = message.data
+            history["currentId"] = message.id
+        chat["history"] = history
+
+        conn.execute(
+            sa.update(chat_table).where(chat_table.c.id == chat_id).values(chat=chat)
+        )
+
+    op.drop_table("chat_message")
@@ -0,0 +1,32 @@
+"""Add model_price table
+
+Revision ID: e4b1c07a9d25
+Revises: d31026856c01
+Create Date: 2026-10-17 10:41:03.118522
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "e4b1c07a9d25"
+down_revision: Union[str, None] = "d31026856c01"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.create_table(
+        "model_price",
+        sa.Column("model_name", sa.String(), nullable=False),
+        sa.Column("input_cost_per_token", sa.Numeric(), nullable=False),
+        sa.Column("output_cost_per_token", sa.Numeric(), nullable=False),
+        sa.Column("updated_at", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("model_name"),
+    )
+
+
+def downgrade():
+    op.drop_table("model_price")
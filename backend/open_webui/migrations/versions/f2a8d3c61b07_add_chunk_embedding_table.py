@@ -0,0 +1,32 @@
+"""Add chunk_embedding table
+
+Revision ID: f2a8d3c61b07
+Revises: e4b1c07a9d25
+Create Date: 2026-10-17 14:12:47.503911
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "f2a8d3c61b07"
+down_revision: Union[str, None] = "e4b1c07a9d25"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.create_table(
+        "chunk_embedding",
+        sa.Column("config", sa.String(), nullable=False),
+        sa.Column("hash", sa.String(), nullable=False),
+        sa.Column("embedding", sa.LargeBinary(), nullable=False),
+        sa.Column("created_at", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("config", "hash"),
+    )
+
+
+def downgrade():
+    op.drop_table("chunk_embedding")
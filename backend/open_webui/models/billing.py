@@ -102,14 +102,25 @@ class PaymentOrder(Base):
     paid_at = Column(BigInteger, nullable=True)
 
 
+class ModelPrice(Base):
+    __tablename__ = "model_price"
+
+    model_name = Column(String, primary_key=True)
+    input_cost_per_token = Column(Numeric, nullable=False)
+    output_cost_per_token = Column(Numeric, nullable=False)
+    updated_at = Column(BigInteger, nullable=False, default=lambda: int(time.time()))
+
+
 ####################
 # Helper functions for credit usage info
 ####################
 
 async def get_credit_usage_info(user_id: str) -> dict:
     """Get current credit usage information for piggy-backing in responses"""
+    from open_webui.utils.ledger import Ledger
+
     try:
-        credits = UserCredits.get_user_credits(user_id)
+        credits = Ledger.get_account(user_id)
         if not credits:
             return {}
 
@@ -202,6 +213,21 @@ class PaymentCallbackForm(BaseModel):
     paid_at: Optional[int] = None
 
 
+class ModelPriceModel(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    model_name: str
+    input_cost_per_token: float
+    output_cost_per_token: float
+    updated_at: int
+
+
+class ModelPriceForm(BaseModel):
+    model_name: str
+    input_cost_per_token: float
+    output_cost_per_token: float
+
+
 ####################
 # Table classes
 ####################
@@ -231,13 +257,23 @@ class UserCreditsTable:
 
     def update_credits(self, user_id: str, delta: int) -> Optional[UserCreditsModel]:
         with get_db() as db:
-            record = db.query(UserCredit).filter(UserCredit.user_id == user_id).first()
-            if record is None:
-                return None
-            record.credit_balance = record.credit_balance + delta
-            record.updated_at = int(time.time())
+            # Increment in SQL so concurrent updates can't overwrite each other
+            result = (
+                db.query(UserCredit)
+                .filter(UserCredit.user_id == user_id)
+                .update(
+                    {
+                        "credit_balance": UserCredit.credit_balance + delta,
+                        "updated_at": int(time.time()),
+                    },
+                    synchronize_session=False,
+                )
+            )
             db.commit()
-            db.refresh(record)
+            if not result:
+                return None
+
+            record = db.query(UserCredit).filter(UserCredit.user_id == user_id).first()
             return UserCreditsModel.model_validate(record)
 
     def update_subscription(self, user_id: str, new_end: datetime.date) -> Optional[UserCreditsModel]:
@@ -291,6 +327,55 @@ class CreditTransactionsTable:
         with get_db() as db:
             return db.query(CreditTransaction).filter(CreditTransaction.tx_id == tx_id).first() is not None
 
+    def settle_transactions(self, transactions: list[dict]) -> list[dict]:
+        """
+        Insert a batch of ledger transactions and apply their deltas to the
+        wallets in a single DB transaction. Transactions whose tx_id already
+        exists are skipped; returns the skipped transactions.
+        """
+        with get_db() as db:
+            tx_ids = [tx["tx_id"] for tx in transactions]
+            existing = {
+                row.tx_id
+                for row in db.query(CreditTransaction.tx_id)
+                .filter(CreditTransaction.tx_id.in_(tx_ids))
+                .all()
+            }
+
+            deltas: dict[str, int] = {}
+            skipped = []
+            seen = set(existing)
+            for tx in transactions:
+                if tx["tx_id"] in seen:
+                    skipped.append(tx)
+                    continue
+                seen.add(tx["tx_id"])
+
+                db.add(
+                    CreditTransaction(
+                        tx_id=tx["tx_id"],
+                        user_id=tx["user_id"],
+                        delta=tx["delta"],
+                        usd_spend=tx["usd_spend"],
+                        model_name=tx["model_name"],
+                        created_at=tx["created_at"],
+                    )
+                )
+                deltas[tx["user_id"]] = deltas.get(tx["user_id"], 0) + tx["delta"]
+
+            now_ts = int(time.time())
+            for user_id, delta in deltas.items():
+                db.query(UserCredit).filter(UserCredit.user_id == user_id).update(
+                    {
+                        "credit_balance": UserCredit.credit_balance + delta,
+                        "updated_at": now_ts,
+                    },
+                    synchronize_session=False,
+                )
+
+            db.commit()
+            return skipped
+
 
 class PaymentOrdersTable:
     def create_payment_order(
@@ -378,7 +463,34 @@ class PaymentOrdersTable:
             return [PaymentOrderModel.model_validate(r) for r in rows]
 
 
+class ModelPricesTable:
+    def upsert_model_price(self, form: ModelPriceForm) -> Optional[ModelPriceModel]:
+        with get_db() as db:
+            record = db.get(ModelPrice, form.model_name)
+            if record is None:
+                record = ModelPrice(model_name=form.model_name)
+                db.add(record)
+            record.input_cost_per_token = form.input_cost_per_token
+            record.output_cost_per_token = form.output_cost_per_token
+            record.updated_at = int(time.time())
+            db.commit()
+            db.refresh(record)
+            return ModelPriceModel.model_validate(record)
+
+    def get_model_prices(self) -> list[ModelPriceModel]:
+        with get_db() as db:
+            rows = db.query(ModelPrice).order_by(ModelPrice.model_name).all()
+            return [ModelPriceModel.model_validate(r) for r in rows]
+
+    def delete_model_price(self, model_name: str) -> bool:
+        with get_db() as db:
+            result = db.query(ModelPrice).filter_by(model_name=model_name).delete()
+            db.commit()
+            return result > 0
+
+
 # Instantiate tables for import
 UserCredits = UserCreditsTable()
 CreditTransactions = CreditTransactionsTable()
 PaymentOrders = PaymentOrdersTable()
+ModelPrices = ModelPricesTable()
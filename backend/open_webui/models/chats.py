@@ -1,5 +1,6 @@
 import logging
 import json
+import re
 import time
 import uuid
 from typing import Optional
@@ -9,8 +10,8 @@ from open_webui.models.tags import TagModel, Tag, Tags
 from open_webui.env import SRC_LOG_LEVELS
 
 from pydantic import BaseModel, ConfigDict
-from sqlalchemy import BigInteger, Boolean, Column, String, Text, JSON
-from sqlalchemy import or_, func, select, and_, text
+from sqlalchemy import BigInteger, Boolean, Column, Index, Integer, String, Text, JSON
+from sqlalchemy import Float, or_, func, select, and_, text, column, literal
 from sqlalchemy.sql import exists
 
 ####################
@@ -20,6 +21,13 @@ from sqlalchemy.sql import exists
 log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["MODELS"])
 
+# Scripts written without spaces between words (Chinese, Japanese, Thai, Lao,
+# Khmer, Myanmar): full-text tokenizers index a whole run as a single token
+UNSEGMENTED_SCRIPTS = re.compile(
+    "[\u0e00-\u0eff\u1000-\u109f\u1780-\u17ff\u3040-\u30ff"
+    "\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff66-\uff9f]"
+)
+
 
 class Chat(Base):
     __tablename__ = "chat"
@@ -39,6 +47,78 @@ class Chat(Base):
     meta = Column(JSON, server_default="{}")
     folder_id = Column(Text, nullable=True)
 
+    __table_args__ = (
+        # Sidebar lists, read without the chat JSON
+        Index(
+            "chat_user_id_archived_pinned_updated_at_idx",
+            "user_id",
+            "archived",
+            "pinned",
+            "updated_at",
+        ),
+        Index("chat_user_id_folder_id_idx", "user_id", "folder_id"),
+    )
+
+
+class ChatMessage(Base):
+    # Messages written one at a time (streaming, status updates, edits) are stored
+    # here instead of rewriting the whole `chat` JSON. Rows take precedence over
+    # `chat.history.messages` on read and are folded back into the JSON the next
+    # time the full chat is saved.
+    __tablename__ = "chat_message"
+
+    chat_id = Column(Text, primary_key=True)
+    id = Column(Text, primary_key=True)
+    data = Column(JSON)
+
+    created_at = Column(BigInteger)  # time_ns
+    updated_at = Column(BigInteger)  # time_ns
+    # Last upsert of the message (time_ns), status-only writes leave it unset
+    upserted_at = Column(BigInteger, nullable=True)
+
+
+class ChatSearch(Base):
+    # One row per chat title (empty `message_id`) and per message, full-text
+    # indexed natively: through the `chat_search_fts` FTS5 table on SQLite and
+    # a tsvector column with a GIN index on PostgreSQL (see the migration).
+    __tablename__ = "chat_search"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    chat_id = Column(Text, nullable=False)
+    message_id = Column(Text, nullable=False)
+    user_id = Column(Text)
+    title = Column(Text)
+    content = Column(Text)
+
+    __table_args__ = (
+        Index("chat_search_chat_id_message_id_idx", "chat_id", "message_id"),
+        Index("chat_search_user_id_idx", "user_id"),
+    )
+
+
+def get_message_text(message: dict) -> str:
+    content = (message or {}).get("content") or ""
+    if isinstance(content, list):
+        # Multimodal messages, only their text parts are searchable
+        content = " ".join(
+            part.get("text", "") for part in content if isinstance(part, dict)
+        )
+    return content if isinstance(content, str) else ""
+
+
+def get_chat_message_texts(chat: dict) -> dict[str, str]:
+    messages = chat.get("history", {}).get("messages")
+    if messages is None:
+        messages = {
+            message.get("id", str(idx)): message
+            for idx, message in enumerate(chat.get("messages", []))
+        }
+    return {
+        message_id: text
+        for message_id, message in messages.items()
+        if (text := get_message_text(message))
+    }
+
 
 class ChatModel(BaseModel):
     model_config = ConfigDict(from_attributes=True)
@@ -105,6 +185,270 @@ class ChatTitleIdResponse(BaseModel):
 
 
 class ChatTable:
+    def _get_chat_messages_by_chat_ids(
+        self, db, chat_ids: list[str]
+    ) -> dict[str, list[ChatMessage]]:
+        chat_messages = {}
+        if not chat_ids:
+            return chat_messages
+
+        rows = (
+            db.query(ChatMessage)
+            .filter(ChatMessage.chat_id.in_(chat_ids))
+            .order_by(ChatMessage.updated_at.asc())
+            .all()
+        )
+        for row in rows:
+            chat_messages.setdefault(row.chat_id, []).append(row)
+        return chat_messages
+
+    def _merge_chat_messages(self, chat: dict, rows: list[ChatMessage]) -> dict:
+        if not rows:
+            return chat
+
+        history = {**chat.get("history", {})}
+        history["messages"] = {**history.get("messages", {})}
+        for row in rows:
+            history["messages"][row.id] = row.data
+
+        # Mirrors the upsert, which always moved `currentId` to the message
+        upserted = [row for row in rows if row.upserted_at is not None]
+        if upserted:
+            history["currentId"] = max(upserted, key=lambda row: row.upserted_at).id
+
+        return {**chat, "history": history}
+
+    def _to_chat_models(self, db, chats) -> list[ChatModel]:
+        chats = list(chats)
+        chat_messages = self._get_chat_messages_by_chat_ids(
+            db, [chat.id for chat in chats]
+        )
+
+        chat_models = []
+        for chat in chats:
+            chat_model = ChatModel.model_validate(chat)
+            if chat.id in chat_messages:
+                chat_model.chat = self._merge_chat_messages(
+                    chat_model.chat, chat_messages[chat.id]
+                )
+            chat_models.append(chat_model)
+        return chat_models
+
+    def _to_chat_model(self, db, chat) -> Optional[ChatModel]:
+        chat_models = self._to_chat_models(db, [chat] if chat else [])
+        return chat_models[0] if chat_models else None
+
+    def _get_message(
+        self, db, id: str, message_id: str
+    ) -> tuple[Optional[dict], Optional[ChatMessage]]:
+        row = db.get(ChatMessage, (id, message_id))
+        if row is not None:
+            return row.data, row
+
+        # Only extract the requested message from the chat JSON on the database side
+        result = (
+            db.query(Chat.chat[("history", "messages", message_id)])
+            .filter(Chat.id == id)
+            .first()
+        )
+        if result is None:
+            return None, None
+
+        return result[0] or {}, None
+
+    def _to_chat_title_id_list(self, query) -> list[ChatTitleIdResponse]:
+        """Only the columns chat lists show, without loading the chat JSON."""
+        return [
+            ChatTitleIdResponse(
+                id=id, title=title, updated_at=updated_at, created_at=created_at
+            )
+            for id, title, updated_at, created_at in query.with_entities(
+                Chat.id, Chat.title, Chat.updated_at, Chat.created_at
+            )
+        ]
+
+    def _index_chat(self, db, id: str, user_id: str, title: str, chat: dict):
+        """Bring the chat's search rows in line with its title and messages."""
+        if user_id.startswith("shared-"):
+            # Shared snapshots are never searched
+            return
+
+        rows = {"": (title or "", "")}
+        for message_id, content in get_chat_message_texts(chat).items():
+            rows[message_id] = ("", content)
+
+        stale_ids = []
+        for row_id, message_id, *values in db.query(
+            ChatSearch.id, ChatSearch.message_id, ChatSearch.title, ChatSearch.content
+        ).filter_by(chat_id=id):
+            if rows.get(message_id) == tuple(values):
+                del rows[message_id]
+            else:
+                stale_ids.append(row_id)
+
+        if stale_ids:
+            db.query(ChatSearch).filter(ChatSearch.id.in_(stale_ids)).delete(
+                synchronize_session=False
+            )
+        db.add_all(
+            [
+                ChatSearch(
+                    chat_id=id,
+                    message_id=message_id,
+                    user_id=user_id,
+                    title=row_title,
+                    content=content,
+                )
+                for message_id, (row_title, content) in rows.items()
+            ]
+        )
+
+    def _index_message(self, db, id: str, message_id: str, message: dict):
+        db.query(ChatSearch).filter_by(chat_id=id, message_id=message_id).delete(
+            synchronize_session=False
+        )
+        content = get_message_text(message)
+        if content:
+            user_id = db.query(Chat.user_id).filter_by(id=id).scalar()
+            if user_id and not user_id.startswith("shared-"):
+                db.add(
+                    ChatSearch(
+                        chat_id=id,
+                        message_id=message_id,
+                        user_id=user_id,
+                        title="",
+                        content=content,
+                    )
+                )
+
+    def _get_search_ranks(self, db, user_id: str, search_text: str):
+        """
+        Subquery of (chat_id, rank) for the user's chats matching every word of
+        `search_text` (as prefixes, or substrings in scripts written without
+        spaces) in their title or one of their messages, best matches having
+        the lowest rank.
+        """
+        words = re.findall(r"\w+", search_text)
+        if not words:
+            return None
+
+        if UNSEGMENTED_SCRIPTS.search(search_text):
+            # The index can't match part of a run of these, search substrings
+            conditions = []
+            for word in words:
+                pattern = "%" + word.replace("_", "\\_") + "%"
+                conditions.append(
+                    or_(
+                        ChatSearch.title.ilike(pattern, escape="\\"),
+                        ChatSearch.content.ilike(pattern, escape="\\"),
+                    )
+                )
+            return (
+                db.query(
+                    ChatSearch.chat_id.label("chat_id"),
+                    literal(0.0, Float).label("rank"),
+                )
+                .filter(ChatSearch.user_id == user_id, *conditions)
+                .distinct()
+                .subquery("search_ranks")
+            )
+
+        dialect_name = db.bind.dialect.name
+        if dialect_name == "sqlite":
+            statement = text(
+                """
+                SELECT chat_search.chat_id AS chat_id, min(matches.score) AS rank
+                FROM (
+                    -- bm25, titles weighted 10x over messages
+                    SELECT rowid, rank AS score
+                    FROM chat_search_fts
+                    WHERE chat_search_fts MATCH :search_query
+                        AND rank MATCH 'bm25(10.0, 1.0)'
+                ) AS matches
+                JOIN chat_search ON chat_search.id = matches.rowid
+                WHERE chat_search.user_id = :user_id
+                GROUP BY chat_search.chat_id
+                """
+            ).bindparams(
+                search_query=" ".join(f'"{word}"*' for word in words),
+                user_id=user_id,
+            )
+        elif dialect_name == "postgresql":
+            statement = text(
+                """
+                SELECT chat_id, -max(ts_rank(search_vector, search_query)) AS rank
+                FROM chat_search, to_tsquery('simple', :search_query) AS search_query
+                WHERE user_id = :user_id AND search_vector @@ search_query
+                GROUP BY chat_id
+                """
+            ).bindparams(
+                search_query=" & ".join(f"{word}:*" for word in words),
+                user_id=user_id,
+            )
+        else:
+            raise NotImplementedError(f"Unsupported dialect: {dialect_name}")
+
+        return statement.columns(
+            column("chat_id", Text), column("rank", Float)
+        ).subquery("search_ranks")
+
+    def backfill_search_index(self, batch_size: int = 500) -> int:
+        """Index the chats saved before the search index existed, in batches."""
+        count = 0
+        while True:
+            with get_db() as db:
+                indexed = select(ChatSearch.chat_id).where(ChatSearch.message_id == "")
+                chats = (
+                    db.query(Chat)
+                    .filter(
+                        ~Chat.user_id.startswith("shared-"), Chat.id.notin_(indexed)
+                    )
+                    .limit(batch_size)
+                    .all()
+                )
+                if not chats:
+                    break
+
+                for chat in self._to_chat_models(db, chats):
+                    self._index_chat(db, chat.id, chat.user_id, chat.title, chat.chat)
+                db.commit()
+                count += len(chats)
+
+        if count:
+            log.info(f"Indexed {count} chats for search")
+        return count
+
+    def _save_message(
+        self,
+        db,
+        id: str,
+        message_id: str,
+        message: dict,
+        row: Optional[ChatMessage],
+        upsert: bool = True,
+    ):
+        now = time.time_ns()
+        if row is None:
+            db.add(
+                ChatMessage(
+                    chat_id=id,
+                    id=message_id,
+                    data=message,
+                    created_at=now,
+                    updated_at=now,
+                    upserted_at=now if upsert else None,
+                )
+            )
+        else:
+            row.data = message
+            row.updated_at = now
+            if upsert:
+                row.upserted_at = now
+
+        self._index_message(db, id, message_id, message)
+        db.query(Chat).filter_by(id=id).update({"updated_at": int(time.time())})
+        db.commit()
+
     def insert_new_chat(self, user_id: str, form_data: ChatForm) -> Optional[ChatModel]:
         with get_db() as db:
             id = str(uuid.uuid4())
@@ -125,6 +469,7 @@ class ChatTable:
 
             result = Chat(**chat.model_dump())
             db.add(result)
+            self._index_chat(db, chat.id, chat.user_id, chat.title, chat.chat)
             db.commit()
             db.refresh(result)
             return ChatModel.model_validate(result) if result else None
@@ -154,6 +499,7 @@ class ChatTable:
 
             result = Chat(**chat.model_dump())
             db.add(result)
+            self._index_chat(db, chat.id, chat.user_id, chat.title, chat.chat)
             db.commit()
             db.refresh(result)
             return ChatModel.model_validate(result) if result else None
@@ -165,6 +511,12 @@ class ChatTable:
                 chat_item.chat = chat
                 chat_item.title = chat["title"] if "title" in chat else "New Chat"
                 chat_item.updated_at = int(time.time())
+
+                # The full chat is authoritative, fold the per-message rows into it
+                db.query(ChatMessage).filter_by(chat_id=id).delete()
+                self._index_chat(
+                    db, id, chat_item.user_id, chat_item.title, chat_item.chat
+                )
                 db.commit()
                 db.refresh(chat_item)
 
@@ -219,52 +571,47 @@ class ChatTable:
     def get_message_by_id_and_message_id(
         self, id: str, message_id: str
     ) -> Optional[dict]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
+        try:
+            with get_db() as db:
+                message, _ = self._get_message(db, id, message_id)
+                return message
+        except Exception:
             return None
 
-        return chat.chat.get("history", {}).get("messages", {}).get(message_id, {})
-
     def upsert_message_to_chat_by_id_and_message_id(
         self, id: str, message_id: str, message: dict
-    ) -> Optional[ChatModel]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
-            return None
-
-        chat = chat.chat
-        history = chat.get("history", {})
-
-        if message_id in history.get("messages", {}):
-            history["messages"][message_id] = {
-                **history["messages"][message_id],
-                **message,
-            }
-        else:
-            history["messages"][message_id] = message
-
-        history["currentId"] = message_id
+    ) -> Optional[dict]:
+        try:
+            with get_db() as db:
+                existing, row = self._get_message(db, id, message_id)
+                if existing is None:
+                    return None
 
-        chat["history"] = history
-        return self.update_chat_by_id(id, chat)
+                message = {**existing, **message}
+                self._save_message(db, id, message_id, message, row)
+                return message
+        except Exception as e:
+            log.exception(f"Error upserting message {message_id} of chat {id}: {e}")
+            return None
 
     def add_message_status_to_chat_by_id_and_message_id(
         self, id: str, message_id: str, status: dict
-    ) -> Optional[ChatModel]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
-            return None
-
-        chat = chat.chat
-        history = chat.get("history", {})
-
-        if message_id in history.get("messages", {}):
-            status_history = history["messages"][message_id].get("statusHistory", [])
-            status_history.append(status)
-            history["messages"][message_id]["statusHistory"] = status_history
+    ) -> Optional[dict]:
+        try:
+            with get_db() as db:
+                message, row = self._get_message(db, id, message_id)
+                if not message:
+                    return message
 
-        chat["history"] = history
-        return self.update_chat_by_id(id, chat)
+                message = {
+                    **message,
+                    "statusHistory": [*message.get("statusHistory", []), status],
+                }
+                self._save_message(db, id, message_id, message, row, upsert=False)
+                return message
+        except Exception as e:
+            log.exception(f"Error adding status to message {message_id}: {e}")
+            return None
 
     def insert_shared_chat_by_chat_id(self, chat_id: str) -> Optional[ChatModel]:
         with get_db() as db:
@@ -279,7 +626,7 @@ class ChatTable:
                     "id": str(uuid.uuid4()),
                     "user_id": f"shared-{chat_id}",
                     "title": chat.title,
-                    "chat": chat.chat,
+                    "chat": self._to_chat_model(db, chat).chat,
                     "created_at": chat.created_at,
                     "updated_at": int(time.time()),
                 }
@@ -310,13 +657,13 @@ class ChatTable:
                     return self.insert_shared_chat_by_chat_id(chat_id)
 
                 shared_chat.title = chat.title
-                shared_chat.chat = chat.chat
+                shared_chat.chat = self._to_chat_model(db, chat).chat
 
                 shared_chat.updated_at = int(time.time())
                 db.commit()
                 db.refresh(shared_chat)
 
-                return ChatModel.model_validate(shared_chat)
+                return self._to_chat_model(db, shared_chat)
         except Exception:
             return None
 
@@ -339,7 +686,7 @@ class ChatTable:
                 chat.share_id = share_id
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(db, chat)
         except Exception:
             return None
 
@@ -351,7 +698,7 @@ class ChatTable:
                 chat.updated_at = int(time.time())
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(db, chat)
         except Exception:
             return None
 
@@ -363,7 +710,7 @@ class ChatTable:
                 chat.updated_at = int(time.time())
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(db, chat)
         except Exception:
             return None
 
@@ -382,7 +729,7 @@ class ChatTable:
         filter: Optional[dict] = None,
         skip: int = 0,
         limit: int = 50,
-    ) -> list[ChatModel]:
+    ) -> list[ChatTitleIdResponse]:
 
         with get_db() as db:
             query = db.query(Chat).filter_by(user_id=user_id, archived=True)
@@ -410,8 +757,7 @@ class ChatTable:
             if limit:
                 query = query.limit(limit)
 
-            all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_title_id_list(query)
 
     def get_chat_list_by_user_id(
         self,
@@ -420,7 +766,7 @@ class ChatTable:
         filter: Optional[dict] = None,
         skip: int = 0,
         limit: int = 50,
-    ) -> list[ChatModel]:
+    ) -> list[ChatTitleIdResponse]:
         with get_db() as db:
             query = db.query(Chat).filter_by(user_id=user_id)
             if not include_archived:
@@ -449,8 +795,7 @@ class ChatTable:
             if limit:
                 query = query.limit(limit)
 
-            all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_title_id_list(query)
 
     def get_chat_title_id_list_by_user_id(
         self,
@@ -466,29 +811,14 @@ class ChatTable:
             if not include_archived:
                 query = query.filter_by(archived=False)
 
-            query = query.order_by(Chat.updated_at.desc()).with_entities(
-                Chat.id, Chat.title, Chat.updated_at, Chat.created_at
-            )
+            query = query.order_by(Chat.updated_at.desc())
 
             if skip:
                 query = query.offset(skip)
             if limit:
                 query = query.limit(limit)
 
-            all_chats = query.all()
-
-            # result has to be destructured from sqlalchemy `row` and mapped to a dict since the `ChatModel`is not the returned dataclass.
-            return [
-                ChatTitleIdResponse.model_validate(
-                    {
-                        "id": chat[0],
-                        "title": chat[1],
-                        "updated_at": chat[2],
-                        "created_at": chat[3],
-                    }
-                )
-                for chat in all_chats
-            ]
+            return self._to_chat_title_id_list(query)
 
     def get_chat_list_by_chat_ids(
         self, chat_ids: list[str], skip: int = 0, limit: int = 50
@@ -501,13 +831,13 @@ class ChatTable:
                 .order_by(Chat.updated_at.desc())
                 .all()
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def get_chat_by_id(self, id: str) -> Optional[ChatModel]:
         try:
             with get_db() as db:
                 chat = db.get(Chat, id)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(db, chat)
         except Exception:
             return None
 
@@ -529,7 +859,7 @@ class ChatTable:
         try:
             with get_db() as db:
                 chat = db.query(Chat).filter_by(id=id, user_id=user_id).first()
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(db, chat)
         except Exception:
             return None
 
@@ -540,7 +870,7 @@ class ChatTable:
                 # .limit(limit).offset(skip)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def get_chats_by_user_id(self, user_id: str) -> list[ChatModel]:
         with get_db() as db:
@@ -549,16 +879,16 @@ class ChatTable:
                 .filter_by(user_id=user_id)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
-    def get_pinned_chats_by_user_id(self, user_id: str) -> list[ChatModel]:
+    def get_pinned_chats_by_user_id(self, user_id: str) -> list[ChatTitleIdResponse]:
         with get_db() as db:
-            all_chats = (
+            query = (
                 db.query(Chat)
-                .filter_by(user_id=user_id, pinned=True, archived=False)
+                .filter_by(user_id=user_id, archived=False, pinned=True)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_title_id_list(query)
 
     def get_archived_chats_by_user_id(self, user_id: str) -> list[ChatModel]:
         with get_db() as db:
@@ -567,7 +897,7 @@ class ChatTable:
                 .filter_by(user_id=user_id, archived=True)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def get_chats_by_user_id_and_search_text(
         self,
@@ -576,9 +906,10 @@ class ChatTable:
         include_archived: bool = False,
         skip: int = 0,
         limit: int = 60,
-    ) -> list[ChatModel]:
+    ) -> list[ChatTitleIdResponse]:
         """
-        Filters chats based on a search query using Python, allowing pagination using skip and limit.
+        Chats matching `search_text` through the full-text index, best matches
+        first, allowing pagination using skip and limit.
         """
         search_text = search_text.lower().strip()
 
@@ -608,29 +939,20 @@ class ChatTable:
             if not include_archived:
                 query = query.filter(Chat.archived == False)
 
+            search_ranks = self._get_search_ranks(db, user_id, search_text)
+            if search_ranks is not None:
+                query = query.join(
+                    search_ranks, search_ranks.c.chat_id == Chat.id
+                ).order_by(search_ranks.c.rank.asc())
+            elif search_text:
+                # Nothing the index can match (punctuation only)
+                query = query.filter(Chat.title.ilike(f"%{search_text}%"))
+
             query = query.order_by(Chat.updated_at.desc())
 
             # Check if the database dialect is either 'sqlite' or 'postgresql'
             dialect_name = db.bind.dialect.name
             if dialect_name == "sqlite":
-                # SQLite case: using JSON1 extension for JSON searching
-                query = query.filter(
-                    (
-                        Chat.title.ilike(
-                            f"%{search_text}%"
-                        )  # Case-insensitive search in title
-                        | text(
-                            """
-                            EXISTS (
-                                SELECT 1 
-                                FROM json_each(Chat.chat, '$.messages') AS message 
-                                WHERE LOWER(message.value->>'content') LIKE '%' || :search_text || '%'
-                            )
-                            """
-                        )
-                    ).params(search_text=search_text)
-                )
-
                 # Check if there are any tags to filter, it should have all the tags
                 if "none" in tag_ids:
                     query = query.filter(
@@ -662,24 +984,6 @@ class ChatTable:
                     )
 
             elif dialect_name == "postgresql":
-                # PostgreSQL relies on proper JSON query for search
-                query = query.filter(
-                    (
-                        Chat.title.ilike(
-                            f"%{search_text}%"
-                        )  # Case-insensitive search in title
-                        | text(
-                            """
-                            EXISTS (
-                                SELECT 1
-                                FROM json_array_elements(Chat.chat->'messages') AS message
-                                WHERE LOWER(message->>'content') LIKE '%' || :search_text || '%'
-                            )
-                            """
-                        )
-                    ).params(search_text=search_text)
-                )
-
                 # Check if there are any tags to filter, it should have all the tags
                 if "none" in tag_ids:
                     query = query.filter(
@@ -715,32 +1019,30 @@ class ChatTable:
                 )
 
             # Perform pagination at the SQL level
-            all_chats = query.offset(skip).limit(limit).all()
+            all_chats = self._to_chat_title_id_list(query.offset(skip).limit(limit))
 
             log.info(f"The number of chats: {len(all_chats)}")
 
-            # Validate and return chats
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return all_chats
 
     def get_chats_by_folder_id_and_user_id(
         self, folder_id: str, user_id: str
-    ) -> list[ChatModel]:
+    ) -> list[ChatTitleIdResponse]:
         with get_db() as db:
-            query = db.query(Chat).filter_by(folder_id=folder_id, user_id=user_id)
+            query = db.query(Chat).filter_by(user_id=user_id, folder_id=folder_id)
             query = query.filter(or_(Chat.pinned == False, Chat.pinned == None))
             query = query.filter_by(archived=False)
 
             query = query.order_by(Chat.updated_at.desc())
 
-            all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_title_id_list(query)
 
     def get_chats_by_folder_ids_and_user_id(
         self, folder_ids: list[str], user_id: str
     ) -> list[ChatModel]:
         with get_db() as db:
             query = db.query(Chat).filter(
-                Chat.folder_id.in_(folder_ids), Chat.user_id == user_id
+                Chat.user_id == user_id, Chat.folder_id.in_(folder_ids)
             )
             query = query.filter(or_(Chat.pinned == False, Chat.pinned == None))
             query = query.filter_by(archived=False)
@@ -748,7 +1050,7 @@ class ChatTable:
             query = query.order_by(Chat.updated_at.desc())
 
             all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, all_chats)
 
     def update_chat_folder_id_by_id_and_user_id(
         self, id: str, user_id: str, folder_id: str
@@ -761,7 +1063,7 @@ class ChatTable:
                 chat.pinned = False
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(db, chat)
         except Exception:
             return None
 
@@ -773,7 +1075,7 @@ class ChatTable:
 
     def get_chat_list_by_user_id_and_tag_name(
         self, user_id: str, tag_name: str, skip: int = 0, limit: int = 50
-    ) -> list[ChatModel]:
+    ) -> list[ChatTitleIdResponse]:
         with get_db() as db:
             query = db.query(Chat).filter_by(user_id=user_id)
             tag_id = tag_name.replace(" ", "_").lower()
@@ -798,9 +1100,9 @@ class ChatTable:
                     f"Unsupported dialect: {db.bind.dialect.name}"
                 )
 
-            all_chats = query.all()
+            all_chats = self._to_chat_title_id_list(query)
             log.debug(f"all_chats: {all_chats}")
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return all_chats
 
     def add_chat_tag_by_id_and_user_id_and_tag_name(
         self, id: str, user_id: str, tag_name: str
@@ -821,7 +1123,7 @@ class ChatTable:
 
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(db, chat)
         except Exception:
             return None
 
@@ -898,6 +1200,8 @@ class ChatTable:
         try:
             with get_db() as db:
                 db.query(Chat).filter_by(id=id).delete()
+                db.query(ChatMessage).filter_by(chat_id=id).delete()
+                db.query(ChatSearch).filter_by(chat_id=id).delete()
                 db.commit()
 
                 return True and self.delete_shared_chat_by_chat_id(id)
@@ -907,7 +1211,10 @@ class ChatTable:
     def delete_chat_by_id_and_user_id(self, id: str, user_id: str) -> bool:
         try:
             with get_db() as db:
-                db.query(Chat).filter_by(id=id, user_id=user_id).delete()
+                result = db.query(Chat).filter_by(id=id, user_id=user_id).delete()
+                if result:
+                    db.query(ChatMessage).filter_by(chat_id=id).delete()
+                    db.query(ChatSearch).filter_by(chat_id=id).delete()
                 db.commit()
 
                 return True and self.delete_shared_chat_by_chat_id(id)
@@ -919,6 +1226,12 @@ class ChatTable:
             with get_db() as db:
                 self.delete_shared_chats_by_user_id(user_id)
 
+                db.query(ChatMessage).filter(
+                    ChatMessage.chat_id.in_(
+                        select(Chat.id).where(Chat.user_id == user_id)
+                    )
+                ).delete(synchronize_session=False)
+                db.query(ChatSearch).filter_by(user_id=user_id).delete()
                 db.query(Chat).filter_by(user_id=user_id).delete()
                 db.commit()
 
@@ -931,6 +1244,20 @@ class ChatTable:
     ) -> bool:
         try:
             with get_db() as db:
+                db.query(ChatMessage).filter(
+                    ChatMessage.chat_id.in_(
+                        select(Chat.id).where(
+                            Chat.user_id == user_id, Chat.folder_id == folder_id
+                        )
+                    )
+                ).delete(synchronize_session=False)
+                db.query(ChatSearch).filter(
+                    ChatSearch.chat_id.in_(
+                        select(Chat.id).where(
+                            Chat.user_id == user_id, Chat.folder_id == folder_id
+                        )
+                    )
+                ).delete(synchronize_session=False)
                 db.query(Chat).filter_by(user_id=user_id, folder_id=folder_id).delete()
                 db.commit()
 
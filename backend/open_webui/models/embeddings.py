@@ -0,0 +1,105 @@
+import logging
+import time
+from array import array
+
+from open_webui.internal.db import Base, get_db
+from open_webui.env import SRC_LOG_LEVELS
+from sqlalchemy import BigInteger, Column, Index, LargeBinary, String
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MODELS"])
+
+# Stay under the databases' limit on the number of bound parameters
+BATCH_SIZE = 500
+
+####################
+# ChunkEmbedding DB Schema
+####################
+
+
+class ChunkEmbedding(Base):
+    __tablename__ = "chunk_embedding"
+    __table_args__ = (Index("chunk_embedding_created_at_idx", "created_at"),)
+
+    # Hash of the embedding engine, model, base URL and prefix
+    config = Column(String, primary_key=True)
+    # SHA-256 of the chunk's text as embedded
+    hash = Column(String, primary_key=True)
+    # float32 values
+    embedding = Column(LargeBinary, nullable=False)
+    created_at = Column(BigInteger, nullable=False)
+
+
+class ChunkEmbeddingTable:
+    def get_embeddings(self, config: str, hashes: list[str]) -> dict[str, list[float]]:
+        embeddings = {}
+        with get_db() as db:
+            for i in range(0, len(hashes), BATCH_SIZE):
+                rows = (
+                    db.query(ChunkEmbedding.hash, ChunkEmbedding.embedding)
+                    .filter(
+                        ChunkEmbedding.config == config,
+                        ChunkEmbedding.hash.in_(hashes[i : i + BATCH_SIZE]),
+                    )
+                    .all()
+                )
+                for hash, embedding in rows:
+                    embeddings[hash] = array("f", embedding).tolist()
+        return embeddings
+
+    def insert_embeddings(self, config: str, embeddings: dict[str, list[float]]):
+        with get_db() as db:
+            try:
+                existing = set()
+                hashes = list(embeddings)
+                for i in range(0, len(hashes), BATCH_SIZE):
+                    existing.update(
+                        hash
+                        for (hash,) in db.query(ChunkEmbedding.hash).filter(
+                            ChunkEmbedding.config == config,
+                            ChunkEmbedding.hash.in_(hashes[i : i + BATCH_SIZE]),
+                        )
+                    )
+
+                now = int(time.time())
+                db.add_all(
+                    [
+                        ChunkEmbedding(
+                            config=config,
+                            hash=hash,
+                            embedding=array("f", embedding).tobytes(),
+                            created_at=now,
+                        )
+                        for hash, embedding in embeddings.items()
+                        if hash not in existing
+                    ]
+                )
+                db.commit()
+            except Exception as e:
+                # Most likely the same chunks stored concurrently, they'll be reused next time
+                db.rollback()
+                log.warning(f"Error storing chunk embeddings: {e}")
+
+    def delete_embeddings_by_other_configs(self, config: str) -> bool:
+        with get_db() as db:
+            try:
+                db.query(ChunkEmbedding).filter(
+                    ChunkEmbedding.config != config
+                ).delete()
+                db.commit()
+                return True
+            except Exception:
+                return False
+
+    def delete_embeddings_older_than(self, created_at: int) -> int:
+        with get_db() as db:
+            count = (
+                db.query(ChunkEmbedding)
+                .filter(ChunkEmbedding.created_at < created_at)
+                .delete()
+            )
+            db.commit()
+            return count
+
+
+ChunkEmbeddings = ChunkEmbeddingTable()
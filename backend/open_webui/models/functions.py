@@ -4,9 +4,19 @@ from typing import Optional
 
 from open_webui.internal.db import Base, JSONField, get_db
 from open_webui.models.users import Users
-from open_webui.env import SRC_LOG_LEVELS
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    REDIS_URL,
+    REDIS_SENTINEL_HOSTS,
+    REDIS_SENTINEL_PORT,
+)
+from open_webui.utils.redis import (
+    VersionCounter,
+    get_redis_connection,
+    get_sentinels_from_env,
+)
 from pydantic import BaseModel, ConfigDict
-from sqlalchemy import BigInteger, Boolean, Column, String, Text
+from sqlalchemy import BigInteger, Boolean, Column, String, Text, func
 
 log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["MODELS"])
@@ -80,6 +90,22 @@ class FunctionValves(BaseModel):
     valves: Optional[dict] = None
 
 
+# Bumped on every change to functions or their valves, so what is compiled
+# from them (filter chains, loaded modules) is rebuilt in every worker
+FunctionsVersion = VersionCounter(
+    "functions",
+    redis=(
+        get_redis_connection(
+            REDIS_URL,
+            get_sentinels_from_env(REDIS_SENTINEL_HOSTS, REDIS_SENTINEL_PORT),
+            decode_responses=True,
+        )
+        if REDIS_URL
+        else None
+    ),
+)
+
+
 class FunctionsTable:
     def insert_new_function(
         self, user_id: str, type: str, form_data: FunctionForm
@@ -100,6 +126,7 @@ class FunctionsTable:
                 db.add(result)
                 db.commit()
                 db.refresh(result)
+                FunctionsVersion.bump()
                 if result:
                     return FunctionModel.model_validate(result)
                 else:
@@ -147,6 +174,7 @@ class FunctionsTable:
                         db.delete(func)
 
                 db.commit()
+                FunctionsVersion.bump()
 
                 return [
                     FunctionModel.model_validate(func)
@@ -164,6 +192,18 @@ class FunctionsTable:
         except Exception:
             return None
 
+    def get_function_updated_at_by_id(self, id: str) -> Optional[int]:
+        with get_db() as db:
+            return db.query(Function.updated_at).filter_by(id=id).scalar()
+
+    def get_functions_count_and_updated_at(self) -> tuple[int, Optional[int]]:
+        """Number of functions and their last update, moved by any change."""
+        with get_db() as db:
+            count, updated_at = db.query(
+                func.count(Function.id), func.max(Function.updated_at)
+            ).one()
+            return count, updated_at
+
     def get_functions(self, active_only=False) -> list[FunctionModel]:
         with get_db() as db:
             if active_only:
@@ -231,6 +271,7 @@ class FunctionsTable:
                 function.updated_at = int(time.time())
                 db.commit()
                 db.refresh(function)
+                FunctionsVersion.bump()
                 return self.get_function_by_id(id)
             except Exception:
                 return None
@@ -290,6 +331,7 @@ class FunctionsTable:
                     }
                 )
                 db.commit()
+                FunctionsVersion.bump()
                 return self.get_function_by_id(id)
             except Exception:
                 return None
@@ -304,6 +346,7 @@ class FunctionsTable:
                     }
                 )
                 db.commit()
+                FunctionsVersion.bump()
                 return True
             except Exception:
                 return None
@@ -313,6 +356,7 @@ class FunctionsTable:
             try:
                 db.query(Function).filter_by(id=id).delete()
                 db.commit()
+                FunctionsVersion.bump()
 
                 return True
             except Exception:
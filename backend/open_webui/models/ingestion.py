@@ -0,0 +1,242 @@
+import logging
+import time
+import uuid
+from typing import Optional
+
+from open_webui.internal.db import Base, get_db
+from open_webui.env import SRC_LOG_LEVELS
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import BigInteger, Column, Index, String, Text, or_
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MODELS"])
+
+####################
+# IngestionJob DB Schema
+####################
+
+
+class IngestionJob(Base):
+    __tablename__ = "ingestion_job"
+
+    id = Column(String, primary_key=True)
+    user_id = Column(String)
+
+    # "reindex" or "knowledge_files"
+    type = Column(String)
+    # "pending", "running", "completed", "failed" or "cancelled"
+    status = Column(String)
+
+    total = Column(BigInteger)
+    processed = Column(BigInteger)
+    failed = Column(BigInteger)
+    error = Column(Text, nullable=True)
+
+    # Bumped while running, a running job not updated for a while was lost
+    updated_at = Column(BigInteger)
+    created_at = Column(BigInteger)
+
+
+class IngestionJobItem(Base):
+    __tablename__ = "ingestion_job_item"
+
+    id = Column(String, primary_key=True)
+    job_id = Column(String)
+    collection_name = Column(String)
+    file_id = Column(String)
+
+    # "pending", "completed" or "failed"
+    status = Column(String)
+    error = Column(Text, nullable=True)
+
+    updated_at = Column(BigInteger)
+
+    __table_args__ = (
+        Index("ingestion_job_item_job_id_status_idx", "job_id", "status"),
+    )
+
+
+class IngestionJobModel(BaseModel):
+    id: str
+    user_id: str
+    type: str
+    status: str
+
+    total: int
+    processed: int
+    failed: int
+    error: Optional[str] = None
+
+    updated_at: int  # timestamp in epoch
+    created_at: int  # timestamp in epoch
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class IngestionJobItemModel(BaseModel):
+    id: str
+    job_id: str
+    collection_name: str
+    file_id: str
+    status: str
+    error: Optional[str] = None
+    updated_at: int  # timestamp in epoch
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+####################
+# Forms
+####################
+
+
+class IngestionJobResponse(IngestionJobModel):
+    failed_items: list[IngestionJobItemModel] = []
+
+
+class IngestionJobsTable:
+    def insert_new_job(
+        self, user_id: str, type: str, items: list[tuple[str, str]]
+    ) -> Optional[IngestionJobModel]:
+        """Create a job processing `items`, (collection_name, file_id) pairs."""
+        with get_db() as db:
+            now = int(time.time())
+            job = IngestionJob(
+                id=str(uuid.uuid4()),
+                user_id=user_id,
+                type=type,
+                status="pending",
+                total=len(items),
+                processed=0,
+                failed=0,
+                updated_at=now,
+                created_at=now,
+            )
+            db.add(job)
+            db.add_all(
+                [
+                    IngestionJobItem(
+                        id=str(uuid.uuid4()),
+                        job_id=job.id,
+                        collection_name=collection_name,
+                        file_id=file_id,
+                        status="pending",
+                        updated_at=now,
+                    )
+                    for collection_name, file_id in items
+                ]
+            )
+            db.commit()
+            db.refresh(job)
+            return IngestionJobModel.model_validate(job)
+
+    def get_job_by_id(self, id: str) -> Optional[IngestionJobModel]:
+        with get_db() as db:
+            job = db.get(IngestionJob, id)
+            return IngestionJobModel.model_validate(job) if job else None
+
+    def get_jobs(
+        self, user_id: Optional[str] = None, limit: int = 50
+    ) -> list[IngestionJobModel]:
+        with get_db() as db:
+            query = db.query(IngestionJob)
+            if user_id:
+                query = query.filter_by(user_id=user_id)
+            return [
+                IngestionJobModel.model_validate(job)
+                for job in query.order_by(IngestionJob.created_at.desc())
+                .limit(limit)
+                .all()
+            ]
+
+    def get_resumable_jobs(self, stale_before: int) -> list[IngestionJobModel]:
+        with get_db() as db:
+            return [
+                IngestionJobModel.model_validate(job)
+                for job in db.query(IngestionJob)
+                .filter(
+                    or_(
+                        IngestionJob.status == "pending",
+                        (IngestionJob.status == "running")
+                        & (IngestionJob.updated_at < stale_before),
+                    )
+                )
+                .order_by(IngestionJob.created_at)
+                .all()
+            ]
+
+    def claim_job(self, job: IngestionJobModel) -> bool:
+        """
+        Mark `job` running, only if it is still in the state it was read in:
+        of all the workers trying to pick it up, exactly one succeeds.
+        """
+        with get_db() as db:
+            result = (
+                db.query(IngestionJob)
+                .filter_by(id=job.id, status=job.status, updated_at=job.updated_at)
+                .update({"status": "running", "updated_at": int(time.time())})
+            )
+            db.commit()
+            return result == 1
+
+    def touch_job(self, id: str):
+        with get_db() as db:
+            db.query(IngestionJob).filter_by(id=id, status="running").update(
+                {"updated_at": int(time.time())}
+            )
+            db.commit()
+
+    def update_job_status(
+        self,
+        id: str,
+        status: str,
+        error: Optional[str] = None,
+        from_status: Optional[str] = None,
+    ) -> Optional[IngestionJobModel]:
+        """Set the job's status, only if it is `from_status` when given."""
+        with get_db() as db:
+            query = db.query(IngestionJob).filter_by(id=id)
+            if from_status:
+                query = query.filter_by(status=from_status)
+            query.update(
+                {"status": status, "error": error, "updated_at": int(time.time())}
+            )
+            db.commit()
+        return self.get_job_by_id(id)
+
+    def get_items_by_job_id(
+        self, job_id: str, status: Optional[str] = None
+    ) -> list[IngestionJobItemModel]:
+        with get_db() as db:
+            query = db.query(IngestionJobItem).filter_by(job_id=job_id)
+            if status:
+                query = query.filter_by(status=status)
+            return [IngestionJobItemModel.model_validate(item) for item in query.all()]
+
+    def complete_item(
+        self, item: IngestionJobItemModel, error: Optional[str] = None
+    ) -> Optional[IngestionJobModel]:
+        """Checkpoint `item` as done (or failed) and count it in its job's progress."""
+        with get_db() as db:
+            now = int(time.time())
+            updated = (
+                db.query(IngestionJobItem)
+                .filter_by(id=item.id, status="pending")
+                .update(
+                    {
+                        "status": "failed" if error else "completed",
+                        "error": error,
+                        "updated_at": now,
+                    }
+                )
+            )
+            if updated:
+                counter = IngestionJob.failed if error else IngestionJob.processed
+                db.query(IngestionJob).filter_by(id=item.job_id).update(
+                    {counter.key: counter + 1, "updated_at": now}
+                )
+            db.commit()
+        return self.get_job_by_id(item.job_id)
+
+
+IngestionJobs = IngestionJobsTable()
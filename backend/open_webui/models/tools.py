@@ -4,7 +4,17 @@ from typing import Optional
 
 from open_webui.internal.db import Base, JSONField, get_db
 from open_webui.models.users import Users, UserResponse
-from open_webui.env import SRC_LOG_LEVELS
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    REDIS_URL,
+    REDIS_SENTINEL_HOSTS,
+    REDIS_SENTINEL_PORT,
+)
+from open_webui.utils.redis import (
+    VersionCounter,
+    get_redis_connection,
+    get_sentinels_from_env,
+)
 from pydantic import BaseModel, ConfigDict
 from sqlalchemy import BigInteger, Column, String, Text, JSON
 
@@ -106,6 +116,22 @@ class ToolValves(BaseModel):
     valves: Optional[dict] = None
 
 
+# Bumped on every change to tools or their valves, so the modules loaded
+# from them are checked again in every worker
+ToolsVersion = VersionCounter(
+    "tools",
+    redis=(
+        get_redis_connection(
+            REDIS_URL,
+            get_sentinels_from_env(REDIS_SENTINEL_HOSTS, REDIS_SENTINEL_PORT),
+            decode_responses=True,
+        )
+        if REDIS_URL
+        else None
+    ),
+)
+
+
 class ToolsTable:
     def insert_new_tool(
         self, user_id: str, form_data: ToolForm, specs: list[dict]
@@ -126,6 +152,7 @@ class ToolsTable:
                 db.add(result)
                 db.commit()
                 db.refresh(result)
+                ToolsVersion.bump()
                 if result:
                     return ToolModel.model_validate(result)
                 else:
@@ -142,6 +169,10 @@ class ToolsTable:
         except Exception:
             return None
 
+    def get_tool_updated_at_by_id(self, id: str) -> Optional[int]:
+        with get_db() as db:
+            return db.query(Tool.updated_at).filter_by(id=id).scalar()
+
     def get_tools(self) -> list[ToolUserModel]:
         with get_db() as db:
             tools = []
@@ -185,6 +216,7 @@ class ToolsTable:
                     {"valves": valves, "updated_at": int(time.time())}
                 )
                 db.commit()
+                ToolsVersion.bump()
                 return self.get_tool_by_id(id)
         except Exception:
             return None
@@ -241,6 +273,7 @@ class ToolsTable:
                     {**updated, "updated_at": int(time.time())}
                 )
                 db.commit()
+                ToolsVersion.bump()
 
                 tool = db.query(Tool).get(id)
                 db.refresh(tool)
@@ -253,6 +286,7 @@ class ToolsTable:
             with get_db() as db:
                 db.query(Tool).filter_by(id=id).delete()
                 db.commit()
+                ToolsVersion.bump()
 
                 return True
         except Exception:
@@ -0,0 +1,427 @@
+import heapq
+import json
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Optional
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from open_webui.config import RAG_BM25_INDEX_DIR, RAG_BM25_INDEX_CACHE_SIZE
+from open_webui.env import SRC_LOG_LEVELS
+from open_webui.retrieval.vector.factory import VECTOR_DB_CLIENT
+from open_webui.retrieval.vector.main import GetResult
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+# Okapi BM25 parameters, same as rank_bm25 (used by langchain's BM25Retriever)
+K1 = 1.5
+B = 0.75
+
+# Stay under SQLite's limit on the number of bound parameters
+MAX_PARAMS = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS doc (
+    idx INTEGER PRIMARY KEY,
+    id TEXT UNIQUE NOT NULL,
+    file_id TEXT,
+    hash TEXT,
+    length INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    metadata TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS doc_file_id ON doc (file_id);
+CREATE INDEX IF NOT EXISTS doc_hash ON doc (hash);
+CREATE TABLE IF NOT EXISTS posting (
+    term TEXT NOT NULL,
+    doc INTEGER NOT NULL,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (term, doc)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS posting_doc ON posting (doc);
+CREATE TABLE IF NOT EXISTS stat (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def tokenize(text: str) -> list[str]:
+    return re.findall(r"\w+", text.lower())
+
+
+def get_signature(path: str) -> Optional[tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def _chunks(values: list, size: int = MAX_PARAMS):
+    for i in range(0, len(values), size):
+        yield values[i : i + size]
+
+
+class BM25Index:
+    """
+    The sparse lexical index of one collection: an inverted index (term ->
+    documents, term frequency) with the chunks' text and metadata, stored in a
+    SQLite file read through mmap.
+
+    Documents are added and removed incrementally, and a query only reads the
+    postings of its own terms and the text of the top hits.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA mmap_size=268435456")
+        self._conn.executescript(SCHEMA)
+        # (inode, mtime) of the file when it was opened or last written here
+        self.signature = get_signature(path)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # Used under `self.lock`. Closed by the cache while a query still held
+        # the index: reopen the file, but don't recreate a deleted one.
+        if self._conn is None:
+            self._conn = sqlite3.connect(
+                f"file:{self.path}?mode=rw", uri=True, check_same_thread=False
+            )
+            self._conn.execute("PRAGMA mmap_size=268435456")
+        return self._conn
+
+    def _get_stats(self) -> tuple[int, int]:
+        stats = dict(self.conn.execute("SELECT key, value FROM stat").fetchall())
+        return stats.get("doc_count", 0), stats.get("total_length", 0)
+
+    def _update_stats(self, doc_count: int, total_length: int):
+        self.conn.executemany(
+            "INSERT INTO stat (key, value) VALUES (?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = value + excluded.value",
+            [("doc_count", doc_count), ("total_length", total_length)],
+        )
+
+    def _delete_docs(self, idxs: list[int]):
+        total_length = 0
+        for chunk in _chunks(idxs):
+            placeholders = ",".join("?" * len(chunk))
+            (length,) = self.conn.execute(
+                f"SELECT COALESCE(SUM(length), 0) FROM doc WHERE idx IN ({placeholders})",
+                chunk,
+            ).fetchone()
+            total_length += length
+
+            self.conn.execute(
+                f"DELETE FROM posting WHERE doc IN ({placeholders})", chunk
+            )
+            self.conn.execute(f"DELETE FROM doc WHERE idx IN ({placeholders})", chunk)
+
+        self._update_stats(-len(idxs), -total_length)
+
+    def add(self, items: list[dict]):
+        """Index `items` ({"id", "text", "metadata"}), replacing documents with the same id."""
+        with self.lock, self.conn:
+            ids = [item["id"] for item in items]
+            existing = []
+            for chunk in _chunks(ids):
+                existing += [
+                    idx
+                    for (idx,) in self.conn.execute(
+                        f"SELECT idx FROM doc WHERE id IN ({','.join('?' * len(chunk))})",
+                        chunk,
+                    )
+                ]
+            if existing:
+                self._delete_docs(existing)
+
+            total_length = 0
+            for item in items:
+                metadata = item.get("metadata") or {}
+                counts = Counter(tokenize(item["text"]))
+                length = sum(counts.values())
+                total_length += length
+
+                cursor = self.conn.execute(
+                    "INSERT INTO doc (id, file_id, hash, length, text, metadata) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        item["id"],
+                        metadata.get("file_id"),
+                        metadata.get("hash"),
+                        length,
+                        item["text"],
+                        json.dumps(metadata),
+                    ),
+                )
+                self.conn.executemany(
+                    "INSERT INTO posting (term, doc, tf) VALUES (?, ?, ?)",
+                    [(term, cursor.lastrowid, tf) for term, tf in counts.items()],
+                )
+
+            self._update_stats(len(items), total_length)
+
+    def delete(
+        self,
+        ids: Optional[list[str]] = None,
+        file_id: Optional[str] = None,
+        hash: Optional[str] = None,
+    ):
+        conditions, params = [], []
+        if ids is not None:
+            conditions.append(f"id IN ({','.join('?' * len(ids))})")
+            params += ids
+        if file_id is not None:
+            conditions.append("file_id = ?")
+            params.append(file_id)
+        if hash is not None:
+            conditions.append("hash = ?")
+            params.append(hash)
+        if not conditions:
+            return
+
+        with self.lock, self.conn:
+            idxs = [
+                idx
+                for (idx,) in self.conn.execute(
+                    f"SELECT idx FROM doc WHERE {' AND '.join(conditions)}", params
+                )
+            ]
+            if idxs:
+                self._delete_docs(idxs)
+
+    def search(self, query: str, k: int) -> list[tuple[float, str, dict]]:
+        """The top `k` (score, text, metadata) for `query`."""
+        terms = list(set(tokenize(query)))
+        if not terms or k <= 0:
+            return []
+
+        with self.lock:
+            doc_count, total_length = self._get_stats()
+            if doc_count <= 0:
+                return []
+            avg_length = total_length / doc_count
+
+            scores: dict[int, float] = {}
+            for term in terms:
+                postings = self.conn.execute(
+                    "SELECT posting.doc, posting.tf, doc.length FROM posting "
+                    "JOIN doc ON doc.idx = posting.doc WHERE posting.term = ?",
+                    (term,),
+                ).fetchall()
+                if not postings:
+                    continue
+
+                df = len(postings)
+                idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+                for doc, tf, length in postings:
+                    scores[doc] = scores.get(doc, 0.0) + idf * (
+                        tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / avg_length))
+                    )
+
+            top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+            if not top:
+                return []
+
+            rows = dict(
+                (idx, (text, metadata))
+                for idx, text, metadata in self.conn.execute(
+                    f"SELECT idx, text, metadata FROM doc WHERE idx IN ({','.join('?' * len(top))})",
+                    [idx for idx, _ in top],
+                )
+            )
+
+        return [
+            (score, rows[idx][0], json.loads(rows[idx][1]))
+            for idx, score in top
+            if idx in rows
+        ]
+
+    def close(self):
+        with self.lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class BM25IndexCache:
+    """
+    The BM25 indexes of all collections, one file each under `index_dir`,
+    with up to the `size` most recently used kept open.
+
+    Collections ingested before indexes existed are indexed from the vector
+    DB on first use.
+    """
+
+    def __init__(self, index_dir: str, size: int = 64):
+        self.index_dir = index_dir
+        self.size = size
+        self.lock = threading.Lock()
+        self.indexes: OrderedDict[str, BM25Index] = OrderedDict()
+        self.stats = {"searches": 0, "builds": 0, "updates": 0}
+        os.makedirs(index_dir, exist_ok=True)
+
+    def _get_path(self, collection_name: str) -> str:
+        if not re.fullmatch(r"[\w\-]+", collection_name):
+            collection_name = re.sub(r"[^\w\-]", "_", collection_name)
+        return os.path.join(self.index_dir, f"{collection_name}.sqlite")
+
+    def _open(self, collection_name: str, create: bool) -> Optional[BM25Index]:
+        with self.lock:
+            path = self._get_path(collection_name)
+            signature = get_signature(path)
+
+            index = self.indexes.get(collection_name)
+            if index is not None:
+                if index.signature == signature:
+                    self.indexes.move_to_end(collection_name)
+                    return index
+                # Deleted, rebuilt or written by another worker
+                self.indexes.pop(collection_name)
+                index.close()
+
+            if not create and signature is None:
+                return None
+
+            index = BM25Index(path)
+            self.indexes[collection_name] = index
+            while len(self.indexes) > self.size:
+                _, evicted = self.indexes.popitem(last=False)
+                evicted.close()
+            return index
+
+    def get(
+        self, collection_name: str, collection_result: Optional[GetResult] = None
+    ) -> Optional[BM25Index]:
+        """The collection's index, built from the vector DB if it doesn't exist yet."""
+        index = self._open(collection_name, create=False)
+        if index is not None:
+            return index
+
+        if collection_result is None:
+            collection_result = VECTOR_DB_CLIENT.get(collection_name=collection_name)
+        if collection_result is None:
+            return None
+
+        log.info(f"Building BM25 index for collection {collection_name}")
+        self.stats["builds"] += 1
+        return self.build(collection_name, collection_result)
+
+    def build(self, collection_name: str, collection_result: GetResult) -> BM25Index:
+        path = self._get_path(collection_name)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        try:
+            index = BM25Index(tmp_path)
+            index.add(
+                [
+                    {"id": id, "text": text, "metadata": metadata}
+                    for id, text, metadata in zip(
+                        collection_result.ids[0],
+                        collection_result.documents[0],
+                        collection_result.metadatas[0],
+                    )
+                ]
+            )
+            with index.lock:
+                index.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                index.conn.execute("PRAGMA journal_mode=DELETE")
+            index.close()
+            os.replace(tmp_path, path)
+        except Exception:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(f"{tmp_path}{suffix}"):
+                    os.remove(f"{tmp_path}{suffix}")
+            raise
+
+        with self.lock:
+            index = self.indexes.pop(collection_name, None)
+            if index is not None:
+                index.close()
+        return self._open(collection_name, create=False)
+
+    def add(self, collection_name: str, items: list[dict], create: bool = False):
+        """
+        Index newly inserted items. Unless `create` (a new collection), nothing
+        is done for collections without an index: it'll be built in full later.
+        """
+        index = self._open(collection_name, create=create)
+        if index is not None:
+            self.stats["updates"] += 1
+            index.add(items)
+            index.signature = get_signature(index.path)
+
+    def delete(self, collection_name: str, **filter):
+        index = self._open(collection_name, create=False)
+        if index is not None:
+            self.stats["updates"] += 1
+            index.delete(**filter)
+            index.signature = get_signature(index.path)
+
+    def search(
+        self,
+        collection_name: str,
+        query: str,
+        k: int,
+        collection_result: Optional[GetResult] = None,
+    ) -> list[tuple[float, str, dict]]:
+        index = self.get(collection_name, collection_result)
+        if index is None:
+            return []
+        self.stats["searches"] += 1
+        return index.search(query, k)
+
+    def delete_collection(self, collection_name: str):
+        with self.lock:
+            index = self.indexes.pop(collection_name, None)
+            if index is not None:
+                index.close()
+            path = self._get_path(collection_name)
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(f"{path}{suffix}"):
+                    os.remove(f"{path}{suffix}")
+
+    def reset(self):
+        with self.lock:
+            for index in self.indexes.values():
+                index.close()
+            self.indexes.clear()
+            for name in os.listdir(self.index_dir):
+                os.remove(os.path.join(self.index_dir, name))
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "open": len(self.indexes), "size": self.size}
+
+
+class BM25IndexRetriever(BaseRetriever):
+    collection_name: str
+    top_k: int
+    collection_result: Optional[Any] = None
+
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: CallbackManagerForRetrieverRun,
+    ) -> list[Document]:
+        return [
+            Document(page_content=text, metadata=metadata)
+            for _, text, metadata in BM25_INDEXES.search(
+                self.collection_name, query, self.top_k, self.collection_result
+            )
+        ]
+
+
+BM25_INDEXES = BM25IndexCache(RAG_BM25_INDEX_DIR, RAG_BM25_INDEX_CACHE_SIZE)
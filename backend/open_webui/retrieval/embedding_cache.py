@@ -0,0 +1,200 @@
+import hashlib
+import logging
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from open_webui.config import RAG_EMBEDDING_CACHE_SIZE, RAG_EMBEDDING_CACHE_TTL
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    REDIS_URL,
+    REDIS_SENTINEL_HOSTS,
+    REDIS_SENTINEL_PORT,
+)
+from open_webui.utils.redis import get_redis_connection, get_sentinels_from_env
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+REDIS_KEY_PREFIX = "open-webui:embeddings"
+
+# Keys deleted per Redis call by `clear`
+CLEAR_BATCH_SIZE = 1000
+
+
+class EmbeddingCache:
+    """
+    Cache of query embeddings keyed by (engine, model, URL, prefix, text hash).
+
+    A bounded LRU (with TTL) in each worker, backed by Redis when configured
+    so workers share what they embedded. Redis entries expire after the same
+    TTL and are stored as float32.
+    """
+
+    def __init__(self, redis=None, size: int = 10000, ttl: int = 86400):
+        self.redis = redis
+        self.size = size
+        self.ttl = ttl
+
+        self.lock = threading.Lock()
+        # {key: (expires_at, embedding)}
+        self.entries: OrderedDict[str, tuple[float, list[float]]] = OrderedDict()
+
+        self.stats = {
+            "hits": 0,
+            "redis_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "invalidations": 0,
+        }
+
+    @staticmethod
+    def get_key(
+        engine: str,
+        model: str,
+        prefix: Optional[str],
+        text: str,
+        url: Optional[str] = None,
+    ) -> str:
+        # Two endpoints may serve different models under the same name
+        url = (url or "").rstrip("/")
+        text_hash = hashlib.sha256(text.encode()).hexdigest()
+        return hashlib.sha256(
+            "\0".join([engine, model, url, prefix or "", text_hash]).encode()
+        ).hexdigest()
+
+    def _set_local(self, key: str, embedding: list[float]):
+        self.entries[key] = (time.time() + self.ttl, embedding)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def get_many(self, keys: list[str]) -> list[Optional[list[float]]]:
+        embeddings = [None] * len(keys)
+        now = time.time()
+
+        with self.lock:
+            for i, key in enumerate(keys):
+                entry = self.entries.get(key)
+                if entry is None:
+                    continue
+                if entry[0] < now:
+                    del self.entries[key]
+                    continue
+                self.entries.move_to_end(key)
+                embeddings[i] = entry[1]
+                self.stats["hits"] += 1
+
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing and self.redis is not None:
+            try:
+                values = self.redis.mget(
+                    [f"{REDIS_KEY_PREFIX}:{keys[i]}" for i in missing]
+                )
+            except Exception as e:
+                log.warning(f"Error reading embeddings from Redis: {e}")
+                values = [None] * len(missing)
+
+            with self.lock:
+                for i, value in zip(missing, values):
+                    if value is None:
+                        continue
+                    embeddings[i] = array("f", value).tolist()
+                    self._set_local(keys[i], embeddings[i])
+                    self.stats["redis_hits"] += 1
+
+        with self.lock:
+            self.stats["misses"] += sum(1 for e in embeddings if e is None)
+        return embeddings
+
+    def set_many(self, items: dict[str, list[float]]):
+        with self.lock:
+            for key, embedding in items.items():
+                self._set_local(key, embedding)
+
+        if self.redis is not None and items:
+            try:
+                pipe = self.redis.pipeline(transaction=False)
+                for key, embedding in items.items():
+                    pipe.set(
+                        f"{REDIS_KEY_PREFIX}:{key}",
+                        array("f", embedding).tobytes(),
+                        ex=self.ttl,
+                    )
+                pipe.execute()
+            except Exception as e:
+                log.warning(f"Error writing embeddings to Redis: {e}")
+
+    def clear(self):
+        """Drop every entry, e.g. when the embedding model changes."""
+        with self.lock:
+            self.entries.clear()
+            self.stats["invalidations"] += 1
+
+        if self.redis is not None:
+            try:
+                batch = []
+                for redis_key in self.redis.scan_iter(
+                    f"{REDIS_KEY_PREFIX}:*", count=CLEAR_BATCH_SIZE
+                ):
+                    batch.append(redis_key)
+                    if len(batch) >= CLEAR_BATCH_SIZE:
+                        self.redis.delete(*batch)
+                        batch = []
+                if batch:
+                    self.redis.delete(*batch)
+            except Exception as e:
+                log.warning(f"Error clearing embeddings from Redis: {e}")
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "entries": len(self.entries), "size": self.size}
+
+
+def get_cached_embedding_function(
+    embedding_function: Callable,
+    engine: str,
+    model: str,
+    cache: EmbeddingCache,
+    url: Optional[str] = None,
+) -> Callable:
+    """Wrap `embedding_function` (see `get_embedding_function`) to go through `cache`."""
+
+    def cached_embedding_function(query, prefix=None, user=None):
+        texts = query if isinstance(query, list) else [query]
+        keys = [cache.get_key(engine, model, prefix, text, url) for text in texts]
+        embeddings = cache.get_many(keys)
+
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            computed = embedding_function(
+                [texts[i] for i in missing], prefix=prefix, user=user
+            )
+            if computed is None:
+                # Embedding failed, nothing to cache
+                return None
+
+            cache.set_many({keys[i]: computed[j] for j, i in enumerate(missing)})
+            for j, i in enumerate(missing):
+                embeddings[i] = computed[j]
+
+        return embeddings if isinstance(query, list) else embeddings[0]
+
+    return cached_embedding_function
+
+
+EMBEDDING_CACHE = EmbeddingCache(
+    redis=(
+        get_redis_connection(
+            REDIS_URL,
+            get_sentinels_from_env(REDIS_SENTINEL_HOSTS, REDIS_SENTINEL_PORT),
+            decode_responses=False,
+        )
+        if REDIS_URL
+        else None
+    ),
+    size=RAG_EMBEDDING_CACHE_SIZE,
+    ttl=RAG_EMBEDDING_CACHE_TTL,
+)
@@ -1,5 +1,8 @@
+import asyncio
+import json
 import logging
 import os
+import time
 from typing import Optional, Union
 
 import requests
@@ -8,7 +11,6 @@ from concurrent.futures import ThreadPoolExecutor
 
 from huggingface_hub import snapshot_download
 from langchain.retrievers import ContextualCompressionRetriever, EnsembleRetriever
-from langchain_community.retrievers import BM25Retriever
 from langchain_core.documents import Document
 
 from open_webui.config import VECTOR_DB
@@ -16,8 +18,14 @@ from open_webui.retrieval.vector.factory import VECTOR_DB_CLIENT
 
 from open_webui.models.users import UserModel
 from open_webui.models.files import Files
+from open_webui.models.embeddings import ChunkEmbeddings
 
 from open_webui.retrieval.vector.main import GetResult
+from open_webui.retrieval.bm25 import BM25_INDEXES, BM25IndexRetriever
+from open_webui.retrieval.embedding_cache import (
+    EmbeddingCache,
+    get_cached_embedding_function,
+)
 
 
 from open_webui.env import (
@@ -29,11 +37,18 @@ from open_webui.config import (
     RAG_EMBEDDING_QUERY_PREFIX,
     RAG_EMBEDDING_CONTENT_PREFIX,
     RAG_EMBEDDING_PREFIX_FIELD_NAME,
+    ENABLE_RAG_CHUNK_EMBEDDING_STORE,
+    RAG_CHUNK_EMBEDDING_STORE_TTL,
+    RAG_RERANKING_BATCH_SIZE,
+    RAG_RERANKING_SCORE_CACHE_SIZE,
 )
 
 log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["RAG"])
 
+# How often expired chunk embeddings are removed (seconds)
+CHUNK_EMBEDDING_CLEANUP_INTERVAL = 60 * 60
+
 
 from typing import Any
 
@@ -109,7 +124,6 @@ def get_doc(collection_name: str, user: UserModel = None):
 
 def query_doc_with_hybrid_search(
     collection_name: str,
-    collection_result: GetResult,
     query: str,
     embedding_function,
     k: int,
@@ -117,14 +131,18 @@ def query_doc_with_hybrid_search(
     k_reranker: int,
     r: float,
     hybrid_bm25_weight: float,
+    collection_result: Optional[GetResult] = None,
+    embedding_config: Optional[dict] = None,
 ) -> dict:
     try:
         log.debug(f"query_doc_with_hybrid_search:doc {collection_name}")
-        bm25_retriever = BM25Retriever.from_texts(
-            texts=collection_result.documents[0],
-            metadatas=collection_result.metadatas[0],
+        # Served from the collection's persistent BM25 index,
+        # `collection_result` is only used to build it if missing
+        bm25_retriever = BM25IndexRetriever(
+            collection_name=collection_name,
+            top_k=k,
+            collection_result=collection_result,
         )
-        bm25_retriever.k = k
 
         vector_search_retriever = VectorSearchRetriever(
             collection_name=collection_name,
@@ -148,6 +166,7 @@ def query_doc_with_hybrid_search(
 
         compressor = RerankCompressor(
             embedding_function=embedding_function,
+            embedding_config=embedding_config,
             top_n=k_reranker,
             reranking_function=reranking_function,
             r_score=r,
@@ -326,23 +345,22 @@ def query_collection_with_hybrid_search(
     k_reranker: int,
     r: float,
     hybrid_bm25_weight: float,
+    embedding_config: Optional[dict] = None,
 ) -> dict:
     results = []
     error = False
-    # Fetch collection data once per collection sequentially
-    # Avoid fetching the same data multiple times later
-    collection_results = {}
+    # Make sure every collection has its BM25 index, sequentially,
+    # so collections indexed before are not built once per query
+    bm25_indexes = {}
     for collection_name in collection_names:
         try:
             log.debug(
-                f"query_collection_with_hybrid_search:VECTOR_DB_CLIENT.get:collection {collection_name}"
-            )
-            collection_results[collection_name] = VECTOR_DB_CLIENT.get(
-                collection_name=collection_name
+                f"query_collection_with_hybrid_search:BM25_INDEXES.get:collection {collection_name}"
             )
+            bm25_indexes[collection_name] = BM25_INDEXES.get(collection_name)
         except Exception as e:
-            log.exception(f"Failed to fetch collection {collection_name}: {e}")
-            collection_results[collection_name] = None
+            log.exception(f"Failed to load BM25 index of {collection_name}: {e}")
+            bm25_indexes[collection_name] = None
 
     log.info(
         f"Starting hybrid search for {len(queries)} queries in {len(collection_names)} collections..."
@@ -352,7 +370,6 @@ def query_collection_with_hybrid_search(
         try:
             result = query_doc_with_hybrid_search(
                 collection_name=collection_name,
-                collection_result=collection_results[collection_name],
                 query=query,
                 embedding_function=embedding_function,
                 k=k,
@@ -360,6 +377,7 @@ def query_collection_with_hybrid_search(
                 k_reranker=k_reranker,
                 r=r,
                 hybrid_bm25_weight=hybrid_bm25_weight,
+                embedding_config=embedding_config,
             )
             return result, None
         except Exception as e:
@@ -367,11 +385,11 @@ def query_collection_with_hybrid_search(
             return None, e
 
     # Prepare tasks for all collections and queries
-    # Avoid running any tasks for collections that failed to fetch data (have assigned None)
+    # Avoid running any tasks for collections that failed to load (have assigned None)
     tasks = [
         (cn, q)
         for cn in collection_names
-        if collection_results[cn] is not None
+        if bm25_indexes[cn] is not None
         for q in queries
     ]
 
@@ -400,7 +418,24 @@ def get_embedding_function(
     url,
     key,
     embedding_batch_size,
+    embedding_cache: Optional[EmbeddingCache] = None,
 ):
+    if embedding_cache is not None:
+        return get_cached_embedding_function(
+            get_embedding_function(
+                embedding_engine,
+                embedding_model,
+                embedding_function,
+                url,
+                key,
+                embedding_batch_size,
+            ),
+            embedding_engine,
+            embedding_model,
+            embedding_cache,
+            url if embedding_engine in ["ollama", "openai"] else None,
+        )
+
     if embedding_engine == "":
         return lambda query, prefix=None, user=None: embedding_function.encode(
             query, **({"prompt": prefix} if prefix else {})
@@ -438,6 +473,82 @@ def get_embedding_function(
         raise ValueError(f"Unknown embedding engine: {embedding_engine}")
 
 
+def get_embedding_config_key(
+    embedding_engine: str, embedding_model: str, url: Optional[str] = None
+) -> str:
+    # Two endpoints may serve different models under the same name
+    if embedding_engine in ["ollama", "openai"] and url:
+        url = url.rstrip("/")
+    else:
+        url = None
+
+    return hashlib.sha256(
+        json.dumps(
+            [
+                embedding_engine,
+                embedding_model,
+                RAG_EMBEDDING_CONTENT_PREFIX,
+                RAG_EMBEDDING_PREFIX_FIELD_NAME,
+            ]
+            + ([url] if url else [])
+        ).encode()
+    ).hexdigest()
+
+
+def get_current_embedding_config(config) -> dict:
+    """The embedding engine, model and base URL chunks are ingested with."""
+    return {
+        "engine": config.RAG_EMBEDDING_ENGINE,
+        "model": config.RAG_EMBEDDING_MODEL,
+        "url": (
+            config.RAG_OPENAI_API_BASE_URL
+            if config.RAG_EMBEDDING_ENGINE == "openai"
+            else config.RAG_OLLAMA_BASE_URL
+        ),
+    }
+
+
+def generate_chunk_embeddings(
+    embedding_function,
+    embedding_engine: str,
+    embedding_model: str,
+    texts: list[str],
+    user: UserModel = None,
+    url: Optional[str] = None,
+) -> list[list[float]]:
+    """
+    Embeddings of the chunks being ingested. Chunks already embedded with the
+    same config (in any collection, or before a reindex) reuse the stored
+    vector, only new chunks are sent to the embedding function.
+    """
+    if not ENABLE_RAG_CHUNK_EMBEDDING_STORE:
+        return embedding_function(texts, prefix=RAG_EMBEDDING_CONTENT_PREFIX, user=user)
+
+    config = get_embedding_config_key(embedding_engine, embedding_model, url)
+    hashes = [hashlib.sha256(text.encode()).hexdigest() for text in texts]
+
+    embeddings = ChunkEmbeddings.get_embeddings(config, list(set(hashes)))
+    missing = {}
+    for hash, text in zip(hashes, texts):
+        if hash not in embeddings:
+            missing.setdefault(hash, text)
+
+    log.info(f"generate_chunk_embeddings: {len(texts)} chunks, {len(missing)} to embed")
+
+    if missing:
+        new_embeddings = embedding_function(
+            list(missing.values()), prefix=RAG_EMBEDDING_CONTENT_PREFIX, user=user
+        )
+        if new_embeddings is None:
+            raise Exception("Failed to generate embeddings")
+
+        new_embeddings = dict(zip(missing, new_embeddings))
+        ChunkEmbeddings.insert_embeddings(config, new_embeddings)
+        embeddings.update(new_embeddings)
+
+    return [embeddings[hash] for hash in hashes]
+
+
 def get_sources_from_files(
     request,
     files,
@@ -566,6 +677,9 @@ def get_sources_from_files(
                                     k_reranker=k_reranker,
                                     r=r,
                                     hybrid_bm25_weight=hybrid_bm25_weight,
+                                    embedding_config=get_current_embedding_config(
+                                        request.app.state.config
+                                    ),
                                 )
                             except Exception as e:
                                 log.debug(
@@ -797,14 +911,159 @@ def generate_embeddings(
 
 
 import operator
+import threading
+import weakref
+from collections import OrderedDict
 from typing import Optional, Sequence
 
+import numpy as np
+
 from langchain_core.callbacks import Callbacks
 from langchain_core.documents import BaseDocumentCompressor, Document
 
 
+class RerankScoreCache:
+    """
+    Reranking scores by (query, chunk hash), for each reranking model object.
+    A model replaced by a config change takes its scores with it.
+    """
+
+    def __init__(self, size: int = 10000):
+        self.size = size
+        self.lock = threading.Lock()
+        self.scores: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get_scores(
+        self, reranking_function, query: str, texts: list[str], batch_size: int
+    ) -> list[float]:
+        keys = [
+            hashlib.sha256(
+                f"{query}\0{hashlib.sha256(text.encode()).hexdigest()}".encode()
+            ).hexdigest()
+            for text in texts
+        ]
+
+        scores = [None] * len(texts)
+        with self.lock:
+            cache = self.scores.setdefault(reranking_function, OrderedDict())
+            for i, key in enumerate(keys):
+                if key in cache:
+                    cache.move_to_end(key)
+                    scores[i] = cache[key]
+            missing = [i for i, score in enumerate(scores) if score is None]
+            self.stats["hits"] += len(texts) - len(missing)
+            self.stats["misses"] += len(missing)
+
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start : start + batch_size]
+            batch_scores = reranking_function.predict(
+                [(query, texts[i]) for i in batch]
+            )
+            for i, score in zip(batch, batch_scores):
+                scores[i] = float(score)
+
+        if missing:
+            with self.lock:
+                for i in missing:
+                    cache[keys[i]] = scores[i]
+                while len(cache) > self.size:
+                    cache.popitem(last=False)
+
+        return scores
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "models": len(self.scores),
+            "entries": sum(len(cache) for cache in self.scores.values()),
+        }
+
+
+RERANK_SCORES = RerankScoreCache(RAG_RERANKING_SCORE_CACHE_SIZE)
+
+
+def get_document_embeddings(
+    embedding_function,
+    documents: Sequence[Document],
+    embedding_config: Optional[dict] = None,
+) -> list[list[float]]:
+    """
+    Embeddings of retrieved documents: the vectors stored for their chunks at
+    ingestion (see `generate_chunk_embeddings`), only the others are embedded.
+
+    The store is only used for documents ingested with `embedding_config`,
+    the model `embedding_function` embeds with.
+    """
+    # As embedded at ingestion
+    texts = [doc.page_content.replace("\n", " ") for doc in documents]
+    hashes = [hashlib.sha256(text.encode()).hexdigest() for text in texts]
+    embeddings = [None] * len(documents)
+
+    config = None
+    stored_indexes = []
+    if ENABLE_RAG_CHUNK_EMBEDDING_STORE and embedding_config is not None:
+        config = get_embedding_config_key(
+            embedding_config["engine"],
+            embedding_config["model"],
+            embedding_config.get("url"),
+        )
+        for i, doc in enumerate(documents):
+            try:
+                doc_config = json.loads(doc.metadata["embedding_config"])
+            except Exception:
+                continue
+            # Not reindexed since the model changed
+            if (doc_config.get("engine"), doc_config.get("model")) == (
+                embedding_config["engine"],
+                embedding_config["model"],
+            ):
+                stored_indexes.append(i)
+
+        stored = ChunkEmbeddings.get_embeddings(
+            config, list({hashes[i] for i in stored_indexes})
+        )
+        for i in stored_indexes:
+            embeddings[i] = stored.get(hashes[i])
+
+    missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+    if missing:
+        new_embeddings = embedding_function(
+            [texts[i] for i in missing], RAG_EMBEDDING_CONTENT_PREFIX
+        )
+        for i, embedding in zip(missing, new_embeddings):
+            embeddings[i] = embedding
+
+        if config is not None:
+            missing = set(missing)
+            ChunkEmbeddings.insert_embeddings(
+                config,
+                {hashes[i]: embeddings[i] for i in stored_indexes if i in missing},
+            )
+
+    return embeddings
+
+
+async def periodic_chunk_embedding_cleanup():
+    if not ENABLE_RAG_CHUNK_EMBEDDING_STORE or not RAG_CHUNK_EMBEDDING_STORE_TTL:
+        return
+
+    while True:
+        try:
+            count = await asyncio.to_thread(
+                ChunkEmbeddings.delete_embeddings_older_than,
+                int(time.time()) - RAG_CHUNK_EMBEDDING_STORE_TTL,
+            )
+            if count:
+                log.info(f"Removed {count} expired chunk embeddings")
+        except Exception as e:
+            log.exception(f"Error removing expired chunk embeddings: {e}")
+        await asyncio.sleep(CHUNK_EMBEDDING_CLEANUP_INTERVAL)
+
+
 class RerankCompressor(BaseDocumentCompressor):
     embedding_function: Any
+    embedding_config: Optional[dict] = None
     top_n: int
     reranking_function: Any
     r_score: float
@@ -821,18 +1080,33 @@ class RerankCompressor(BaseDocumentCompressor):
     ) -> Sequence[Document]:
         reranking = self.reranking_function is not None
 
+        if not documents:
+            return []
+
         if reranking:
-            scores = self.reranking_function.predict(
-                [(query, doc.page_content) for doc in documents]
+            scores = RERANK_SCORES.get_scores(
+                self.reranking_function,
+                query,
+                [doc.page_content for doc in documents],
+                RAG_RERANKING_BATCH_SIZE,
             )
         else:
-            from sentence_transformers import util
+            query_embedding = np.asarray(
+                self.embedding_function(query, RAG_EMBEDDING_QUERY_PREFIX),
+                dtype=np.float32,
+            )
+            document_embeddings = np.asarray(
+                get_document_embeddings(
+                    self.embedding_function, documents, self.embedding_config
+                ),
+                dtype=np.float32,
+            )
 
-            query_embedding = self.embedding_function(query, RAG_EMBEDDING_QUERY_PREFIX)
-            document_embedding = self.embedding_function(
-                [doc.page_content for doc in documents], RAG_EMBEDDING_CONTENT_PREFIX
+            # Cosine similarity of the query with every document at once
+            norms = np.linalg.norm(document_embeddings, axis=1) * np.linalg.norm(
+                query_embedding
             )
-            scores = util.cos_sim(query_embedding, document_embedding)[0]
+            scores = (document_embeddings @ query_embedding) / np.maximum(norms, 1e-12)
 
         docs_with_scores = list(
             zip(documents, scores.tolist() if not isinstance(scores, list) else scores)
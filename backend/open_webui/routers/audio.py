@@ -1,15 +1,21 @@
+import asyncio
 import hashlib
 import json
 import logging
 import os
+import shutil
+import subprocess
+import tempfile
 import uuid
+import wave
 from functools import lru_cache
 from pathlib import Path
 from pydub import AudioSegment
-from pydub.silence import split_on_silence
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from typing import Optional
 
+import numpy as np
+
 
 import aiohttp
 import aiofiles
@@ -28,16 +34,21 @@ from fastapi import (
     APIRouter,
 )
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 
 
 from open_webui.utils.auth import get_admin_user, get_verified_user
+from open_webui.utils.speech_cache import SpeechFileCache
 from open_webui.config import (
     WHISPER_MODEL_AUTO_UPDATE,
     WHISPER_MODEL_DIR,
     CACHE_DIR,
     WHISPER_LANGUAGE,
+    AUDIO_STT_CHUNK_SECONDS,
+    AUDIO_STT_MAX_WORKERS,
+    AUDIO_TTS_CACHE_MAX_SIZE,
+    AUDIO_TTS_CACHE_TTL,
 )
 
 from open_webui.constants import ERROR_MESSAGES
@@ -65,6 +76,27 @@ log.setLevel(SRC_LOG_LEVELS["AUDIO"])
 SPEECH_CACHE_DIR = CACHE_DIR / "audio" / "speech"
 SPEECH_CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
+SpeechCache = SpeechFileCache(
+    SPEECH_CACHE_DIR,
+    max_size=AUDIO_TTS_CACHE_MAX_SIZE * 1024 * 1024,
+    ttl=AUDIO_TTS_CACHE_TTL,
+)
+
+TRANSCRIPTION_DIR = CACHE_DIR / "audio" / "transcriptions"
+TRANSCRIPTION_DIR.mkdir(parents=True, exist_ok=True)
+
+# Audio is decoded once to 16 kHz mono 16-bit PCM, chunks are sent as WAV
+STT_SAMPLE_RATE = 16000
+STT_BYTES_PER_SECOND = STT_SAMPLE_RATE * 2
+# Chunks are cut in the quietest 100ms of the last seconds before their bound
+STT_SILENCE_FRAME_BYTES = STT_BYTES_PER_SECOND // 10
+STT_SILENCE_SEARCH_SECONDS = 15
+
+# Shared by all transcriptions, so concurrent uploads can't pile up threads
+TRANSCRIPTION_EXECUTOR = ThreadPoolExecutor(
+    max_workers=max(AUDIO_STT_MAX_WORKERS, 1), thread_name_prefix="transcription"
+)
+
 
 ##########################################
 #
@@ -109,17 +141,87 @@ def is_audio_conversion_required(file_path):
         return False
 
 
-def convert_audio_to_mp3(file_path):
-    """Convert audio file to mp3 format."""
-    try:
-        output_path = os.path.splitext(file_path)[0] + ".mp3"
-        audio = AudioSegment.from_file(file_path)
-        audio.export(output_path, format="mp3")
-        log.info(f"Converted {file_path} to {output_path}")
-        return output_path
-    except Exception as e:
-        log.error(f"Error converting audio file: {e}")
-        return None
+def decode_audio_to_pcm(file_path: str, pcm_path: str):
+    """
+    Decode an audio/video file to 16 kHz mono 16-bit PCM, written to disk by
+    ffmpeg as it goes instead of being held in memory.
+    """
+    result = subprocess.run(
+        [
+            AudioSegment.converter,
+            "-nostdin",
+            "-y",
+            "-i",
+            file_path,
+            "-vn",
+            "-ac",
+            "1",
+            "-ar",
+            str(STT_SAMPLE_RATE),
+            "-f",
+            "s16le",
+            "-acodec",
+            "pcm_s16le",
+            pcm_path,
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    if result.returncode != 0:
+        error = result.stderr.decode("utf-8", errors="replace").strip()
+        raise Exception(f"Error decoding audio: {error.splitlines()[-1:]}")
+
+
+def get_pcm_chunks(pcm_path: str, max_seconds: int):
+    """
+    Yield the (start, end) byte offsets of chunks of at most `max_seconds` of
+    the PCM file, each cut in the quietest 100ms before its time bound so
+    words are not split. Only the searched windows are read.
+    """
+    size = os.path.getsize(pcm_path) // 2 * 2
+    max_bytes = max(max_seconds, 1) * STT_BYTES_PER_SECOND
+    frame = STT_SILENCE_FRAME_BYTES
+
+    with open(pcm_path, "rb") as f:
+        start = 0
+        while start < size:
+            end = start + max_bytes
+            if end >= size:
+                yield start, size
+                return
+
+            search = min(
+                STT_SILENCE_SEARCH_SECONDS * STT_BYTES_PER_SECOND, max_bytes // 2
+            )
+            search = search // frame * frame
+            if search:
+                f.seek(end - search)
+                samples = np.frombuffer(f.read(search), dtype="<i2")
+                energy = (samples.reshape(-1, frame // 2).astype(np.float32) ** 2).mean(
+                    axis=1
+                )
+                # Latest of the quietest frames, cut in its middle
+                quietest = len(energy) - 1 - int(np.argmin(energy[::-1]))
+                end = end - search + quietest * frame + frame // 2
+
+            yield start, end
+            start = end
+
+
+def write_pcm_chunk(pcm_path: str, start: int, end: int, chunk_path: str):
+    with open(pcm_path, "rb") as src, wave.open(chunk_path, "wb") as dst:
+        dst.setnchannels(1)
+        dst.setsampwidth(2)
+        dst.setframerate(STT_SAMPLE_RATE)
+
+        src.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            data = src.read(min(remaining, 1024 * 1024))
+            if not data:
+                break
+            dst.writeframes(data)
+            remaining -= len(data)
 
 
 def set_faster_whisper_model(model: str, auto_update: bool = False):
@@ -298,28 +400,18 @@ def load_speech_pipeline(request):
         )
 
 
-@router.post("/speech")
-async def speech(request: Request, user=Depends(get_verified_user)):
-    body = await request.body()
-    name = hashlib.sha256(
-        body
+def get_speech_cache_key(request: Request, payload: dict) -> str:
+    return hashlib.sha256(
+        json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
         + str(request.app.state.config.TTS_ENGINE).encode("utf-8")
         + str(request.app.state.config.TTS_MODEL).encode("utf-8")
+        + str(request.app.state.config.TTS_VOICE).encode("utf-8")
     ).hexdigest()
 
-    file_path = SPEECH_CACHE_DIR.joinpath(f"{name}.mp3")
-    file_body_path = SPEECH_CACHE_DIR.joinpath(f"{name}.json")
 
-    # Check if the file already exists in the cache
-    if file_path.is_file():
-        return FileResponse(file_path)
-
-    payload = None
-    try:
-        payload = json.loads(body.decode("utf-8"))
-    except Exception as e:
-        log.exception(e)
-        raise HTTPException(status_code=400, detail="Invalid JSON payload")
+async def synthesize_speech(request: Request, payload: dict, user, file_path: Path):
+    """Synthesize `payload["input"]` with the configured engine into `file_path`."""
+    file_body_path = file_path.with_suffix(".json")
 
     if request.app.state.config.TTS_ENGINE == "openai":
         payload["model"] = request.app.state.config.TTS_MODEL
@@ -353,11 +445,6 @@ async def speech(request: Request, user=Depends(get_verified_user)):
                     async with aiofiles.open(file_path, "wb") as f:
                         await f.write(await r.read())
 
-                    async with aiofiles.open(file_body_path, "w") as f:
-                        await f.write(json.dumps(payload))
-
-            return FileResponse(file_path)
-
         except Exception as e:
             log.exception(e)
             detail = None
@@ -409,11 +496,6 @@ async def speech(request: Request, user=Depends(get_verified_user)):
                     async with aiofiles.open(file_path, "wb") as f:
                         await f.write(await r.read())
 
-                    async with aiofiles.open(file_body_path, "w") as f:
-                        await f.write(json.dumps(payload))
-
-            return FileResponse(file_path)
-
         except Exception as e:
             log.exception(e)
             detail = None
@@ -432,12 +514,6 @@ async def speech(request: Request, user=Depends(get_verified_user)):
             )
 
     elif request.app.state.config.TTS_ENGINE == "azure":
-        try:
-            payload = json.loads(body.decode("utf-8"))
-        except Exception as e:
-            log.exception(e)
-            raise HTTPException(status_code=400, detail="Invalid JSON payload")
-
         region = request.app.state.config.TTS_AZURE_SPEECH_REGION or "eastus"
         base_url = request.app.state.config.TTS_AZURE_SPEECH_BASE_URL
         language = request.app.state.config.TTS_VOICE
@@ -468,11 +544,6 @@ async def speech(request: Request, user=Depends(get_verified_user)):
                     async with aiofiles.open(file_path, "wb") as f:
                         await f.write(await r.read())
 
-                    async with aiofiles.open(file_body_path, "w") as f:
-                        await f.write(json.dumps(payload))
-
-                    return FileResponse(file_path)
-
         except Exception as e:
             log.exception(e)
             detail = None
@@ -491,13 +562,6 @@ async def speech(request: Request, user=Depends(get_verified_user)):
             )
 
     elif request.app.state.config.TTS_ENGINE == "transformers":
-        payload = None
-        try:
-            payload = json.loads(body.decode("utf-8"))
-        except Exception as e:
-            log.exception(e)
-            raise HTTPException(status_code=400, detail="Invalid JSON payload")
-
         import torch
         import soundfile as sf
 
@@ -524,10 +588,77 @@ async def speech(request: Request, user=Depends(get_verified_user)):
 
         sf.write(file_path, speech["audio"], samplerate=speech["sampling_rate"])
 
-        async with aiofiles.open(file_body_path, "w") as f:
-            await f.write(json.dumps(payload))
+    else:
+        raise HTTPException(
+            status_code=400,
+            detail="Text-to-speech engine not supported",
+        )
+
+    async with aiofiles.open(file_body_path, "w") as f:
+        await f.write(json.dumps(payload))
+
+
+@router.post("/speech")
+async def speech(request: Request, user=Depends(get_verified_user)):
+    body = await request.body()
+
+    payload = None
+    try:
+        payload = json.loads(body.decode("utf-8"))
+    except Exception as e:
+        log.exception(e)
+        raise HTTPException(status_code=400, detail="Invalid JSON payload")
+
+    # Identical requests share the cached (or in progress) synthesis
+    file_path = await SpeechCache.get_or_create(
+        get_speech_cache_key(request, payload),
+        lambda path: synthesize_speech(request, payload, user, path),
+    )
+    return FileResponse(file_path)
+
+
+class SpeechCacheWarmForm(BaseModel):
+    inputs: list[str]
+    voice: Optional[str] = None
+
+
+@router.post("/speech/cache/warm")
+async def warm_speech_cache(
+    request: Request, form_data: SpeechCacheWarmForm, user=Depends(get_admin_user)
+):
+    """
+    Synthesize common phrases ahead of time, with the payload the UI sends
+    for them (`{"input": ..., "voice": ...}`).
+    """
+    voice = form_data.voice or request.app.state.config.TTS_VOICE
+    semaphore = asyncio.Semaphore(4)
+
+    async def warm(input: str) -> bool:
+        payload = {"input": input, "voice": voice}
+        key = get_speech_cache_key(request, payload)
+        if SpeechCache.get(key) is not None:
+            return False
+
+        async with semaphore:
+            await SpeechCache.get_or_create(
+                key, lambda path: synthesize_speech(request, payload, user, path)
+            )
+        return True
+
+    results = await asyncio.gather(
+        *[warm(input) for input in dict.fromkeys(form_data.inputs)],
+        return_exceptions=True,
+    )
 
-        return FileResponse(file_path)
+    for result in results:
+        if isinstance(result, Exception):
+            log.warning(f"Error warming speech cache: {result}")
+
+    return {
+        "synthesized": sum(result is True for result in results),
+        "cached": sum(result is False for result in results),
+        "failed": sum(isinstance(result, Exception) for result in results),
+    }
 
 
 def transcription_handler(request, file_path, metadata):
@@ -789,119 +920,107 @@ def transcription_handler(request, file_path, metadata):
             )
 
 
-def transcribe(request: Request, file_path: str, metadata: Optional[dict] = None):
-    log.info(f"transcribe: {file_path} {metadata}")
-
-    if is_audio_conversion_required(file_path):
-        file_path = convert_audio_to_mp3(file_path)
-
-    try:
-        file_path = compress_audio(file_path)
-    except Exception as e:
-        log.exception(e)
-
-    # Always produce a list of chunk paths (could be one entry if small)
-    try:
-        chunk_paths = split_audio(file_path, MAX_FILE_SIZE)
-        print(f"Chunk paths: {chunk_paths}")
-    except Exception as e:
-        log.exception(e)
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=ERROR_MESSAGES.DEFAULT(e),
-        )
-
-    results = []
+def transcribe_pcm_chunk(request, pcm_path, chunk_dir, index, start, end, metadata):
+    chunk_path = os.path.join(chunk_dir, f"chunk_{index}.wav")
+    write_pcm_chunk(pcm_path, start, end, chunk_path)
     try:
-        with ThreadPoolExecutor() as executor:
-            # Submit tasks for each chunk_path
-            futures = [
-                executor.submit(transcription_handler, request, chunk_path, metadata)
-                for chunk_path in chunk_paths
-            ]
-            # Gather results as they complete
-            for future in futures:
-                try:
-                    results.append(future.result())
-                except Exception as transcribe_exc:
-                    raise HTTPException(
-                        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                        detail=f"Error transcribing chunk: {transcribe_exc}",
-                    )
+        result = transcription_handler(request, chunk_path, metadata)
     finally:
-        # Clean up only the temporary chunks, never the original file
-        for chunk_path in chunk_paths:
-            if chunk_path != file_path and os.path.isfile(chunk_path):
-                try:
-                    os.remove(chunk_path)
-                except Exception:
-                    pass
+        os.remove(chunk_path)
 
     return {
-        "text": " ".join([result["text"] for result in results]),
+        "index": index,
+        "start": start / STT_BYTES_PER_SECOND,
+        "end": end / STT_BYTES_PER_SECOND,
+        "text": result.get("text", "").strip(),
     }
 
 
-def compress_audio(file_path):
-    if os.path.getsize(file_path) > MAX_FILE_SIZE:
-        id = os.path.splitext(os.path.basename(file_path))[
-            0
-        ]  # Handles names with multiple dots
-        file_dir = os.path.dirname(file_path)
-
-        audio = AudioSegment.from_file(file_path)
-        audio = audio.set_frame_rate(16000).set_channels(1)  # Compress audio
-
-        compressed_path = os.path.join(file_dir, f"{id}_compressed.mp3")
-        audio.export(compressed_path, format="mp3", bitrate="32k")
-        # log.debug(f"Compressed audio to {compressed_path}")  # Uncomment if log is defined
-
-        return compressed_path
-    else:
-        return file_path
-
-
-def split_audio(file_path, max_bytes, format="mp3", bitrate="32k"):
+def transcribe_chunks(
+    request: Request, file_path: str, metadata: Optional[dict] = None
+):
     """
-    Splits audio into chunks not exceeding max_bytes.
-    Returns a list of chunk file paths. If audio fits, returns list with original path.
+    Transcribe an audio file, yielding the transcript of each chunk
+    ({"index", "start", "end", "text"}) as soon as it is done, which is not
+    necessarily in order.
+
+    Files that are too large or in a format the engines don't take are
+    decoded once to PCM, then chunks are cut from it as workers free up: at
+    most AUDIO_STT_MAX_WORKERS chunks are pending, whatever the length of
+    the recording.
     """
-    file_size = os.path.getsize(file_path)
-    if file_size <= max_bytes:
-        return [file_path]  # Nothing to split
+    if os.path.getsize(file_path) <= MAX_FILE_SIZE and (
+        not is_audio_conversion_required(file_path)
+    ):
+        result = transcription_handler(request, file_path, metadata)
+        yield {
+            "index": 0,
+            "start": 0.0,
+            "end": None,
+            "text": result.get("text", "").strip(),
+        }
+        return
 
-    audio = AudioSegment.from_file(file_path)
-    duration_ms = len(audio)
-    orig_size = file_size
+    # WAV chunks have to fit in MAX_FILE_SIZE
+    max_seconds = min(
+        AUDIO_STT_CHUNK_SECONDS, MAX_FILE_SIZE // STT_BYTES_PER_SECOND - 1
+    )
 
-    approx_chunk_ms = max(int(duration_ms * (max_bytes / orig_size)) - 1000, 1000)
-    chunks = []
-    start = 0
-    i = 0
+    with tempfile.TemporaryDirectory(dir=TRANSCRIPTION_DIR) as chunk_dir:
+        pcm_path = os.path.join(chunk_dir, "audio.pcm")
+        decode_audio_to_pcm(file_path, pcm_path)
 
-    base, _ = os.path.splitext(file_path)
+        pending = set()
+        try:
+            for index, (start, end) in enumerate(get_pcm_chunks(pcm_path, max_seconds)):
+                while len(pending) >= max(AUDIO_STT_MAX_WORKERS, 1):
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+
+                pending.add(
+                    TRANSCRIPTION_EXECUTOR.submit(
+                        transcribe_pcm_chunk,
+                        request,
+                        pcm_path,
+                        chunk_dir,
+                        index,
+                        start,
+                        end,
+                        metadata,
+                    )
+                )
 
-    while start < duration_ms:
-        end = min(start + approx_chunk_ms, duration_ms)
-        chunk = audio[start:end]
-        chunk_path = f"{base}_chunk_{i}.{format}"
-        chunk.export(chunk_path, format=format, bitrate=bitrate)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        finally:
+            # Nothing may still use the chunk directory once it is removed
+            for future in pending:
+                future.cancel()
+            wait(pending)
 
-        # Reduce chunk duration if still too large
-        while os.path.getsize(chunk_path) > max_bytes and (end - start) > 5000:
-            end = start + ((end - start) // 2)
-            chunk = audio[start:end]
-            chunk.export(chunk_path, format=format, bitrate=bitrate)
 
-        if os.path.getsize(chunk_path) > max_bytes:
-            os.remove(chunk_path)
-            raise Exception("Audio chunk cannot be reduced below max file size.")
+def transcribe(request: Request, file_path: str, metadata: Optional[dict] = None):
+    log.info(f"transcribe: {file_path} {metadata}")
 
-        chunks.append(chunk_path)
-        start = end
-        i += 1
+    texts = {}
+    try:
+        for chunk in transcribe_chunks(request, file_path, metadata):
+            texts[chunk["index"]] = chunk["text"]
+    except HTTPException:
+        raise
+    except Exception as e:
+        log.exception(e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error transcribing audio: {e}",
+        )
 
-    return chunks
+    return {
+        "text": " ".join([texts[index] for index in sorted(texts)]),
+    }
 
 
 @router.post("/transcriptions")
@@ -909,6 +1028,7 @@ def transcription(
     request: Request,
     file: UploadFile = File(...),
     language: Optional[str] = Form(None),
+    stream: bool = Form(False),
     user=Depends(get_verified_user),
 ):
     log.info(f"file.content_type: {file.content_type}")
@@ -928,14 +1048,10 @@ def transcription(
         id = uuid.uuid4()
 
         filename = f"{id}.{ext}"
-        contents = file.file.read()
-
-        file_dir = f"{CACHE_DIR}/audio/transcriptions"
-        os.makedirs(file_dir, exist_ok=True)
-        file_path = f"{file_dir}/{filename}"
+        file_path = f"{TRANSCRIPTION_DIR}/{filename}"
 
         with open(file_path, "wb") as f:
-            f.write(contents)
+            shutil.copyfileobj(file.file, f, 1024 * 1024)
 
         try:
             metadata = None
@@ -943,6 +1059,30 @@ def transcription(
             if language:
                 metadata = {"language": language}
 
+            if stream:
+                # Newline delimited JSON: one line per chunk as it is done, then
+                # the full transcript
+                def generate():
+                    texts = {}
+                    try:
+                        for chunk in transcribe_chunks(request, file_path, metadata):
+                            texts[chunk["index"]] = chunk["text"]
+                            yield json.dumps(chunk) + "\n"
+                    except Exception as e:
+                        log.exception(e)
+                        yield json.dumps({"error": ERROR_MESSAGES.DEFAULT(e)}) + "\n"
+                        return
+
+                    yield json.dumps(
+                        {
+                            "done": True,
+                            "text": " ".join([texts[index] for index in sorted(texts)]),
+                            "filename": os.path.basename(file_path),
+                        }
+                    ) + "\n"
+
+                return StreamingResponse(generate(), media_type="application/x-ndjson")
+
             result = transcribe(request, file_path, metadata)
 
             return {
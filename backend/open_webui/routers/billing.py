@@ -10,8 +10,11 @@ from open_webui.utils.auth import get_verified_user, get_admin_user
 from open_webui.models.billing import (
     UserCreditsModel, UserCreditsForm, CreditTransactionModel,
     CreditTransactionForm, PaymentOrderModel, PaymentOrderForm,
-    PaymentCallbackForm, UserCredits, CreditTransactions, PaymentOrders
+    PaymentCallbackForm, UserCredits, CreditTransactions, PaymentOrders,
+    ModelPriceModel, ModelPriceForm, ModelPrices
 )
+from open_webui.utils.pricing import PRICE_SHEET, load_price_overrides
+from open_webui.utils.ledger import Ledger
 
 from open_webui.storage.provider import Storage
 
@@ -30,14 +33,16 @@ async def create_credits(
     user=Depends(get_admin_user)
 ):
     """Admin: initialize a user's credit wallet"""
-    return UserCredits.insert_new_user_credits(form.user_id, form)
+    result = UserCredits.insert_new_user_credits(form.user_id, form)
+    Ledger.invalidate(form.user_id)
+    return result
 
 @router.get('/credits', response_model=UserCreditsModel)
 async def get_credits(
     user=Depends(get_verified_user)
 ):
     """Retrieve current user's credit balance"""
-    result = UserCredits.get_user_credits(user.id)
+    result = Ledger.get_account(user.id)
     if not result:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -51,7 +56,7 @@ async def get_user_credits(
     admin=Depends(get_admin_user)
 ):
     """Admin: get credit information for a specific user"""
-    result = UserCredits.get_user_credits(user_id)
+    result = Ledger.get_account(user_id)
     if not result:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -197,6 +202,8 @@ async def confirm_order(
                 else:
                     log.error(f"Failed to create credit wallet for user {order.user_id}")
 
+            Ledger.invalidate(order.user_id)
+
             # Record the credit allocation transaction
             try:
                 CreditTransactions.insert_transaction(
@@ -251,6 +258,46 @@ async def list_user_orders(
     return PaymentOrders.get_orders_by_user(user_id, skip, limit)
 
 
+# -------------------------
+# Model Price Endpoints
+# -------------------------
+
+@router.get('/prices')
+async def get_model_prices(admin=Depends(get_admin_user)):
+    """Admin: price sheet version and per-model price overrides"""
+    return {
+        "version": PRICE_SHEET.version,
+        "overrides": ModelPrices.get_model_prices(),
+    }
+
+
+@router.post('/prices', response_model=ModelPriceModel)
+async def upsert_model_price(
+    form: ModelPriceForm,
+    admin=Depends(get_admin_user)
+):
+    """Admin: override the price of a model"""
+    result = ModelPrices.upsert_model_price(form)
+    if not result:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=ERROR_MESSAGES.DEFAULT()
+        )
+    load_price_overrides()
+    return result
+
+
+@router.delete('/prices/{model_name:path}', response_model=bool)
+async def delete_model_price(
+    model_name: str,
+    admin=Depends(get_admin_user)
+):
+    """Admin: remove a model price override"""
+    result = ModelPrices.delete_model_price(model_name)
+    load_price_overrides()
+    return result
+
+
 async def register_litellm_customer(user_id: str, budget_id: str):
     """Register a new customer with LiteLLM"""
     headers = {
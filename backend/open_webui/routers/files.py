@@ -18,7 +18,9 @@ from fastapi import (
     status,
     Query,
 )
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import FileResponse, RedirectResponse, Response
+from starlette.concurrency import run_in_threadpool
+from open_webui.config import ENABLE_STORAGE_PRESIGNED_URLS
 from open_webui.constants import ERROR_MESSAGES
 from open_webui.env import SRC_LOG_LEVELS
 
@@ -77,6 +79,25 @@ def has_access_to_file(
     return has_access
 
 
+############################
+# Conditional requests
+############################
+
+
+def get_file_etag(file: FileModel) -> Optional[str]:
+    """Strong ETag of the file's stored content, from its hash."""
+    hash = (file.meta or {}).get("sha256") or file.hash
+    return f'"{hash}"' if hash else None
+
+
+def is_not_modified(request: Request, etag: Optional[str]) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not etag or not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
 ############################
 # Upload File
 ############################
@@ -134,7 +155,7 @@ def upload_file(
             "OpenWebUI-User-Name": user.name,
             "OpenWebUI-File-Id": id,
         }
-        contents, file_path = Storage.upload_file(file.file, filename, tags)
+        size, sha256, file_path = Storage.upload_file_stream(file.file, filename, tags)
 
         file_item = Files.insert_new_file(
             user.id,
@@ -146,7 +167,8 @@ def upload_file(
                     "meta": {
                         "name": name,
                         "content_type": file.content_type,
-                        "size": len(contents),
+                        "size": size,
+                        "sha256": sha256,
                         "data": file_metadata,
                     },
                 }
@@ -399,7 +421,10 @@ async def update_file_data_content_by_id(
 
 @router.get("/{id}/content")
 async def get_file_content_by_id(
-    id: str, user=Depends(get_verified_user), attachment: bool = Query(False)
+    request: Request,
+    id: str,
+    user=Depends(get_verified_user),
+    attachment: bool = Query(False),
 ):
     file = Files.get_file_by_id(id)
 
@@ -415,37 +440,53 @@ async def get_file_content_by_id(
         or has_access_to_file(id, "read", user)
     ):
         try:
-            file_path = Storage.get_file(file.path)
-            file_path = Path(file_path)
-
-            # Check if the file already exists in the cache
-            if file_path.is_file():
-                # Handle Unicode filenames
-                filename = file.meta.get("name", file.filename)
-                encoded_filename = quote(filename)  # RFC5987 encoding
+            # Handle Unicode filenames
+            filename = file.meta.get("name", file.filename)
+            encoded_filename = quote(filename)  # RFC5987 encoding
 
-                content_type = file.meta.get("content_type")
-                filename = file.meta.get("name", file.filename)
-                encoded_filename = quote(filename)
-                headers = {}
+            content_type = file.meta.get("content_type")
+            headers = {}
 
-                if attachment:
+            if attachment:
+                headers["Content-Disposition"] = (
+                    f"attachment; filename*=UTF-8''{encoded_filename}"
+                )
+            else:
+                if content_type == "application/pdf" or filename.lower().endswith(
+                    ".pdf"
+                ):
+                    headers["Content-Disposition"] = (
+                        f"inline; filename*=UTF-8''{encoded_filename}"
+                    )
+                    content_type = "application/pdf"
+                elif content_type != "text/plain":
                     headers["Content-Disposition"] = (
                         f"attachment; filename*=UTF-8''{encoded_filename}"
                     )
-                else:
-                    if content_type == "application/pdf" or filename.lower().endswith(
-                        ".pdf"
-                    ):
-                        headers["Content-Disposition"] = (
-                            f"inline; filename*=UTF-8''{encoded_filename}"
-                        )
-                        content_type = "application/pdf"
-                    elif content_type != "text/plain":
-                        headers["Content-Disposition"] = (
-                            f"attachment; filename*=UTF-8''{encoded_filename}"
-                        )
 
+            etag = get_file_etag(file)
+            if etag:
+                headers["ETag"] = etag
+            if is_not_modified(request, etag):
+                return Response(
+                    status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+                )
+
+            if ENABLE_STORAGE_PRESIGNED_URLS:
+                url = Storage.get_presigned_url(
+                    file.path, headers.get("Content-Disposition"), content_type
+                )
+                if url:
+                    return RedirectResponse(
+                        url, status_code=status.HTTP_307_TEMPORARY_REDIRECT
+                    )
+
+            file_path = await run_in_threadpool(Storage.get_file, file.path)
+            file_path = Path(file_path)
+
+            # Check if the file already exists in the cache
+            if file_path.is_file():
+                # Ranges (and If-Range against the ETag) are handled by FileResponse
                 return FileResponse(file_path, headers=headers, media_type=content_type)
 
             else:
@@ -517,7 +558,9 @@ async def get_html_file_content_by_id(id: str, user=Depends(get_verified_user)):
 
 
 @router.get("/{id}/content/{file_name}")
-async def get_file_content_by_id(id: str, user=Depends(get_verified_user)):
+async def get_file_content_by_id(
+    request: Request, id: str, user=Depends(get_verified_user)
+):
     file = Files.get_file_by_id(id)
 
     if not file:
@@ -540,8 +583,25 @@ async def get_file_content_by_id(id: str, user=Depends(get_verified_user)):
             "Content-Disposition": f"attachment; filename*=UTF-8''{encoded_filename}"
         }
 
+        etag = get_file_etag(file)
+        if etag:
+            headers["ETag"] = etag
+        if is_not_modified(request, etag):
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+            )
+
         if file_path:
-            file_path = Storage.get_file(file_path)
+            if ENABLE_STORAGE_PRESIGNED_URLS:
+                url = Storage.get_presigned_url(
+                    file_path, headers["Content-Disposition"]
+                )
+                if url:
+                    return RedirectResponse(
+                        url, status_code=status.HTTP_307_TEMPORARY_REDIRECT
+                    )
+
+            file_path = await run_in_threadpool(Storage.get_file, file_path)
             file_path = Path(file_path)
 
             # Check if the file already exists in the cache
@@ -554,15 +614,10 @@ async def get_file_content_by_id(id: str, user=Depends(get_verified_user)):
                 )
         else:
             # File path doesn’t exist, return the content as .txt if possible
-            file_content = file.content.get("content", "")
-            file_name = file.filename
-
-            # Create a generator that encodes the file content
-            def generator():
-                yield file_content.encode("utf-8")
+            file_content = (file.data or {}).get("content", "")
 
-            return StreamingResponse(
-                generator(),
+            return Response(
+                file_content.encode("utf-8"),
                 media_type="text/plain",
                 headers=headers,
             )
@@ -1,3 +1,4 @@
+import asyncio
 from typing import List, Optional
 from pydantic import BaseModel
 from fastapi import APIRouter, Depends, HTTPException, status, Request
@@ -11,13 +12,20 @@ from open_webui.models.knowledge import (
 )
 from open_webui.models.files import Files, FileModel, FileMetadataResponse
 from open_webui.retrieval.vector.factory import VECTOR_DB_CLIENT
+from open_webui.retrieval.bm25 import BM25_INDEXES
 from open_webui.routers.retrieval import (
     process_file,
     ProcessFileForm,
     process_files_batch,
     BatchProcessFilesForm,
 )
+from open_webui.models.ingestion import (
+    IngestionJobs,
+    IngestionJobModel,
+    IngestionJobResponse,
+)
 from open_webui.storage.provider import Storage
+from open_webui.utils.ingestion import IngestionRunner
 
 from open_webui.constants import ERROR_MESSAGES
 from open_webui.utils.auth import get_verified_user
@@ -166,8 +174,7 @@ async def create_new_knowledge(
 ############################
 
 
-@router.post("/reindex", response_model=bool)
-async def reindex_knowledge_files(request: Request, user=Depends(get_verified_user)):
+def start_reindex_job(request: Request, user) -> IngestionJobModel:
     if user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -179,6 +186,7 @@ async def reindex_knowledge_files(request: Request, user=Depends(get_verified_us
     log.info(f"Starting reindexing for {len(knowledge_bases)} knowledge bases")
 
     deleted_knowledge_bases = []
+    items = []
 
     for knowledge_base in knowledge_bases:
         # -- Robust error handling for missing or invalid data
@@ -196,52 +204,90 @@ async def reindex_knowledge_files(request: Request, user=Depends(get_verified_us
             continue
 
         try:
-            file_ids = knowledge_base.data.get("file_ids", [])
-            files = Files.get_files_by_ids(file_ids)
-            try:
-                if VECTOR_DB_CLIENT.has_collection(collection_name=knowledge_base.id):
-                    VECTOR_DB_CLIENT.delete_collection(
-                        collection_name=knowledge_base.id
-                    )
-            except Exception as e:
-                log.error(f"Error deleting collection {knowledge_base.id}: {str(e)}")
-                continue  # Skip, don't raise
-
-            failed_files = []
-            for file in files:
-                try:
-                    process_file(
-                        request,
-                        ProcessFileForm(
-                            file_id=file.id, collection_name=knowledge_base.id
-                        ),
-                        user=user,
-                    )
-                except Exception as e:
-                    log.error(
-                        f"Error processing file {file.filename} (ID: {file.id}): {str(e)}"
-                    )
-                    failed_files.append({"file_id": file.id, "error": str(e)})
-                    continue
-
+            if VECTOR_DB_CLIENT.has_collection(collection_name=knowledge_base.id):
+                VECTOR_DB_CLIENT.delete_collection(collection_name=knowledge_base.id)
+                BM25_INDEXES.delete_collection(knowledge_base.id)
         except Exception as e:
-            log.error(f"Error processing knowledge base {knowledge_base.id}: {str(e)}")
-            # Don't raise, just continue
-            continue
+            log.error(f"Error deleting collection {knowledge_base.id}: {str(e)}")
+            continue  # Skip, don't raise
 
-        if failed_files:
-            log.warning(
-                f"Failed to process {len(failed_files)} files in knowledge base {knowledge_base.id}"
-            )
-            for failed in failed_files:
-                log.warning(f"File ID: {failed['file_id']}, Error: {failed['error']}")
+        files = Files.get_files_by_ids(knowledge_base.data.get("file_ids", []))
+        items.extend((knowledge_base.id, file.id) for file in files)
 
     log.info(
-        f"Reindexing completed. Deleted {len(deleted_knowledge_bases)} invalid knowledge bases: {deleted_knowledge_bases}"
+        f"Deleted {len(deleted_knowledge_bases)} invalid knowledge bases: {deleted_knowledge_bases}"
     )
+
+    job = IngestionJobs.insert_new_job(user.id, "reindex", items)
+    IngestionRunner.start(request.app, job)
+
+    log.info(f"Reindexing {len(items)} files in ingestion job {job.id}")
+    return job
+
+
+@router.post("/reindex", response_model=bool)
+async def reindex_knowledge_files(request: Request, user=Depends(get_verified_user)):
+    job = start_reindex_job(request, user)
+
+    task = IngestionRunner.tasks.get(job.id)
+    if task is not None:
+        # Unlike awaiting the task, a client disconnecting doesn't cancel it
+        await asyncio.wait([task])
+
+    log.info(f"Reindexing completed, ingestion job {job.id}")
     return True
 
 
+@router.post("/reindex/job", response_model=IngestionJobModel)
+async def reindex_knowledge_files_job(
+    request: Request, user=Depends(get_verified_user)
+):
+    # Files are processed in the background, see /knowledge/jobs/{job_id}
+    return start_reindex_job(request, user)
+
+
+############################
+# GetIngestionJobs
+############################
+
+
+@router.get("/jobs", response_model=list[IngestionJobModel])
+async def get_ingestion_jobs(user=Depends(get_verified_user)):
+    if user.role == "admin":
+        return IngestionJobs.get_jobs()
+    return IngestionJobs.get_jobs(user_id=user.id)
+
+
+def get_ingestion_job_or_raise(job_id: str, user) -> IngestionJobModel:
+    job = IngestionJobs.get_job_by_id(job_id)
+    if not job or (job.user_id != user.id and user.role != "admin"):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=ERROR_MESSAGES.NOT_FOUND,
+        )
+    return job
+
+
+@router.get("/jobs/{job_id}", response_model=IngestionJobResponse)
+async def get_ingestion_job_by_id(job_id: str, user=Depends(get_verified_user)):
+    job = get_ingestion_job_or_raise(job_id, user)
+    return IngestionJobResponse(
+        **job.model_dump(),
+        failed_items=IngestionJobs.get_items_by_job_id(job.id, status="failed"),
+    )
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=IngestionJobModel)
+async def cancel_ingestion_job_by_id(job_id: str, user=Depends(get_verified_user)):
+    job = get_ingestion_job_or_raise(job_id, user)
+    if job.status not in ["pending", "running"]:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=ERROR_MESSAGES.DEFAULT(f"Job is already {job.status}"),
+        )
+    return IngestionRunner.cancel(job.id)
+
+
 ############################
 # GetKnowledgeById
 ############################
@@ -451,6 +497,7 @@ def update_file_from_knowledge_by_id(
     VECTOR_DB_CLIENT.delete(
         collection_name=knowledge.id, filter={"file_id": form_data.file_id}
     )
+    BM25_INDEXES.delete(knowledge.id, file_id=form_data.file_id)
 
     # Add content to the vector database
     try:
@@ -522,6 +569,7 @@ def remove_file_from_knowledge_by_id(
         VECTOR_DB_CLIENT.delete(
             collection_name=knowledge.id, filter={"file_id": form_data.file_id}
         )
+        BM25_INDEXES.delete(knowledge.id, file_id=form_data.file_id)
     except Exception as e:
         log.debug("This was most likely caused by bypassing embedding processing")
         log.debug(e)
@@ -532,6 +580,7 @@ def remove_file_from_knowledge_by_id(
         file_collection = f"file-{form_data.file_id}"
         if VECTOR_DB_CLIENT.has_collection(collection_name=file_collection):
             VECTOR_DB_CLIENT.delete_collection(collection_name=file_collection)
+            BM25_INDEXES.delete_collection(file_collection)
     except Exception as e:
         log.debug("This was most likely caused by bypassing embedding processing")
         log.debug(e)
@@ -630,6 +679,7 @@ async def delete_knowledge_by_id(id: str, user=Depends(get_verified_user)):
     # Clean up vector DB
     try:
         VECTOR_DB_CLIENT.delete_collection(collection_name=id)
+        BM25_INDEXES.delete_collection(id)
     except Exception as e:
         log.debug(e)
         pass
@@ -663,6 +713,7 @@ async def reset_knowledge_by_id(id: str, user=Depends(get_verified_user)):
 
     try:
         VECTOR_DB_CLIENT.delete_collection(collection_name=id)
+        BM25_INDEXES.delete_collection(id)
     except Exception as e:
         log.debug(e)
         pass
@@ -758,3 +809,45 @@ def add_files_to_knowledge_batch(
         **knowledge.model_dump(),
         files=Files.get_file_metadatas_by_ids(existing_file_ids),
     )
+
+
+@router.post("/{id}/files/batch/job", response_model=IngestionJobModel)
+async def add_files_to_knowledge_job(
+    request: Request,
+    id: str,
+    form_data: list[KnowledgeFileIdForm],
+    user=Depends(get_verified_user),
+):
+    """
+    Add multiple files to a knowledge base in the background, each file is
+    added to the knowledge base once processed
+    """
+    knowledge = Knowledges.get_knowledge_by_id(id=id)
+    if not knowledge:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=ERROR_MESSAGES.NOT_FOUND,
+        )
+
+    if (
+        knowledge.user_id != user.id
+        and not has_access(user.id, "write", knowledge.access_control)
+        and user.role != "admin"
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=ERROR_MESSAGES.ACCESS_PROHIBITED,
+        )
+
+    for form in form_data:
+        if not Files.get_file_by_id(form.file_id):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"File {form.file_id} not found",
+            )
+
+    job = IngestionJobs.insert_new_job(
+        user.id, "knowledge_files", [(id, form.file_id) for form in form_data]
+    )
+    IngestionRunner.start(request.app, job)
+    return job
@@ -133,3 +133,38 @@ async def download_litellm_config_yaml(user=Depends(get_admin_user)):
         media_type="application/octet-stream",
         filename="config.yaml",
     )
+
+
+@router.get("/stats")
+async def get_stats(user=Depends(get_admin_user)):
+    from open_webui.utils.message_buffer import MessageBuffer
+    from open_webui.utils.pricing import TOKEN_COUNTS
+    from open_webui.utils.ledger import Ledger
+    from open_webui.utils.session_pool import SessionPool
+    from open_webui.utils.model_catalog import MODEL_CATALOG
+    from open_webui.retrieval.bm25 import BM25_INDEXES
+    from open_webui.retrieval.embedding_cache import EMBEDDING_CACHE
+    from open_webui.retrieval.utils import RERANK_SCORES
+    from open_webui.utils.ingestion import IngestionRunner
+    from open_webui.storage.provider import StorageCache
+    from open_webui.utils.filter import FILTER_CHAINS
+    from open_webui.utils.plugin import PluginModules
+    from open_webui.utils.tools import TOOL_SPECS
+    from open_webui.routers.audio import SpeechCache
+
+    return {
+        "message_write_buffer": MessageBuffer.get_stats(),
+        "token_count_cache": TOKEN_COUNTS.get_stats(),
+        "credit_ledger": Ledger.get_stats(),
+        "upstream_session_pool": SessionPool.get_stats(),
+        "model_catalog_cache": MODEL_CATALOG.get_stats(),
+        "bm25_indexes": BM25_INDEXES.get_stats(),
+        "embedding_cache": EMBEDDING_CACHE.get_stats(),
+        "rerank_score_cache": RERANK_SCORES.get_stats(),
+        "ingestion_jobs": IngestionRunner.get_stats(),
+        "storage_cache": StorageCache.get_stats(),
+        "filter_chains": FILTER_CHAINS.get_stats(),
+        "plugin_modules": PluginModules.get_stats(),
+        "tool_specs": TOOL_SPECS.get_stats(),
+        "speech_cache": SpeechCache.get_stats(),
+    }
@@ -20,9 +20,16 @@ from open_webui.env import (
     WEBSOCKET_REDIS_LOCK_TIMEOUT,
     WEBSOCKET_SENTINEL_PORT,
     WEBSOCKET_SENTINEL_HOSTS,
+    ENABLE_CHAT_EVENT_COALESCING,
+    CHAT_EVENT_COALESCING_WINDOW,
 )
 from open_webui.utils.auth import decode_token
-from open_webui.socket.utils import RedisDict, RedisLock
+from open_webui.socket.utils import (
+    ChatEventCoalescer,
+    RedisReplicatedDict,
+    RedisLock,
+)
+from open_webui.utils.message_buffer import MessageBuffer
 
 from open_webui.env import (
     GLOBAL_LOG_LEVEL,
@@ -72,17 +79,17 @@ if WEBSOCKET_MANAGER == "redis":
     redis_sentinels = get_sentinels_from_env(
         WEBSOCKET_SENTINEL_HOSTS, WEBSOCKET_SENTINEL_PORT
     )
-    SESSION_POOL = RedisDict(
+    SESSION_POOL = RedisReplicatedDict(
         "open-webui:session_pool",
         redis_url=WEBSOCKET_REDIS_URL,
         redis_sentinels=redis_sentinels,
     )
-    USER_POOL = RedisDict(
+    USER_POOL = RedisReplicatedDict(
         "open-webui:user_pool",
         redis_url=WEBSOCKET_REDIS_URL,
         redis_sentinels=redis_sentinels,
     )
-    USAGE_POOL = RedisDict(
+    USAGE_POOL = RedisReplicatedDict(
         "open-webui:usage_pool",
         redis_url=WEBSOCKET_REDIS_URL,
         redis_sentinels=redis_sentinels,
@@ -104,6 +111,13 @@ else:
     aquire_func = release_func = renew_func = lambda: True
 
 
+def start_session_pools():
+    """Subscribe to changes made to the pools by other workers."""
+    for pool in (SESSION_POOL, USER_POOL, USAGE_POOL):
+        if isinstance(pool, RedisReplicatedDict):
+            pool.start()
+
+
 async def periodic_usage_pool_cleanup():
     if not aquire_func():
         log.debug("Usage pool cleanup lock already exists. Not running it.")
@@ -301,11 +315,29 @@ async def disconnect(sid):
         # print(f"Unknown session ID {sid} disconnected")
 
 
+async def emit_chat_event(session_ids, payload):
+    await asyncio.gather(
+        *[sio.emit("chat-events", payload, to=session_id) for session_id in session_ids]
+    )
+
+
+async def emit_user_event(user_id, event, data):
+    """Emit `event` to every session of the user."""
+    await asyncio.gather(
+        *[sio.emit(event, data, to=sid) for sid in USER_POOL.get(user_id, [])]
+    )
+
+
+chat_event_coalescer = ChatEventCoalescer(
+    emit_chat_event, window=CHAT_EVENT_COALESCING_WINDOW / 1000
+)
+
+
 def get_event_emitter(request_info, update_db=True):
     async def __event_emitter__(event_data):
         user_id = request_info["user_id"]
 
-        session_ids = list(
+        session_ids = sorted(
             set(
                 USER_POOL.get(user_id, [])
                 + (
@@ -316,20 +348,29 @@ def get_event_emitter(request_info, update_db=True):
             )
         )
 
-        emit_tasks = [
-            sio.emit(
-                "chat-events",
+        if ENABLE_CHAT_EVENT_COALESCING:
+            key = (
+                request_info.get("chat_id", None),
+                request_info.get("message_id", None),
+            )
+            if chat_event_coalescer.is_coalescable(event_data):
+                await chat_event_coalescer.add(key, session_ids, event_data)
+            else:
+                # Anything pending goes out first to keep events in order
+                await chat_event_coalescer.flush(key)
+                await emit_chat_event(
+                    session_ids,
+                    {"chat_id": key[0], "message_id": key[1], "data": event_data},
+                )
+        else:
+            await emit_chat_event(
+                session_ids,
                 {
                     "chat_id": request_info.get("chat_id", None),
                     "message_id": request_info.get("message_id", None),
                     "data": event_data,
                 },
-                to=session_id,
             )
-            for session_id in session_ids
-        ]
-
-        await asyncio.gather(*emit_tasks)
 
         if update_db:
             if "type" in event_data and event_data["type"] == "status":
@@ -340,32 +381,19 @@ def get_event_emitter(request_info, update_db=True):
                 )
 
             if "type" in event_data and event_data["type"] == "message":
-                message = Chats.get_message_by_id_and_message_id(
+                MessageBuffer.append_content(
                     request_info["chat_id"],
                     request_info["message_id"],
+                    event_data.get("data", {}).get("content", ""),
                 )
 
-                if message:
-                    content = message.get("content", "")
-                    content += event_data.get("data", {}).get("content", "")
-
-                    Chats.upsert_message_to_chat_by_id_and_message_id(
-                        request_info["chat_id"],
-                        request_info["message_id"],
-                        {
-                            "content": content,
-                        },
-                    )
-
             if "type" in event_data and event_data["type"] == "replace":
                 content = event_data.get("data", {}).get("content", "")
 
-                Chats.upsert_message_to_chat_by_id_and_message_id(
+                MessageBuffer.replace_content(
                     request_info["chat_id"],
                     request_info["message_id"],
-                    {
-                        "content": content,
-                    },
+                    content,
                 )
 
     return __event_emitter__
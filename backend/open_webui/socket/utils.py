@@ -1,6 +1,15 @@
+import asyncio
 import json
+import logging
 import uuid
-from open_webui.utils.redis import get_redis_connection
+from collections import Counter
+from typing import Optional
+
+from open_webui.utils.redis import get_redis_connection, get_async_redis_connection
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["SOCKET"])
 
 
 class RedisLock:
@@ -89,3 +98,301 @@ class RedisDict:
         if key not in self:
             self[key] = default
         return self[key]
+
+
+class RedisReplicatedDict:
+    """
+    A dict shared through a Redis hash, read from a local copy.
+
+    Reads never touch Redis. Writes update the local copy immediately and are
+    sent to Redis, in order, by a background writer using the async client;
+    each flushed batch publishes the changed keys so other workers reload just
+    those keys. Call `start` from the event loop (writes start it lazily).
+    """
+
+    def __init__(self, name, redis_url, redis_sentinels=[]):
+        self.name = name
+        self.channel = f"{name}:invalidate"
+        self.id = str(uuid.uuid4())
+
+        # The blocking client is only used to load the initial state and for
+        # writes made outside of the event loop
+        self.redis = get_redis_connection(
+            redis_url, redis_sentinels, decode_responses=True
+        )
+        self.async_redis = get_async_redis_connection(
+            redis_url, redis_sentinels, decode_responses=True
+        )
+
+        self.data = {k: json.loads(v) for k, v in self.redis.hgetall(name).items()}
+        # Keys written locally but not flushed yet, remote reloads must not override them
+        self.pending = Counter()
+        self.queue: Optional[asyncio.Queue] = None
+        self.tasks = []
+
+    def start(self):
+        if self.queue is not None:
+            return
+        self.queue = asyncio.Queue()
+        self.tasks = [
+            asyncio.create_task(self._writer()),
+            asyncio.create_task(self._listener()),
+        ]
+
+    ####################
+    # Reads
+    ####################
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def __len__(self):
+        return len(self.data)
+
+    def keys(self):
+        return list(self.data.keys())
+
+    def values(self):
+        return list(self.data.values())
+
+    def items(self):
+        return list(self.data.items())
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    ####################
+    # Writes
+    ####################
+
+    def __setitem__(self, key, value):
+        self.data[key] = value
+        self._write("set", key, json.dumps(value))
+
+    def __delitem__(self, key):
+        del self.data[key]
+        self._write("del", key)
+
+    def clear(self):
+        self.data.clear()
+        self._write("clear")
+
+    def update(self, other=None, **kwargs):
+        if other is not None:
+            for k, v in other.items() if hasattr(other, "items") else other:
+                self[k] = v
+        for k, v in kwargs.items():
+            self[k] = v
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def _write(self, op, key=None, value=None):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self._write_sync(op, key, value)
+            return
+
+        self.start()
+        if key is not None:
+            self.pending[key] += 1
+        self.queue.put_nowait((op, key, value))
+
+    def _write_sync(self, op, key, value):
+        pipe = self.redis.pipeline()
+        self._add_ops(pipe, [(op, key, value)])
+        pipe.execute()
+
+    def _add_ops(self, pipe, ops):
+        keys = []
+        for op, key, value in ops:
+            if op == "set":
+                pipe.hset(self.name, key, value)
+            elif op == "del":
+                pipe.hdel(self.name, key)
+            elif op == "clear":
+                pipe.delete(self.name)
+
+            if keys is not None:
+                keys = None if op == "clear" else keys + [key]
+
+        pipe.publish(self.channel, json.dumps({"origin": self.id, "keys": keys}))
+
+    async def _writer(self):
+        while True:
+            ops = [await self.queue.get()]
+            while not self.queue.empty():
+                ops.append(self.queue.get_nowait())
+
+            try:
+                pipe = self.async_redis.pipeline(transaction=True)
+                self._add_ops(pipe, ops)
+                await pipe.execute()
+            except Exception as e:
+                log.error(f"Error writing {self.name} to Redis: {e}")
+            finally:
+                for _, key, _ in ops:
+                    if key is not None:
+                        self.pending[key] -= 1
+                        if self.pending[key] <= 0:
+                            del self.pending[key]
+
+    ####################
+    # Invalidation
+    ####################
+
+    async def _reload(self, keys=None):
+        if keys is None:
+            values = await self.async_redis.hgetall(self.name)
+            data = {k: json.loads(v) for k, v in values.items()}
+            for key in list(self.data):
+                if key not in data and key not in self.pending:
+                    del self.data[key]
+            for key, value in data.items():
+                if key not in self.pending:
+                    self.data[key] = value
+            return
+
+        keys = [key for key in keys if key not in self.pending]
+        if not keys:
+            return
+
+        values = await self.async_redis.hmget(self.name, keys)
+        for key, value in zip(keys, values):
+            if value is None:
+                self.data.pop(key, None)
+            else:
+                self.data[key] = json.loads(value)
+
+    async def _listener(self):
+        while True:
+            pubsub = self.async_redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                # Catch up on anything changed before (re)subscribing
+                await self._reload()
+
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+
+                    data = json.loads(message["data"])
+                    if data.get("origin") == self.id:
+                        continue
+                    await self._reload(data.get("keys"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error(f"Error listening to {self.channel}: {e}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.reset()
+
+
+class ChatEventCoalescer:
+    """
+    Merges consecutive `chat:completion` events of a message emitted within
+    `window` seconds into one frame.
+
+    Content deltas are concatenated, full `content` snapshots and other fields
+    keep their latest value. Events that can't be merged (done, errors, tool
+    call deltas...) flush what is pending first, so ordering is preserved.
+    """
+
+    CONTROL_KEYS = ("done", "error")
+
+    def __init__(self, emit, window: float = 0.025):
+        # emit(session_ids, payload), sends one frame to each session
+        self.emit = emit
+        self.window = window
+        # {(chat_id, message_id): {"session_ids", "event", "count", "handle"}}
+        self.pending = {}
+        self.tasks = set()
+
+    @staticmethod
+    def _get_delta_content(data: dict) -> Optional[str]:
+        """The content of a plain text delta, None if it carries anything else."""
+        choices = data.get("choices")
+        if not isinstance(choices, list) or len(choices) != 1:
+            return None
+
+        choice = choices[0]
+        delta = choice.get("delta")
+        if (
+            not isinstance(delta, dict)
+            or set(delta) - {"content", "role"}
+            or choice.get("finish_reason")
+        ):
+            return None
+        return delta.get("content") or ""
+
+    def is_coalescable(self, event: dict) -> bool:
+        if event.get("type") != "chat:completion":
+            return False
+
+        data = event.get("data")
+        if not isinstance(data, dict) or any(key in data for key in self.CONTROL_KEYS):
+            return False
+
+        return "choices" not in data or self._get_delta_content(data) is not None
+
+    def _merge(self, data: dict, new_data: dict) -> dict:
+        merged = {**data, **new_data}
+        if "choices" in data and "choices" in new_data:
+            content = self._get_delta_content(data) + self._get_delta_content(new_data)
+            choice = new_data["choices"][0]
+            merged["choices"] = [
+                {**choice, "delta": {**choice["delta"], "content": content}}
+            ]
+        return merged
+
+    async def add(self, key: tuple, session_ids: list[str], event: dict):
+        entry = self.pending.get(key)
+        if entry is not None and entry["session_ids"] != session_ids:
+            await self.flush(key)
+            entry = None
+
+        if entry is None:
+            loop = asyncio.get_running_loop()
+            self.pending[key] = {
+                "session_ids": session_ids,
+                "event": event,
+                "count": 1,
+                "handle": loop.call_later(self.window, self._schedule_flush, key),
+            }
+            return
+
+        entry["event"] = {
+            **event,
+            "data": self._merge(entry["event"]["data"], event["data"]),
+        }
+        entry["count"] += 1
+
+    def _schedule_flush(self, key: tuple):
+        task = asyncio.create_task(self.flush(key))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def flush(self, key: tuple):
+        entry = self.pending.pop(key, None)
+        if entry is None:
+            return
+
+        entry["handle"].cancel()
+        chat_id, message_id = key
+        await self.emit(
+            entry["session_ids"],
+            {
+                "chat_id": chat_id,
+                "message_id": message_id,
+                "data": entry["event"],
+                # Extra field, clients that don't know it just see one event
+                "coalesced": entry["count"],
+            },
+        )
@@ -1,12 +1,19 @@
+import hashlib
 import os
 import shutil
 import json
 import logging
 import re
+import threading
+import uuid
 from abc import ABC, abstractmethod
-from typing import BinaryIO, Tuple, Dict
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import BinaryIO, Callable, Optional, Tuple, Dict
+from urllib.parse import quote
 
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.config import Config
 from botocore.exceptions import ClientError
 from open_webui.config import (
@@ -25,13 +32,15 @@ from open_webui.config import (
     AZURE_STORAGE_CONTAINER_NAME,
     AZURE_STORAGE_KEY,
     STORAGE_PROVIDER,
+    STORAGE_LOCAL_CACHE_MAX_SIZE,
+    STORAGE_PRESIGNED_URL_EXPIRY,
     UPLOAD_DIR,
 )
 from google.cloud import storage
 from google.cloud.exceptions import GoogleCloudError, NotFound
 from open_webui.constants import ERROR_MESSAGES
 from azure.identity import DefaultAzureCredential
-from azure.storage.blob import BlobServiceClient
+from azure.storage.blob import BlobSasPermissions, BlobServiceClient, generate_blob_sas
 from azure.core.exceptions import ResourceNotFoundError
 from open_webui.env import SRC_LOG_LEVELS
 
@@ -39,6 +48,157 @@ from open_webui.env import SRC_LOG_LEVELS
 log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["MAIN"])
 
+# Size of the chunks uploads are copied and sent in (S3 parts must be >= 5 MB,
+# GCS chunks a multiple of 256 KB)
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+class StorageFileCache:
+    """
+    Tracks the local copies in UPLOAD_DIR of files kept in S3/GCS/Azure, so
+    they are only downloaded again when the stored object changed:
+
+    - a copy is served when its size and ETag still match the object's,
+    - concurrent requests for the same file share a single download,
+    - the least recently used copies are removed past `max_size` bytes.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        # path -> {"etag": ..., "size": ...}, least recently used first
+        self.entries: OrderedDict[str, dict] = OrderedDict()
+        self.size = 0
+        self.downloads: dict[str, threading.Lock] = {}
+        self.directory = None
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    def _load(self):
+        """Index the copies left in UPLOAD_DIR by earlier runs, oldest first."""
+        if self.directory == UPLOAD_DIR:
+            return
+        self.directory = UPLOAD_DIR
+        self.entries.clear()
+        self.size = 0
+
+        copies = []
+        if os.path.isdir(UPLOAD_DIR):
+            for entry in os.scandir(UPLOAD_DIR):
+                if entry.is_file() and not entry.name.endswith(".download"):
+                    stat = entry.stat()
+                    copies.append((stat.st_atime, entry.path, stat.st_size))
+        for _, path, size in sorted(copies):
+            path = f"{UPLOAD_DIR}/{os.path.basename(path)}"
+            self.entries[path] = {"etag": None, "size": size}
+            self.size += size
+
+    def _evict(self, keep: str):
+        while self.max_size and self.size > self.max_size and len(self.entries) > 1:
+            path = next(iter(self.entries))
+            if path == keep:
+                self.entries.move_to_end(path)
+                continue
+            entry = self.entries.pop(path)
+            self.size -= entry["size"]
+            self.evictions += 1
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                log.warning(f"Error removing cached file {path}: {e}")
+
+    def put(self, path: str, etag: Optional[str] = None):
+        """Record the local copy at `path`, just uploaded or downloaded."""
+        with self.lock:
+            self._load()
+            size = os.path.getsize(path)
+            entry = self.entries.pop(path, None)
+            if entry is not None:
+                self.size -= entry["size"]
+            self.entries[path] = {"etag": etag, "size": size}
+            self.size += size
+            self._evict(keep=path)
+
+    def discard(self, path: str):
+        with self.lock:
+            entry = self.entries.pop(path, None)
+            if entry is not None:
+                self.size -= entry["size"]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def get(
+        self,
+        path: str,
+        stat: Callable[[], Tuple[Optional[str], Optional[int]]],
+        download: Callable[[str], None],
+    ) -> str:
+        """
+        The local copy at `path`, downloaded with `download(tmp_path)` unless
+        the one on disk matches the (etag, size) `stat()` returns for the object.
+        """
+        with self.lock:
+            download_lock = self.downloads.setdefault(path, threading.Lock())
+
+        try:
+            with download_lock:
+                etag, size = stat()
+
+                with self.lock:
+                    self._load()
+                    entry = self.entries.get(path)
+                    if entry is not None and os.path.isfile(path):
+                        if (size is None or entry["size"] == size) and (
+                            etag is None or entry["etag"] in (None, etag)
+                        ):
+                            # Copies recorded without an ETag are validated by size
+                            entry["etag"] = etag or entry["etag"]
+                            self.entries.move_to_end(path)
+                            self.hits += 1
+                            return path
+                        self.stale += 1
+                    self.misses += 1
+
+                tmp_path = f"{path}.{uuid.uuid4().hex}.download"
+                try:
+                    download(tmp_path)
+                    os.replace(tmp_path, path)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+
+                self.put(path, etag)
+                return path
+        finally:
+            with self.lock:
+                if not download_lock.locked():
+                    self.downloads.pop(path, None)
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            requests = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "size": self.size,
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / requests if requests else 0.0,
+            }
+
+
+StorageCache = StorageFileCache(max_size=STORAGE_LOCAL_CACHE_MAX_SIZE * 1024 * 1024)
+
 
 class StorageProvider(ABC):
     @abstractmethod
@@ -51,6 +211,28 @@ class StorageProvider(ABC):
     ) -> Tuple[bytes, str]:
         pass
 
+    def upload_file_stream(
+        self, file: BinaryIO, filename: str, tags: Dict[str, str]
+    ) -> Tuple[int, str, str]:
+        """
+        Like `upload_file`, but copies `file` in chunks instead of reading it
+        whole and returns (size, SHA-256 hex digest, path) rather than the bytes.
+        """
+        contents, file_path = self.upload_file(file, filename, tags)
+        return len(contents), hashlib.sha256(contents).hexdigest(), file_path
+
+    def get_presigned_url(
+        self,
+        file_path: str,
+        content_disposition: Optional[str] = None,
+        content_type: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        A short-lived URL the client can download `file_path` from directly,
+        served with the given headers, or None when the provider can't sign one.
+        """
+        return None
+
     @abstractmethod
     def delete_all_files(self) -> None:
         pass
@@ -73,6 +255,28 @@ class LocalStorageProvider(StorageProvider):
             f.write(contents)
         return contents, file_path
 
+    @staticmethod
+    def upload_file_stream(
+        file: BinaryIO, filename: str, tags: Dict[str, str]
+    ) -> Tuple[int, str, str]:
+        file_path = f"{UPLOAD_DIR}/{filename}"
+        tmp_path = f"{file_path}.{uuid.uuid4().hex}.upload"
+        size = 0
+        sha256 = hashlib.sha256()
+        try:
+            with open(tmp_path, "wb") as f:
+                while chunk := file.read(UPLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+                    sha256.update(chunk)
+                    size += len(chunk)
+            if not size:
+                raise ValueError(ERROR_MESSAGES.EMPTY_CONTENT)
+            os.replace(tmp_path, file_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return size, sha256.hexdigest(), file_path
+
     @staticmethod
     def get_file(file_path: str) -> str:
         """Handles downloading of the file from local storage."""
@@ -136,6 +340,11 @@ class S3StorageProvider(StorageProvider):
 
         self.bucket_name = S3_BUCKET_NAME
         self.key_prefix = S3_KEY_PREFIX if S3_KEY_PREFIX else ""
+        # Files past one chunk are sent as a multipart upload, straight from disk
+        self.transfer_config = TransferConfig(
+            multipart_threshold=UPLOAD_CHUNK_SIZE,
+            multipart_chunksize=UPLOAD_CHUNK_SIZE,
+        )
 
     @staticmethod
     def sanitize_tag_value(s: str) -> str:
@@ -146,10 +355,25 @@ class S3StorageProvider(StorageProvider):
         self, file: BinaryIO, filename: str, tags: Dict[str, str]
     ) -> Tuple[bytes, str]:
         """Handles uploading of the file to S3 storage."""
-        _, file_path = LocalStorageProvider.upload_file(file, filename, tags)
+        contents, file_path = LocalStorageProvider.upload_file(file, filename, tags)
+        return contents, self._upload_local_file(file_path, filename, tags)
+
+    def upload_file_stream(
+        self, file: BinaryIO, filename: str, tags: Dict[str, str]
+    ) -> Tuple[int, str, str]:
+        size, sha256, file_path = LocalStorageProvider.upload_file_stream(
+            file, filename, tags
+        )
+        return size, sha256, self._upload_local_file(file_path, filename, tags)
+
+    def _upload_local_file(
+        self, file_path: str, filename: str, tags: Dict[str, str]
+    ) -> str:
         s3_key = os.path.join(self.key_prefix, filename)
         try:
-            self.s3_client.upload_file(file_path, self.bucket_name, s3_key)
+            self.s3_client.upload_file(
+                file_path, self.bucket_name, s3_key, Config=self.transfer_config
+            )
             if S3_ENABLE_TAGGING and tags:
                 sanitized_tags = {
                     self.sanitize_tag_value(k): self.sanitize_tag_value(v)
@@ -165,10 +389,8 @@ class S3StorageProvider(StorageProvider):
                     Key=s3_key,
                     Tagging=tagging,
                 )
-            return (
-                open(file_path, "rb").read(),
-                f"s3://{self.bucket_name}/{s3_key}",
-            )
+            StorageCache.put(file_path)
+            return f"s3://{self.bucket_name}/{s3_key}"
         except ClientError as e:
             raise RuntimeError(f"Error uploading file to S3: {e}")
 
@@ -177,11 +399,45 @@ class S3StorageProvider(StorageProvider):
         try:
             s3_key = self._extract_s3_key(file_path)
             local_file_path = self._get_local_file_path(s3_key)
-            self.s3_client.download_file(self.bucket_name, s3_key, local_file_path)
-            return local_file_path
+
+            def stat():
+                response = self.s3_client.head_object(
+                    Bucket=self.bucket_name, Key=s3_key
+                )
+                return response.get("ETag"), response.get("ContentLength")
+
+            return StorageCache.get(
+                local_file_path,
+                stat,
+                lambda path: self.s3_client.download_file(
+                    self.bucket_name, s3_key, path
+                ),
+            )
         except ClientError as e:
             raise RuntimeError(f"Error downloading file from S3: {e}")
 
+    def get_presigned_url(
+        self,
+        file_path: str,
+        content_disposition: Optional[str] = None,
+        content_type: Optional[str] = None,
+    ) -> Optional[str]:
+        params = {
+            "Bucket": self.bucket_name,
+            "Key": self._extract_s3_key(file_path),
+        }
+        if content_disposition:
+            params["ResponseContentDisposition"] = content_disposition
+        if content_type:
+            params["ResponseContentType"] = content_type
+        try:
+            return self.s3_client.generate_presigned_url(
+                "get_object", Params=params, ExpiresIn=STORAGE_PRESIGNED_URL_EXPIRY
+            )
+        except ClientError as e:
+            log.warning(f"Error presigning S3 URL: {e}")
+            return None
+
     def delete_file(self, file_path: str) -> None:
         """Handles deletion of the file from S3 storage."""
         try:
@@ -191,6 +447,7 @@ class S3StorageProvider(StorageProvider):
             raise RuntimeError(f"Error deleting file from S3: {e}")
 
         # Always delete from local storage
+        StorageCache.discard(self._get_local_file_path(s3_key))
         LocalStorageProvider.delete_file(file_path)
 
     def delete_all_files(self) -> None:
@@ -210,6 +467,7 @@ class S3StorageProvider(StorageProvider):
             raise RuntimeError(f"Error deleting all files from S3: {e}")
 
         # Always delete from local storage
+        StorageCache.clear()
         LocalStorageProvider.delete_all_files()
 
     # The s3 key is the name assigned to an object. It excludes the bucket name, but includes the internal path and the file name.
@@ -240,10 +498,23 @@ class GCSStorageProvider(StorageProvider):
     ) -> Tuple[bytes, str]:
         """Handles uploading of the file to GCS storage."""
         contents, file_path = LocalStorageProvider.upload_file(file, filename, tags)
+        return contents, self._upload_local_file(file_path, filename)
+
+    def upload_file_stream(
+        self, file: BinaryIO, filename: str, tags: Dict[str, str]
+    ) -> Tuple[int, str, str]:
+        size, sha256, file_path = LocalStorageProvider.upload_file_stream(
+            file, filename, tags
+        )
+        return size, sha256, self._upload_local_file(file_path, filename)
+
+    def _upload_local_file(self, file_path: str, filename: str) -> str:
         try:
-            blob = self.bucket.blob(filename)
+            # Setting a chunk size makes it a resumable upload, sent chunk by chunk
+            blob = self.bucket.blob(filename, chunk_size=UPLOAD_CHUNK_SIZE)
             blob.upload_from_filename(file_path)
-            return contents, "gs://" + self.bucket_name + "/" + filename
+            StorageCache.put(file_path, blob.etag)
+            return "gs://" + self.bucket_name + "/" + filename
         except GoogleCloudError as e:
             raise RuntimeError(f"Error uploading file to GCS: {e}")
 
@@ -252,13 +523,40 @@ class GCSStorageProvider(StorageProvider):
         try:
             filename = file_path.removeprefix("gs://").split("/")[1]
             local_file_path = f"{UPLOAD_DIR}/{filename}"
-            blob = self.bucket.get_blob(filename)
-            blob.download_to_filename(local_file_path)
+            blob = None
+
+            def stat():
+                nonlocal blob
+                blob = self.bucket.get_blob(filename)
+                if blob is None:
+                    raise NotFound(f"{filename} not found")
+                return blob.etag, blob.size
 
-            return local_file_path
+            return StorageCache.get(
+                local_file_path, stat, lambda path: blob.download_to_filename(path)
+            )
         except NotFound as e:
             raise RuntimeError(f"Error downloading file from GCS: {e}")
 
+    def get_presigned_url(
+        self,
+        file_path: str,
+        content_disposition: Optional[str] = None,
+        content_type: Optional[str] = None,
+    ) -> Optional[str]:
+        try:
+            blob = self.bucket.blob(file_path.removeprefix("gs://").split("/")[1])
+            return blob.generate_signed_url(
+                version="v4",
+                expiration=timedelta(seconds=STORAGE_PRESIGNED_URL_EXPIRY),
+                response_disposition=content_disposition,
+                response_type=content_type,
+            )
+        except Exception as e:
+            # Signing needs service account credentials
+            log.warning(f"Error signing GCS URL: {e}")
+            return None
+
     def delete_file(self, file_path: str) -> None:
         """Handles deletion of the file from GCS storage."""
         try:
@@ -269,6 +567,7 @@ class GCSStorageProvider(StorageProvider):
             raise RuntimeError(f"Error deleting file from GCS: {e}")
 
         # Always delete from local storage
+        StorageCache.discard(f"{UPLOAD_DIR}/{filename}")
         LocalStorageProvider.delete_file(file_path)
 
     def delete_all_files(self) -> None:
@@ -283,6 +582,7 @@ class GCSStorageProvider(StorageProvider):
             raise RuntimeError(f"Error deleting all files from GCS: {e}")
 
         # Always delete from local storage
+        StorageCache.clear()
         LocalStorageProvider.delete_all_files()
 
 
@@ -295,13 +595,19 @@ class AzureStorageProvider(StorageProvider):
         if storage_key:
             # Configure using the Azure Storage Account Endpoint and Key
             self.blob_service_client = BlobServiceClient(
-                account_url=self.endpoint, credential=storage_key
+                account_url=self.endpoint,
+                credential=storage_key,
+                max_single_put_size=UPLOAD_CHUNK_SIZE,
+                max_block_size=UPLOAD_CHUNK_SIZE,
             )
         else:
             # Configure using the Azure Storage Account Endpoint and DefaultAzureCredential
             # If the key is not configured, then the DefaultAzureCredential will be used to support Managed Identity authentication
             self.blob_service_client = BlobServiceClient(
-                account_url=self.endpoint, credential=DefaultAzureCredential()
+                account_url=self.endpoint,
+                credential=DefaultAzureCredential(),
+                max_single_put_size=UPLOAD_CHUNK_SIZE,
+                max_block_size=UPLOAD_CHUNK_SIZE,
             )
         self.container_client = self.blob_service_client.get_container_client(
             self.container_name
@@ -314,23 +620,76 @@ class AzureStorageProvider(StorageProvider):
         contents, file_path = LocalStorageProvider.upload_file(file, filename, tags)
         try:
             blob_client = self.container_client.get_blob_client(filename)
-            blob_client.upload_blob(contents, overwrite=True)
+            response = blob_client.upload_blob(contents, overwrite=True)
+            StorageCache.put(file_path, (response or {}).get("etag"))
             return contents, f"{self.endpoint}/{self.container_name}/{filename}"
         except Exception as e:
             raise RuntimeError(f"Error uploading file to Azure Blob Storage: {e}")
 
+    def upload_file_stream(
+        self, file: BinaryIO, filename: str, tags: Dict[str, str]
+    ) -> Tuple[int, str, str]:
+        size, sha256, file_path = LocalStorageProvider.upload_file_stream(
+            file, filename, tags
+        )
+        try:
+            blob_client = self.container_client.get_blob_client(filename)
+            # Sent as staged blocks read from the file, one chunk at a time
+            with open(file_path, "rb") as f:
+                response = blob_client.upload_blob(
+                    f, length=size, overwrite=True, max_concurrency=1
+                )
+            StorageCache.put(file_path, (response or {}).get("etag"))
+            return size, sha256, f"{self.endpoint}/{self.container_name}/{filename}"
+        except Exception as e:
+            raise RuntimeError(f"Error uploading file to Azure Blob Storage: {e}")
+
     def get_file(self, file_path: str) -> str:
         """Handles downloading of the file from Azure Blob Storage."""
         try:
             filename = file_path.split("/")[-1]
             local_file_path = f"{UPLOAD_DIR}/{filename}"
             blob_client = self.container_client.get_blob_client(filename)
-            with open(local_file_path, "wb") as download_file:
-                download_file.write(blob_client.download_blob().readall())
-            return local_file_path
+
+            def stat():
+                properties = blob_client.get_blob_properties()
+                return properties.etag, properties.size
+
+            def download(path: str):
+                with open(path, "wb") as download_file:
+                    download_file.write(blob_client.download_blob().readall())
+
+            return StorageCache.get(local_file_path, stat, download)
         except ResourceNotFoundError as e:
             raise RuntimeError(f"Error downloading file from Azure Blob Storage: {e}")
 
+    def get_presigned_url(
+        self,
+        file_path: str,
+        content_disposition: Optional[str] = None,
+        content_type: Optional[str] = None,
+    ) -> Optional[str]:
+        # SAS tokens are signed with the account key
+        if not AZURE_STORAGE_KEY:
+            return None
+        try:
+            name = file_path.split("/")[-1]
+            sas = generate_blob_sas(
+                account_name=self.blob_service_client.account_name,
+                container_name=self.container_name,
+                blob_name=name,
+                account_key=AZURE_STORAGE_KEY,
+                permission=BlobSasPermissions(read=True),
+                expiry=datetime.now(timezone.utc)
+                + timedelta(seconds=STORAGE_PRESIGNED_URL_EXPIRY),
+                content_disposition=content_disposition,
+                content_type=content_type,
+            )
+            return f"{self.endpoint}/{self.container_name}/{quote(name)}?{sas}"
+        except Exception as e:
+            log.warning(f"Error generating Azure SAS URL: {e}")
+            return None
+
     def delete_file(self, file_path: str) -> None:
         """Handles deletion of the file from Azure Blob Storage."""
         try:
@@ -341,6 +700,7 @@ class AzureStorageProvider(StorageProvider):
             raise RuntimeError(f"Error deleting file from Azure Blob Storage: {e}")
 
         # Always delete from local storage
+        StorageCache.discard(f"{UPLOAD_DIR}/{filename}")
         LocalStorageProvider.delete_file(file_path)
 
     def delete_all_files(self) -> None:
@@ -353,6 +713,7 @@ class AzureStorageProvider(StorageProvider):
             raise RuntimeError(f"Error deleting all files from Azure Blob Storage: {e}")
 
         # Always delete from local storage
+        StorageCache.clear()
         LocalStorageProvider.delete_all_files()
 
 
@@ -0,0 +1,112 @@
+import hashlib
+import os
+import subprocess
+import sys
+
+import pytest
+from open_webui.storage import provider
+
+# Small chunks, so a small file still spans many of them
+CHUNK_SIZE = 1024 * 1024
+FILE_SIZE = 16 * CHUNK_SIZE
+
+# Uploads `argv[1]` with `argv[3]` and prints how much the peak RSS grew
+PEAK_RSS_SCRIPT = """
+import resource, sys
+from open_webui.storage import provider
+
+provider.UPLOAD_DIR = sys.argv[2]
+provider.UPLOAD_CHUNK_SIZE = int(sys.argv[4])
+upload = getattr(provider.LocalStorageProvider, sys.argv[3])
+
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+with open(sys.argv[1], "rb") as f:
+    upload(f, sys.argv[3] + ".bin", {})
+after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+# Kilobytes on Linux, bytes on macOS
+print((after - before) * (1 if sys.platform == "darwin" else 1024))
+"""
+
+# A process exec'd from this one starts with our peak RSS as its own, so the
+# script runs in a child of a fresh interpreter instead
+LAUNCHER = "import subprocess, sys; sys.exit(subprocess.call(sys.argv[1:]))"
+
+
+@pytest.fixture
+def upload_dir(monkeypatch, tmp_path):
+    directory = tmp_path / "uploads"
+    directory.mkdir()
+    monkeypatch.setattr(provider, "UPLOAD_DIR", str(directory))
+    monkeypatch.setattr(provider, "UPLOAD_CHUNK_SIZE", CHUNK_SIZE)
+    return directory
+
+
+@pytest.fixture(scope="module")
+def source_file(tmp_path_factory):
+    path = tmp_path_factory.mktemp("source") / "source.bin"
+    sha256 = hashlib.sha256()
+    with open(path, "wb") as f:
+        for _ in range(FILE_SIZE // CHUNK_SIZE):
+            chunk = os.urandom(CHUNK_SIZE)
+            f.write(chunk)
+            sha256.update(chunk)
+    return path, sha256.hexdigest()
+
+
+def get_peak_rss_growth(path, upload_dir, method: str) -> int:
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            LAUNCHER,
+            sys.executable,
+            "-c",
+            PEAK_RSS_SCRIPT,
+            str(path),
+            str(upload_dir),
+            method,
+            str(CHUNK_SIZE),
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return int(result.stdout.strip().splitlines()[-1])
+
+
+def test_upload_file_stream(upload_dir, source_file):
+    path, expected_sha256 = source_file
+
+    with open(path, "rb") as f:
+        size, sha256, file_path = provider.LocalStorageProvider.upload_file_stream(
+            f, "test.bin", {}
+        )
+
+    assert size == FILE_SIZE
+    assert sha256 == expected_sha256
+    assert file_path == f"{upload_dir}/test.bin"
+    assert os.path.getsize(file_path) == FILE_SIZE
+    assert os.listdir(upload_dir) == ["test.bin"]
+
+
+def test_upload_file_stream_empty(upload_dir, tmp_path):
+    path = tmp_path / "empty.bin"
+    path.write_bytes(b"")
+
+    with pytest.raises(ValueError):
+        with open(path, "rb") as f:
+            provider.LocalStorageProvider.upload_file_stream(f, "empty.bin", {})
+    assert os.listdir(upload_dir) == []
+
+
+def test_upload_file_stream_peak_memory(upload_dir, source_file):
+    """Peak RSS grows by about one chunk, whatever the size of the file."""
+    pytest.importorskip("resource")
+    path, _ = source_file
+
+    stream_growth = get_peak_rss_growth(path, upload_dir, "upload_file_stream")
+    whole_growth = get_peak_rss_growth(path, upload_dir, "upload_file")
+
+    assert stream_growth < 4 * CHUNK_SIZE
+    assert whole_growth >= FILE_SIZE // 2
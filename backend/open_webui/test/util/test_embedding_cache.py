@@ -0,0 +1,72 @@
+from open_webui.retrieval import embedding_cache
+from open_webui.retrieval.embedding_cache import (
+    EmbeddingCache,
+    get_cached_embedding_function,
+)
+
+
+class RecordingRedis:
+    """Just enough of a Redis client to see how `clear` deletes keys."""
+
+    def __init__(self, keys: list[str]):
+        self.keys = set(keys)
+        self.deletes = []
+
+    def scan_iter(self, match: str, count: int = None):
+        prefix = match.rstrip("*")
+        yield from sorted(key for key in self.keys if key.startswith(prefix))
+
+    def delete(self, *keys):
+        self.deletes.append(keys)
+        self.keys.difference_update(keys)
+
+
+def embed(texts, prefix=None, user=None):
+    return [[float(len(text))] for text in texts]
+
+
+def test_key_includes_url():
+    key = EmbeddingCache.get_key("openai", "text-embedding-3-small", None, "hi", "a")
+
+    assert key != EmbeddingCache.get_key(
+        "openai", "text-embedding-3-small", None, "hi", "b"
+    )
+    assert key == EmbeddingCache.get_key(
+        "openai", "text-embedding-3-small", None, "hi", "a/"
+    )
+
+
+def test_cached_embedding_function_per_url():
+    cache = EmbeddingCache()
+    calls = []
+
+    def counting_embed(texts, prefix=None, user=None):
+        calls.append(texts)
+        return embed(texts)
+
+    first = get_cached_embedding_function(
+        counting_embed, "ollama", "nomic-embed-text", cache, "http://a:11434"
+    )
+    second = get_cached_embedding_function(
+        counting_embed, "ollama", "nomic-embed-text", cache, "http://b:11434"
+    )
+
+    assert first("hello") == [5.0]
+    assert first(["hello"]) == [[5.0]]
+    assert second("hello") == [5.0]
+    assert calls == [["hello"], ["hello"]]
+
+
+def test_clear_deletes_in_batches(monkeypatch):
+    monkeypatch.setattr(embedding_cache, "CLEAR_BATCH_SIZE", 2)
+    redis = RecordingRedis(
+        [f"{embedding_cache.REDIS_KEY_PREFIX}:{i}" for i in range(5)] + ["other"]
+    )
+    cache = EmbeddingCache(redis=redis)
+    cache._set_local("local", [1.0])
+
+    cache.clear()
+
+    assert cache.entries == {}
+    assert [len(keys) for keys in redis.deletes] == [2, 2, 1]
+    assert redis.keys == {"other"}
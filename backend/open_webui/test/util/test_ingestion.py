@@ -0,0 +1,82 @@
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from open_webui.models.files import FileForm, Files
+from open_webui.models.ingestion import IngestionJobs
+from open_webui.models.knowledge import KnowledgeForm, Knowledges
+from open_webui.utils import ingestion
+from open_webui.utils.ingestion import IngestionJobRunner
+
+USER_ID = "test-ingestion-user"
+
+
+@pytest.fixture
+def knowledge():
+    knowledge = Knowledges.insert_new_knowledge(
+        USER_ID,
+        KnowledgeForm(name="test", description="", data={"file_ids": []}),
+    )
+    yield knowledge
+    Knowledges.delete_knowledge_by_id(knowledge.id)
+
+
+@pytest.fixture
+def file():
+    file = Files.insert_new_file(
+        USER_ID,
+        FileForm(
+            id=str(uuid.uuid4()),
+            filename="test.txt",
+            path="test.txt",
+            data={"content": "hello"},
+        ),
+    )
+    yield file
+    Files.delete_file_by_id(file.id)
+
+
+def run_job(job, bypass: bool):
+    app = SimpleNamespace(
+        state=SimpleNamespace(
+            config=SimpleNamespace(BYPASS_EMBEDDING_AND_RETRIEVAL=bypass)
+        )
+    )
+    runner = IngestionJobRunner(concurrency=1)
+
+    async def run():
+        assert runner.start(app, job)
+        await runner.tasks[job.id]
+
+    asyncio.run(run())
+    return IngestionJobs.get_job_by_id(job.id)
+
+
+def test_bypass_embedding_links_files(monkeypatch, knowledge, file):
+    def _no_embedding(*args, **kwargs):
+        raise AssertionError("files must not be embedded in bypass mode")
+
+    monkeypatch.setattr(ingestion, "load_item", _no_embedding)
+    monkeypatch.setattr(ingestion, "embed_chunks", _no_embedding)
+
+    job = IngestionJobs.insert_new_job(
+        USER_ID, "knowledge_files", [(knowledge.id, file.id)]
+    )
+    job = run_job(job, bypass=True)
+
+    assert job.status == "completed"
+    assert (job.processed, job.failed) == (1, 0)
+    assert Files.get_file_by_id(file.id).meta["collection_name"] == knowledge.id
+    assert Knowledges.get_knowledge_by_id(knowledge.id).data["file_ids"] == [file.id]
+
+
+def test_bypass_embedding_missing_file(knowledge):
+    job = IngestionJobs.insert_new_job(
+        USER_ID, "knowledge_files", [(knowledge.id, str(uuid.uuid4()))]
+    )
+    job = run_job(job, bypass=True)
+
+    assert job.status == "completed"
+    assert (job.processed, job.failed) == (0, 1)
+    assert Knowledges.get_knowledge_by_id(knowledge.id).data["file_ids"] == []
@@ -0,0 +1,191 @@
+import os
+import uuid
+
+import pytest
+from open_webui.models.billing import (
+    CreditTransactionForm,
+    CreditTransactions,
+    PlanEnum,
+    UserCredits,
+    UserCreditsForm,
+)
+from open_webui.utils import ledger
+from open_webui.utils.ledger import CreditLedger
+
+BALANCE = 1000
+
+
+@pytest.fixture
+def user_id():
+    user_id = f"test-ledger-{uuid.uuid4()}"
+    UserCredits.insert_new_user_credits(
+        user_id,
+        UserCreditsForm(
+            user_id=user_id,
+            plan_id=PlanEnum.pro,
+            credit_balance=BALANCE,
+            monthly_quota=BALANCE,
+        ),
+    )
+    return user_id
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    """A live Redis from TEST_REDIS_URL, with the ledger keys under a fresh prefix."""
+    url = os.environ.get("TEST_REDIS_URL")
+    if not url:
+        pytest.skip("TEST_REDIS_URL is not set")
+
+    import redis
+
+    client = redis.Redis.from_url(url, decode_responses=True)
+    prefix = f"test-ledger-{uuid.uuid4().hex}"
+    monkeypatch.setattr(ledger, "REDIS_KEY_PREFIX", prefix)
+    yield client
+    keys = list(client.scan_iter(f"{prefix}:*"))
+    if keys:
+        client.delete(*keys)
+
+
+def debit(credit_ledger, user_id, tx_id, credits=10):
+    return credit_ledger.debit(user_id, tx_id, credits, 0.01, "gpt-4o")
+
+
+def db_balance(user_id):
+    return UserCredits.get_user_credits(user_id).credit_balance
+
+
+# ------------------------------------------------------------------
+# Without Redis
+# ------------------------------------------------------------------
+def test_debit_idempotent(user_id):
+    credit_ledger = CreditLedger()
+
+    assert debit(credit_ledger, user_id, f"{user_id}:1")
+    assert not debit(credit_ledger, user_id, f"{user_id}:1")
+    assert credit_ledger.get_account(user_id).credit_balance == BALANCE - 10
+    assert credit_ledger.stats["duplicate_debits"] == 1
+
+    assert credit_ledger.settle() == 1
+    assert db_balance(user_id) == BALANCE - 10
+    assert credit_ledger.get_account(user_id).credit_balance == BALANCE - 10
+    assert credit_ledger.pending_deltas == {}
+
+
+def test_debit_without_wallet():
+    credit_ledger = CreditLedger()
+
+    user_id = f"test-ledger-{uuid.uuid4()}"
+    assert not debit(credit_ledger, user_id, f"{user_id}:1")
+    assert credit_ledger.pending == []
+    # Not remembered, it can still be debited once the wallet exists
+    assert credit_ledger.tx_ids == {}
+
+
+def test_settle_restores_on_error(monkeypatch, user_id):
+    credit_ledger = CreditLedger()
+    debit(credit_ledger, user_id, f"{user_id}:1")
+    debit(credit_ledger, user_id, f"{user_id}:2")
+
+    def _fail(transactions):
+        raise RuntimeError("database is locked")
+
+    with monkeypatch.context() as m:
+        m.setattr(CreditTransactions, "settle_transactions", _fail)
+        assert credit_ledger.settle() == 0
+
+    assert [tx["tx_id"] for tx in credit_ledger.pending] == [
+        f"{user_id}:1",
+        f"{user_id}:2",
+    ]
+    assert credit_ledger.get_account(user_id).credit_balance == BALANCE - 20
+    assert db_balance(user_id) == BALANCE
+
+    assert credit_ledger.settle() == 2
+    assert db_balance(user_id) == BALANCE - 20
+    assert credit_ledger.get_account(user_id).credit_balance == BALANCE - 20
+
+
+def test_settle_skips_settled_transactions(user_id):
+    # Billed and settled before a restart, then debited again
+    tx_id = str(uuid.uuid4())
+    CreditTransactions.insert_transaction(
+        user_id,
+        CreditTransactionForm(
+            tx_id=tx_id, delta=-10, usd_spend=0.01, model_name="gpt-4o"
+        ),
+    )
+    UserCredits.update_credits(user_id, -10)
+
+    credit_ledger = CreditLedger()
+    assert debit(credit_ledger, user_id, tx_id)
+    assert credit_ledger.get_account(user_id).credit_balance == BALANCE - 20
+
+    assert credit_ledger.settle() == 1
+    assert credit_ledger.stats["settled"] == 0
+    assert db_balance(user_id) == BALANCE - 10
+    assert credit_ledger.get_account(user_id).credit_balance == BALANCE - 10
+
+
+# ------------------------------------------------------------------
+# With Redis
+# ------------------------------------------------------------------
+def test_redis_debit_idempotent(redis, user_id):
+    credit_ledger = CreditLedger(redis=redis)
+
+    assert debit(credit_ledger, user_id, f"{user_id}:1")
+    assert not debit(credit_ledger, user_id, f"{user_id}:1")
+    # Another worker shares the balance and the claimed tx_ids
+    other = CreditLedger(redis=redis)
+    assert not debit(other, user_id, f"{user_id}:1")
+    assert other.get_account(user_id).credit_balance == BALANCE - 10
+
+    # Debited again after the balance is dropped, it is reloaded first
+    other.invalidate(user_id)
+    assert debit(other, user_id, f"{user_id}:2")
+    assert credit_ledger.get_account(user_id).credit_balance == BALANCE - 20
+
+    credit_ledger.settle_all()
+    assert db_balance(user_id) == BALANCE - 20
+    assert credit_ledger.get_account(user_id).credit_balance == BALANCE - 20
+    assert credit_ledger.get_stats()["pending"] == 0
+
+
+def test_redis_settle_restores_on_error(monkeypatch, redis, user_id):
+    credit_ledger = CreditLedger(redis=redis)
+    debit(credit_ledger, user_id, f"{user_id}:1")
+
+    def _fail(transactions):
+        raise RuntimeError("database is locked")
+
+    with monkeypatch.context() as m:
+        m.setattr(CreditTransactions, "settle_transactions", _fail)
+        assert credit_ledger.settle() == 0
+
+    assert credit_ledger.get_stats()["pending"] == 1
+    assert credit_ledger.get_account(user_id).credit_balance == BALANCE - 10
+
+    assert credit_ledger.settle() == 1
+    assert db_balance(user_id) == BALANCE - 10
+    assert credit_ledger.get_account(user_id).credit_balance == BALANCE - 10
+
+
+def test_redis_requeue_dead_workers(redis, user_id):
+    dead = CreditLedger(redis=redis)
+    debit(dead, user_id, f"{user_id}:1")
+    debit(dead, user_id, f"{user_id}:2")
+    # Claimed, then the worker stopped before committing
+    assert len(dead._claim_pending()) == 2
+
+    alive = CreditLedger(redis=redis)
+    assert alive.settle() == 0
+    assert alive.requeue_dead_workers() == 0
+
+    redis.delete(dead._heartbeat_key(dead.worker_id))
+    assert alive.requeue_dead_workers() == 2
+    assert not redis.exists(dead._processing_key(dead.worker_id))
+
+    assert alive.settle() == 2
+    assert db_balance(user_id) == BALANCE - 20
+    assert alive.get_account(user_id).credit_balance == BALANCE - 20
@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+from open_webui.utils import message_buffer
+from open_webui.utils.message_buffer import MessageWriteBuffer
+
+INTERVAL = 0.05
+KEY = ("chat", "message")
+
+
+@pytest.fixture
+def messages(monkeypatch):
+    """The stored messages, {(chat_id, message_id): message}."""
+    messages = {KEY: {"content": "Hello"}}
+
+    def get_message(chat_id, message_id):
+        message = messages.get((chat_id, message_id))
+        return dict(message) if message is not None else None
+
+    def upsert_message(chat_id, message_id, fields):
+        messages[(chat_id, message_id)] = {**messages[(chat_id, message_id)], **fields}
+
+    monkeypatch.setattr(
+        message_buffer.Chats, "get_message_by_id_and_message_id", get_message
+    )
+    monkeypatch.setattr(
+        message_buffer.Chats,
+        "upsert_message_to_chat_by_id_and_message_id",
+        upsert_message,
+    )
+    return messages
+
+
+def test_flush_releases_message(messages):
+    buffer = MessageWriteBuffer(interval=INTERVAL, max_size=1024)
+
+    async def stream():
+        buffer.append_content(*KEY, ", ")
+        buffer.append_content(*KEY, "world")
+        assert messages[KEY]["content"] == "Hello"
+        buffer.flush(*KEY)
+
+    asyncio.run(stream())
+
+    assert messages[KEY]["content"] == "Hello, world"
+    assert buffer.stats["flushes"] == 1
+    assert buffer.messages == {}
+
+
+def test_timer_flush_releases_message(messages):
+    buffer = MessageWriteBuffer(interval=INTERVAL, max_size=1024)
+
+    async def stream():
+        # e.g. `message` events of a tool, never flushed at the end of a stream
+        buffer.append_content(*KEY, ", ")
+        buffer.append_content(*KEY, "world")
+        await asyncio.sleep(INTERVAL * 3)
+
+    asyncio.run(stream())
+
+    assert messages[KEY]["content"] == "Hello, world"
+    assert buffer.stats["flushes"] == 1
+    assert buffer.messages == {}
+
+
+def test_append_after_timer_flush_rereads_content(messages):
+    buffer = MessageWriteBuffer(interval=INTERVAL, max_size=1024)
+
+    async def stream():
+        buffer.append_content(*KEY, "!")
+        await asyncio.sleep(INTERVAL * 3)
+        # Edited by the user in the meantime
+        messages[KEY]["content"] = "Hi!"
+        buffer.append_content(*KEY, "!")
+        buffer.flush(*KEY)
+
+    asyncio.run(stream())
+
+    assert messages[KEY]["content"] == "Hi!!"
+
+
+def test_timer_flush_retries_failed_flush(monkeypatch, messages):
+    buffer = MessageWriteBuffer(interval=INTERVAL, max_size=1024)
+    upsert_message = message_buffer.Chats.upsert_message_to_chat_by_id_and_message_id
+
+    def fail_once(*args):
+        monkeypatch.setattr(
+            message_buffer.Chats,
+            "upsert_message_to_chat_by_id_and_message_id",
+            upsert_message,
+        )
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(
+        message_buffer.Chats, "upsert_message_to_chat_by_id_and_message_id", fail_once
+    )
+
+    async def stream():
+        buffer.append_content(*KEY, "!")
+        await asyncio.sleep(INTERVAL * 1.5)
+        assert KEY in buffer.messages
+        await asyncio.sleep(INTERVAL * 2)
+
+    asyncio.run(stream())
+
+    assert buffer.stats["flush_errors"] == 1
+    assert messages[KEY]["content"] == "Hello!"
+    assert buffer.messages == {}
+
+
+def test_write_outside_event_loop(messages):
+    buffer = MessageWriteBuffer(interval=INTERVAL, max_size=1024)
+
+    buffer.append_content(*KEY, "!")
+
+    assert messages[KEY]["content"] == "Hello!"
+    assert buffer.messages == {}
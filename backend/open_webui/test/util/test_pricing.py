@@ -1,32 +1,25 @@
 # tests/test_pricing.py
-import json, types, sys, pytest
+import json, pytest
 from decimal import Decimal
-from open_webui.utils.pricing import estimate_cost, _load_price_map, PRICE_URL
-from utils.billing import calculate_cost
+from open_webui.utils import pricing
+from open_webui.utils.pricing import estimate_cost, PRICE_SHEET, load_price_sheet
+from open_webui.utils.billing import calculate_cost
 
 
 # ------------------------------------------------------------------
-# 1️⃣  Helper to monkey-patch httpx.get so tests are offline-safe
+# 1️⃣  Never touch the network, always start from the bundled sheet
 # ------------------------------------------------------------------
-class FakeResp:
-    def __init__(self, text):
-        self.text = text
-    def raise_for_status(self):  # no-op in tests
-        pass
-
 @pytest.fixture(autouse=True)
-def stub_httpx_get(monkeypatch):
-    fake_json = {
-        "gpt-4o": {"input_cost_per_token": 2.5e-6, "output_cost_per_token": 5e-6},
-        "claude-3-haiku": {"input_cost_per_token": 8e-7, "output_cost_per_token": 4e-6},
-    }
-    def _fake_get(url, timeout=10):
-        assert url == PRICE_URL
-        return FakeResp(json.dumps(fake_json))
-    monkeypatch.setitem(sys.modules, "httpx", types.ModuleType("httpx"))
-    sys.modules["httpx"].get = _fake_get
-    yield  # run test
-    _load_price_map.cache_clear()  # reset cache between tests
+def bundled_sheet(monkeypatch):
+    def _no_network(*args, **kwargs):
+        raise AssertionError("pricing must not do network I/O on the hot path")
+
+    monkeypatch.setattr(pricing.aiohttp, "ClientSession", _no_network)
+    monkeypatch.setattr(pricing, "MODEL_PRICE_SHEET_PATH", "")
+    load_price_sheet()
+    PRICE_SHEET.set_overrides({})
+    yield
+    PRICE_SHEET.set_overrides({})
 
 
 # ------------------------------------------------------------------
@@ -49,17 +42,107 @@ def test_unknown_model():
         estimate_cost("unknown-abc", 10, 10)
 
 # ------------------------------------------------------------------
-# 4️⃣  Cache behaviour: only one fetch
+# 4️⃣  Name normalisation: case, provider prefix, date suffix, aliases
+# ------------------------------------------------------------------
+def test_normalized_lookup():
+    expected = estimate_cost("gpt-4o", 10, 10)
+    assert estimate_cost(" GPT-4o ", 10, 10) == expected
+    assert estimate_cost("openai/gpt-4o", 10, 10) == expected
+    assert estimate_cost("gpt-4o-2024-08-06", 10, 10) == expected
+    assert estimate_cost("claude-3-haiku", 10, 10) == estimate_cost(
+        "claude-3-haiku-20240307", 10, 10
+    )
+
+# ------------------------------------------------------------------
+# 5️⃣  Admin overrides win over the sheet
+# ------------------------------------------------------------------
+def test_override():
+    PRICE_SHEET.set_overrides({"GPT-4o": (Decimal("1e-6"), Decimal("2e-6"))})
+    assert estimate_cost("gpt-4o", 1, 1) == Decimal("3e-6")
+
+# ------------------------------------------------------------------
+# 6️⃣  Sheet on disk (LiteLLM format) replaces the bundled one
+# ------------------------------------------------------------------
+def test_load_from_disk(tmp_path, monkeypatch):
+    sheet = tmp_path / "model_prices.json"
+    sheet.write_text(
+        json.dumps(
+            {"my-model": {"input_cost_per_token": 1e-6, "output_cost_per_token": 2e-6}}
+        )
+    )
+    monkeypatch.setattr(pricing, "MODEL_PRICE_SHEET_PATH", str(sheet))
+    load_price_sheet()
+
+    assert estimate_cost("my-model", 1, 1) == Decimal("3e-6")
+    with pytest.raises(ValueError):
+        estimate_cost("gpt-4o", 1, 1)
+
+# ------------------------------------------------------------------
+# 7️⃣  Token counts are cached per message
 # ------------------------------------------------------------------
-def test_single_fetch(monkeypatch):
-    calls = {"n": 0}
-    def _fake_get(url, timeout=10):
-        calls["n"] += 1
-        return FakeResp('{"gpt-4o":{"input_cost_per_token":1e-6,"output_cost_per_token":2e-6}}')
-    import httpx
-    monkeypatch.setattr(httpx, "get", _fake_get)
-    _load_price_map.cache_clear()
+def test_incremental_prompt_tokens():
+    messages = [
+        {"role": "system", "content": "You are a helpful assistant."},
+        {"role": "user", "content": "Hello there!"},
+    ]
+    first = pricing.estimate_messages_tokens(messages, "gpt-4o")
+    assert first > 0
+
+    misses = pricing.TOKEN_COUNTS.misses
+    messages.append({"role": "user", "content": "How are you?"})
+    second = pricing.estimate_messages_tokens(messages, "gpt-4o")
+
+    assert second > first
+    assert pricing.TOKEN_COUNTS.misses == misses + 1
+
+# ------------------------------------------------------------------
+# 8️⃣  -MMDD snapshots and dated previews resolve to their family
+# ------------------------------------------------------------------
+def test_snapshot_lookup():
+    assert estimate_cost("gpt-3.5-turbo-0125", 10, 10) == estimate_cost(
+        "gpt-3.5-turbo", 10, 10
+    )
+    assert estimate_cost("gpt-4-0613", 10, 10) == estimate_cost("gpt-4", 10, 10)
+    assert estimate_cost("gpt-4-1106-preview", 10, 10) == estimate_cost(
+        "gpt-4-turbo", 10, 10
+    )
+
+# ------------------------------------------------------------------
+# 9️⃣  Unknown models use the default price, or are rejected with a 400
+# ------------------------------------------------------------------
+def test_default_price(monkeypatch):
+    monkeypatch.setattr(
+        pricing,
+        "DEFAULT_PRICE",
+        pricing.parse_default_price(
+            {"input_cost_per_token": 1e-6, "output_cost_per_token": 2e-6}
+        ),
+    )
+    assert estimate_cost("llama3.1:8b", 1, 1) == Decimal("3e-6")
+    # The sheet still wins for known models
+    assert estimate_cost("gpt-4o", 1, 1) != Decimal("3e-6")
+
+
+def test_unknown_model_rejected(monkeypatch):
+    import asyncio
+    from types import SimpleNamespace
+    from fastapi import HTTPException
+    from open_webui.utils import billing
+
+    async def check_balance(user_id, min_credits=1):
+        return 1000
+
+    monkeypatch.setattr(billing, "check_balance", check_balance)
+
+    @billing.requires_credits()
+    async def completion(form_data, user):
+        return {}
 
-    estimate_cost("gpt-4o", 1, 1)
-    estimate_cost("gpt-4o", 10, 10)
-    assert calls["n"] == 1, "JSON should be fetched exactly once"
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(
+            completion(
+                form_data={"model": "llama3.1:8b", "messages": []},
+                user=SimpleNamespace(id="u1"),
+            )
+        )
+    assert e.value.status_code == 400
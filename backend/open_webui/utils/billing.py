@@ -1,4 +1,3 @@
-import contextlib
 import math
 
 from datetime import datetime
@@ -8,9 +7,15 @@ from starlette.responses import StreamingResponse
 from starlette.types import ASGIApp, Receive, Scope, Send
 from fastapi import Request, HTTPException, status, Response
 
-from open_webui.utils.pricing import estimate_cost, affordable
+from open_webui.utils.pricing import (
+    estimate_cost,
+    affordable,
+    ModelPriceNotFoundError,
+)
 from open_webui.models.billing import StatusEnum
-from open_webui.models.billing import UserCredits, CreditTransactions, CreditTransactionForm
+from open_webui.models.billing import UserCredits
+from open_webui.utils.ledger import Ledger
+from open_webui.utils.stream import observe_stream
 from open_webui.utils.auth import get_current_user, get_http_authorization_cred
 import logging
 import json
@@ -27,7 +32,13 @@ def calculate_cost(cost_usd: float) -> int:
 
 async def check_balance(user_id: str, min_credits: int = 1) -> Optional[int]:
     # Check balance
-    my_credits = UserCredits.get_user_credits(user_id)
+    my_credits = Ledger.get_account(user_id)
+
+    if not my_credits:
+        raise HTTPException(
+            status_code=status.HTTP_402_PAYMENT_REQUIRED,
+            detail="Insufficient credits",
+        )
 
     if my_credits.status != StatusEnum.active:
         raise HTTPException(
@@ -43,7 +54,7 @@ async def check_balance(user_id: str, min_credits: int = 1) -> Optional[int]:
             detail="Subscription period has ended",
         )
 
-    if not my_credits or my_credits.credit_balance < min_credits:
+    if my_credits.credit_balance < min_credits:
         raise HTTPException(
             status_code=status.HTTP_402_PAYMENT_REQUIRED,
             detail="Insufficient credits",
@@ -82,27 +93,19 @@ def _parse_response_body(response: Response) -> dict | None:
 async def process_billing(
         user_id: str, prompt_tokens: int, completion_tokens: int, model_name: str, request_id: str
 ) -> None:
-    """Unmodified billing logic you provided."""
+    """
+    Debit the user for one completion. The debit is applied to the in-memory
+    ledger and settled to the database in batches, `request_id` makes it idempotent.
+    """
     try:
-        # headers = response_metadata.get("headers", {})
-        if CreditTransactions.exists(tx_id=request_id):
-            return
         cost_usd = estimate_cost(model_name, prompt_tokens, completion_tokens)
         credits_to_charge = calculate_cost(float(cost_usd))
-        print(credits_to_charge)
-        updated = UserCredits.update_credits(user_id, -credits_to_charge)
-        if not updated:
-            log.error(f"Failed to debit credits for user {user_id}")
-            return
-
-        CreditTransactions.insert_transaction(
+        Ledger.debit(
             user_id,
-            CreditTransactionForm(
-                tx_id=request_id,
-                delta=-credits_to_charge,
-                usd_spend=float(cost_usd),
-                model_name=model_name,
-            ),
+            tx_id=request_id,
+            credits=credits_to_charge,
+            usd_spend=float(cost_usd),
+            model_name=model_name,
         )
     except Exception as e:
         log.error(f"Error processing billing: {e}")
@@ -124,7 +127,14 @@ def requires_credits(min_credits: int = 1):
             # Check credits before processing
             balance = await check_balance(user.id, min_credits)
 
-            if not affordable(model_name, message_list, balance):
+            try:
+                can_afford = affordable(model_name, message_list, balance)
+            except ModelPriceNotFoundError:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"No price is configured for model '{model_name}'",
+                )
+            if not can_afford:
                 raise HTTPException(
                     status_code=status.HTTP_402_PAYMENT_REQUIRED,
                     detail="Insufficient credits",
@@ -145,40 +155,24 @@ def requires_credits(min_credits: int = 1):
                 return response
 
             # For streaming responses, only bill once after completion
-            original_iter = response.body_iterator
-            captured = {"id": None}  # to store the request_id
-
-            async def capture_and_forward():
-                """Pass chunks through while capturing the request ID"""
-                try:
-                    async for chunk in original_iter:
-                        try:
-                            if chunk.startswith(b"data:"):
-                                payload = chunk[5:].strip()  # drop 'data:'
-                                if payload and payload != b"[DONE]":
-                                    obj = json.loads(payload)
-                                    if "id" in obj and "usage" in obj:  # Only capture first ID
-                                        if captured["id"] is None:
-                                            captured["id"] = obj["id"]
-                                        captured["usage"] = obj["usage"]
-                        except Exception:
-                            pass  # never break the stream for parse errors
-                        yield chunk
-                finally:
-                    # whether the client disconnected or not, close what we wrapped
-                    with contextlib.suppress(Exception):
-                        if hasattr(original_iter, "aclose"):  # check for ACLOSE first
-                            await original_iter.aclose()  # ← async, must be awaited
-                        elif hasattr(original_iter, "close"):  # sync fallback (rare)
-                            original_iter.close()
-            response.body_iterator = capture_and_forward()
+            captured = {"id": None, "usage": None}
+
+            def capture_usage(data: dict):
+                """Capture the request ID and usage of the final chunk"""
+                if "id" in data and data.get("usage"):
+                    if captured["id"] is None:  # Only capture first ID
+                        captured["id"] = data["id"]
+                    captured["usage"] = data["usage"]
+
+            observer = observe_stream(response.body_iterator)
+            observer.subscribe(capture_usage, needle=b'"usage"')
+            response.body_iterator = observer
 
             async def finalize():
                 """Process billing once after stream completes"""
-                print(captured)
                 if captured["id"] and captured["usage"]:
                     prompt_tokens = captured["usage"].get("prompt_tokens")
-                    completion_tokens = captured.get("usage").get("completion_tokens")
+                    completion_tokens = captured["usage"].get("completion_tokens")
                     if prompt_tokens and completion_tokens:
                         await process_billing(user.id, prompt_tokens, completion_tokens, model_name,
                                               captured["id"])
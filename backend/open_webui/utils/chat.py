@@ -51,7 +51,7 @@ from open_webui.utils.response import (
     convert_streaming_response_ollama_to_openai,
 )
 from open_webui.utils.filter import (
-    get_sorted_filter_ids,
+    get_filter_chain,
     process_filter_functions,
 )
 
@@ -332,12 +332,9 @@ async def chat_completed(request: Request, form_data: dict, user: Any):
     }
 
     try:
-        filter_functions = [
-            Functions.get_function_by_id(filter_id)
-            for filter_id in get_sorted_filter_ids(
-                request, model, metadata.get("filter_ids", [])
-            )
-        ]
+        filter_functions = get_filter_chain(
+            request, model, metadata.get("filter_ids", [])
+        )
 
         result, _ = await process_filter_functions(
             request=request,
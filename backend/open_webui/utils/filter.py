@@ -1,16 +1,21 @@
 import inspect
 import logging
+import time
+from collections import OrderedDict
+from typing import Any, Optional
 
 from open_webui.utils.plugin import (
     load_function_module_by_id,
     get_function_module_from_cache,
 )
-from open_webui.models.functions import Functions
+from open_webui.models.functions import Functions, FunctionsVersion
 from open_webui.env import SRC_LOG_LEVELS
 
 log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["MAIN"])
 
+FILTER_TYPES = ("inlet", "outlet", "stream")
+
 
 def get_function_module(request, function_id, load_from_db=True):
     """
@@ -22,75 +27,198 @@ def get_function_module(request, function_id, load_from_db=True):
     return function_module
 
 
-def get_sorted_filter_ids(request, model: dict, enabled_filter_ids: list = None):
-    def get_priority(function_id):
-        function = Functions.get_function_by_id(function_id)
-        if function is not None:
-            valves = Functions.get_function_valves_by_id(function_id)
-            return valves.get("priority", 0) if valves else 0
-        return 0
-
-    filter_ids = [function.id for function in Functions.get_global_filter_functions()]
-    if "info" in model and "meta" in model["info"]:
-        filter_ids.extend(model["info"]["meta"].get("filterIds", []))
-        filter_ids = list(set(filter_ids))
-    active_filter_ids = [
-        function.id
-        for function in Functions.get_functions_by_type("filter", active_only=True)
-    ]
+class CompiledFilter:
+    """A filter function with everything its hooks need resolved up front."""
 
-    def get_active_status(filter_id):
-        function_module = get_function_module(request, filter_id)
+    def __init__(self, id: str, module: Any, valves: Optional[dict]):
+        self.id = id
+        self.module = module
+        self.priority = (valves or {}).get("priority", 0)
 
-        if getattr(function_module, "toggle", None):
-            return filter_id in (enabled_filter_ids or [])
+        # Validated once, reassigned on each call in case the module is shared
+        self.valves = None
+        if hasattr(module, "valves") and hasattr(module, "Valves"):
+            self.valves = module.Valves(**(valves if valves else {}))
 
-        return True
+        self.user_valves_class = getattr(module, "UserValves", None)
+        self.file_handler = getattr(module, "file_handler", None)
 
-    active_filter_ids = [
-        filter_id for filter_id in active_filter_ids if get_active_status(filter_id)
-    ]
+        # {filter_type: (handler, parameter names, is coroutine)}
+        self.handlers = {}
+        for filter_type in FILTER_TYPES:
+            handler = getattr(module, filter_type, None)
+            if handler:
+                self.handlers[filter_type] = (
+                    handler,
+                    frozenset(inspect.signature(handler).parameters),
+                    inspect.iscoroutinefunction(handler),
+                )
+
+
+class FilterChain:
+    """
+    The sorted filters of one request. Compiled filters are shared between
+    requests, user valves are only read once per request (not per stream chunk).
+    """
+
+    def __init__(self, filters: list[CompiledFilter]):
+        self.filters = filters
+        self.user_valves: dict[tuple[str, str], Any] = {}
+
+    def __iter__(self):
+        return iter(self.filters)
+
+    def __len__(self):
+        return len(self.filters)
 
-    filter_ids = [fid for fid in filter_ids if fid in active_filter_ids]
-    filter_ids.sort(key=get_priority)
+    def get_user_valves(self, filter: CompiledFilter, user_id: str):
+        key = (filter.id, user_id)
+        if key not in self.user_valves:
+            self.user_valves[key] = filter.user_valves_class(
+                **Functions.get_user_valves_by_id_and_user_id(filter.id, user_id)
+            )
+        return self.user_valves[key]
+
+
+class FilterChainCache:
+    """
+    Compiled filter chains per (model filters, enabled toggle filters), with
+    modules loaded, valves validated and handler signatures inspected once.
+    Everything is dropped when `FunctionsVersion` moves, i.e. a function or
+    its valves changed in any worker. Without Redis, the version is only
+    local, so the function table's row count and last update are checked too.
+    """
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self.version = None
+        self.filters: dict[str, CompiledFilter] = {}
+        self.chains: OrderedDict[tuple, list[CompiledFilter]] = OrderedDict()
 
-    return filter_ids
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _check_version(self):
+        version = FunctionsVersion.get()
+        if FunctionsVersion.redis is None:
+            count, updated_at = Functions.get_functions_count_and_updated_at()
+            # `updated_at` has a one second resolution: a row updated during
+            # the current second could still change without it moving
+            if updated_at is not None and updated_at >= int(time.time()):
+                version = None
+            else:
+                version = (version, count, updated_at)
+
+        if version is None or version != self.version:
+            if self.version is not None:
+                self.invalidations += 1
+            self.version = version
+            self.filters.clear()
+            self.chains.clear()
+
+    def _get_filter(self, request, filter_id: str) -> CompiledFilter:
+        if filter_id not in self.filters:
+            self.filters[filter_id] = CompiledFilter(
+                filter_id,
+                get_function_module(request, filter_id),
+                Functions.get_function_valves_by_id(filter_id),
+            )
+        return self.filters[filter_id]
+
+    def _compile(
+        self, request, model_filter_ids: tuple, enabled_filter_ids: tuple
+    ) -> list[CompiledFilter]:
+        filter_ids = {
+            function.id for function in Functions.get_global_filter_functions()
+        }
+        filter_ids.update(model_filter_ids)
+
+        filters = []
+        for function in Functions.get_functions_by_type("filter", active_only=True):
+            if function.id not in filter_ids:
+                continue
+
+            filter = self._get_filter(request, function.id)
+            if getattr(filter.module, "toggle", None) and (
+                function.id not in enabled_filter_ids
+            ):
+                continue
+            filters.append(filter)
+
+        filters.sort(key=lambda filter: filter.priority)
+        return filters
+
+    def get(self, request, model: dict, enabled_filter_ids: list = None) -> FilterChain:
+        self._check_version()
+
+        model_filter_ids = ()
+        if "info" in model and "meta" in model["info"]:
+            model_filter_ids = tuple(
+                sorted(model["info"]["meta"].get("filterIds", []) or [])
+            )
+        key = (model_filter_ids, tuple(sorted(enabled_filter_ids or [])))
+
+        filters = self.chains.get(key)
+        if filters is None:
+            self.misses += 1
+            filters = self._compile(request, *key)
+            self.chains[key] = filters
+            if len(self.chains) > self.max_size:
+                self.chains.popitem(last=False)
+        else:
+            self.hits += 1
+            self.chains.move_to_end(key)
+
+        return FilterChain(filters)
+
+    def get_stats(self) -> dict:
+        return {
+            "version": self.version,
+            "chains": len(self.chains),
+            "filters": len(self.filters),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+FILTER_CHAINS = FilterChainCache()
+
+
+def get_filter_chain(request, model: dict, enabled_filter_ids: list = None):
+    return FILTER_CHAINS.get(request, model, enabled_filter_ids)
+
+
+def get_sorted_filter_ids(request, model: dict, enabled_filter_ids: list = None):
+    return [
+        filter.id for filter in get_filter_chain(request, model, enabled_filter_ids)
+    ]
 
 
 async def process_filter_functions(
-    request, filter_functions, filter_type, form_data, extra_params
+    request, filter_functions: FilterChain, filter_type, form_data, extra_params
 ):
     skip_files = None
 
-    for function in filter_functions:
-        filter = function
-        filter_id = function.id
-        if not filter:
-            continue
+    for filter in filter_functions:
+        filter_id = filter.id
 
-        function_module = get_function_module(
-            request, filter_id, load_from_db=(filter_type != "stream")
-        )
         # Prepare handler function
-        handler = getattr(function_module, filter_type, None)
-        if not handler:
+        if filter_type not in filter.handlers:
             continue
+        handler, parameters, is_coroutine = filter.handlers[filter_type]
 
         # Check if the function has a file_handler variable
-        if filter_type == "inlet" and hasattr(function_module, "file_handler"):
-            skip_files = function_module.file_handler
+        if filter_type == "inlet" and filter.file_handler is not None:
+            skip_files = filter.file_handler
 
         # Apply valves to the function
-        if hasattr(function_module, "valves") and hasattr(function_module, "Valves"):
-            valves = Functions.get_function_valves_by_id(filter_id)
-            function_module.valves = function_module.Valves(
-                **(valves if valves else {})
-            )
+        if filter.valves is not None:
+            filter.module.valves = filter.valves
 
         try:
             # Prepare parameters
-            sig = inspect.signature(handler)
-
             params = {"body": form_data}
             if filter_type == "stream":
                 params = {"event": form_data}
@@ -101,23 +229,21 @@ async def process_filter_functions(
                     **extra_params,
                     "__id__": filter_id,
                 }.items()
-                if k in sig.parameters
+                if k in parameters
             }
 
             # Handle user parameters
-            if "__user__" in sig.parameters:
-                if hasattr(function_module, "UserValves"):
+            if "__user__" in parameters:
+                if filter.user_valves_class is not None:
                     try:
-                        params["__user__"]["valves"] = function_module.UserValves(
-                            **Functions.get_user_valves_by_id_and_user_id(
-                                filter_id, params["__user__"]["id"]
-                            )
+                        params["__user__"]["valves"] = filter_functions.get_user_valves(
+                            filter, params["__user__"]["id"]
                         )
                     except Exception as e:
                         log.exception(f"Failed to get user values: {e}")
 
             # Execute handler
-            if inspect.iscoroutinefunction(handler):
+            if is_coroutine:
                 form_data = await handler(**params)
             else:
                 form_data = handler(**params)
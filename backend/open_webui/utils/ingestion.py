@@ -0,0 +1,304 @@
+import asyncio
+import logging
+import time
+import uuid
+from typing import Optional
+
+from fastapi import FastAPI, Request
+from langchain_core.documents import Document
+
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    INGESTION_JOB_CONCURRENCY,
+    INGESTION_JOB_STALE_TIMEOUT,
+)
+from open_webui.models.files import Files
+from open_webui.models.ingestion import (
+    IngestionJobs,
+    IngestionJobModel,
+    IngestionJobItemModel,
+)
+from open_webui.models.knowledge import Knowledges
+from open_webui.models.users import Users
+from open_webui.retrieval.bm25 import BM25_INDEXES
+from open_webui.retrieval.vector.factory import VECTOR_DB_CLIENT
+from open_webui.routers.retrieval import split_docs_for_vector_db, embed_chunks
+from open_webui.socket.main import emit_user_event
+from open_webui.utils.misc import calculate_sha256_string
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+# Seconds between heartbeats of a running job, well under the stale timeout
+HEARTBEAT_INTERVAL = max(INGESTION_JOB_STALE_TIMEOUT // 4, 1)
+
+
+def load_item(
+    request: Request, item: IngestionJobItemModel
+) -> tuple[list[str], list[dict]]:
+    """The chunks of the item's file, from its own collection or its stored content."""
+    file = Files.get_file_by_id(item.file_id)
+    if file is None:
+        raise ValueError(f"File {item.file_id} not found")
+
+    result = VECTOR_DB_CLIENT.query(
+        collection_name=f"file-{file.id}", filter={"file_id": file.id}
+    )
+    if result is not None and len(result.ids[0]) > 0:
+        docs = [
+            Document(
+                page_content=result.documents[0][idx],
+                metadata=result.metadatas[0][idx],
+            )
+            for idx, id in enumerate(result.ids[0])
+        ]
+    else:
+        docs = [
+            Document(
+                page_content=file.data.get("content", "").replace("<br/>", "\n"),
+                metadata={
+                    **file.meta,
+                    "name": file.filename,
+                    "created_by": file.user_id,
+                    "file_id": file.id,
+                    "source": file.filename,
+                },
+            )
+        ]
+
+    hash = calculate_sha256_string(file.data.get("content", ""))
+    if file.hash != hash:
+        Files.update_file_hash_by_id(file.id, hash)
+
+    return split_docs_for_vector_db(
+        request, docs, {"file_id": file.id, "name": file.filename, "hash": hash}
+    )
+
+
+def write_item(
+    job: IngestionJobModel,
+    item: IngestionJobItemModel,
+    texts: list[str],
+    metadatas: list[dict],
+    embeddings: list[list[float]],
+):
+    collection_name = item.collection_name
+
+    create_bm25_index = True
+    if VECTOR_DB_CLIENT.has_collection(collection_name=collection_name):
+        create_bm25_index = False
+        # What an interrupted attempt at this item may have written
+        VECTOR_DB_CLIENT.delete(
+            collection_name=collection_name, filter={"file_id": item.file_id}
+        )
+        BM25_INDEXES.delete(collection_name, file_id=item.file_id)
+
+    items = [
+        {
+            "id": str(uuid.uuid4()),
+            "text": text,
+            "vector": embeddings[idx],
+            "metadata": metadatas[idx],
+        }
+        for idx, text in enumerate(texts)
+    ]
+    VECTOR_DB_CLIENT.insert(collection_name=collection_name, items=items)
+    BM25_INDEXES.add(collection_name, items, create=create_bm25_index)
+
+    link_item(job, item)
+
+
+def link_item(job: IngestionJobModel, item: IngestionJobItemModel):
+    """Attach the item's file to its collection, and to the knowledge base's files."""
+    collection_name = item.collection_name
+
+    file = Files.update_file_metadata_by_id(
+        item.file_id, {"collection_name": collection_name}
+    )
+    if file is None:
+        raise ValueError(f"File {item.file_id} not found")
+
+    if job.type == "knowledge_files":
+        knowledge = Knowledges.get_knowledge_by_id(id=collection_name)
+        if knowledge:
+            data = knowledge.data or {}
+            file_ids = data.get("file_ids", [])
+            if item.file_id not in file_ids:
+                data["file_ids"] = [*file_ids, item.file_id]
+                Knowledges.update_knowledge_data_by_id(id=knowledge.id, data=data)
+
+
+class IngestionJobRunner:
+    """
+    Runs ingestion jobs in the background, as a pipeline of stages connected
+    by bounded queues (so a slow stage holds back the ones before it):
+
+        load + split (N workers) -> embed (N workers) -> vector DB writes (1 worker)
+
+    Every item is checkpointed in the DB once written, so a job interrupted by
+    a restart resumes with the items left, in whichever worker claims it.
+    """
+
+    def __init__(self, concurrency: int = 4, stale_timeout: int = 120):
+        self.concurrency = concurrency
+        self.stale_timeout = stale_timeout
+        self.tasks: dict[str, asyncio.Task] = {}
+
+    def start(self, app: FastAPI, job: IngestionJobModel) -> bool:
+        """Run `job` in this worker, unless another one already claimed it."""
+        if job.id in self.tasks or not IngestionJobs.claim_job(job):
+            return False
+
+        task = asyncio.create_task(self.run(app, job))
+        self.tasks[job.id] = task
+        task.add_done_callback(lambda _: self.tasks.pop(job.id, None))
+        return True
+
+    def cancel(self, job_id: str) -> Optional[IngestionJobModel]:
+        job = IngestionJobs.update_job_status(job_id, "cancelled")
+        task = self.tasks.get(job_id)
+        if task is not None:
+            task.cancel()
+        return job
+
+    async def emit_progress(self, job: Optional[IngestionJobModel]):
+        if job is None:
+            return
+        try:
+            await emit_user_event(
+                job.user_id, "ingestion-job", {"job": job.model_dump()}
+            )
+        except Exception as e:
+            log.debug(f"Error emitting progress of ingestion job {job.id}: {e}")
+
+    async def heartbeat(self, job_id: str):
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            await asyncio.to_thread(IngestionJobs.touch_job, job_id)
+
+    async def run(self, app: FastAPI, job: IngestionJobModel):
+        log.info(f"Running ingestion job {job.id} ({job.type})")
+        request = Request({"type": "http", "app": app})
+        user = Users.get_user_by_id(job.user_id)
+        heartbeat = asyncio.create_task(self.heartbeat(job.id))
+
+        try:
+            items = IngestionJobs.get_items_by_job_id(job.id, status="pending")
+            await self.emit_progress(IngestionJobs.get_job_by_id(job.id))
+
+            pending = asyncio.Queue()
+            for item in items:
+                pending.put_nowait(item)
+            chunks = asyncio.Queue(maxsize=self.concurrency)
+            vectors = asyncio.Queue(maxsize=self.concurrency)
+
+            async def complete(item, error=None):
+                if error:
+                    log.warning(f"Ingestion job {job.id}: file {item.file_id}: {error}")
+                progress = await asyncio.to_thread(
+                    IngestionJobs.complete_item, item, error
+                )
+                await self.emit_progress(progress)
+                if progress is not None and progress.status == "cancelled":
+                    # Cancelled from another worker
+                    self.tasks[job.id].cancel()
+
+            async def load():
+                while not pending.empty():
+                    item = pending.get_nowait()
+                    try:
+                        texts, metadatas = await asyncio.to_thread(
+                            load_item, request, item
+                        )
+                    except Exception as e:
+                        await complete(item, str(e))
+                        continue
+                    await chunks.put((item, texts, metadatas))
+
+            async def embed():
+                while (entry := await chunks.get()) is not None:
+                    item, texts, metadatas = entry
+                    try:
+                        embeddings = await asyncio.to_thread(
+                            embed_chunks, request, texts, user
+                        )
+                    except Exception as e:
+                        await complete(item, str(e))
+                        continue
+                    await vectors.put((item, texts, metadatas, embeddings))
+
+            async def write():
+                while (entry := await vectors.get()) is not None:
+                    item = entry[0]
+                    try:
+                        await asyncio.to_thread(write_item, job, *entry)
+                    except Exception as e:
+                        await complete(item, str(e))
+                        continue
+                    await complete(item)
+
+            async def load_stage():
+                await asyncio.gather(*[load() for _ in range(self.concurrency)])
+                for _ in range(self.concurrency):
+                    await chunks.put(None)
+
+            async def embed_stage():
+                await asyncio.gather(*[embed() for _ in range(self.concurrency)])
+                await vectors.put(None)
+
+            if app.state.config.BYPASS_EMBEDDING_AND_RETRIEVAL:
+                # Nothing to embed, but the files still belong to the collection
+                for item in items:
+                    try:
+                        await asyncio.to_thread(link_item, job, item)
+                    except Exception as e:
+                        await complete(item, str(e))
+                        continue
+                    await complete(item)
+            else:
+                await asyncio.gather(load_stage(), embed_stage(), write())
+
+            # Not if it was cancelled from another worker meanwhile
+            job = IngestionJobs.update_job_status(
+                job.id, "completed", from_status="running"
+            )
+            log.info(
+                f"Ingestion job {job.id} {job.status}: {job.processed} files, {job.failed} failed"
+            )
+        except asyncio.CancelledError:
+            job = IngestionJobs.get_job_by_id(job.id)
+            log.info(f"Ingestion job {job.id} cancelled")
+        except Exception as e:
+            log.exception(f"Ingestion job {job.id} failed: {e}")
+            job = IngestionJobs.update_job_status(
+                job.id, "failed", str(e), from_status="running"
+            )
+        finally:
+            heartbeat.cancel()
+
+        await self.emit_progress(job)
+
+    def resume(self, app: FastAPI):
+        """Pick up the jobs never started or left behind by a dead worker."""
+        stale_before = int(time.time()) - self.stale_timeout
+        for job in IngestionJobs.get_resumable_jobs(stale_before):
+            if self.start(app, job):
+                log.info(f"Resuming ingestion job {job.id}")
+
+    def get_stats(self) -> dict:
+        return {"running": len(self.tasks), "concurrency": self.concurrency}
+
+
+async def periodic_ingestion_job_recovery(app: FastAPI):
+    while True:
+        try:
+            IngestionRunner.resume(app)
+        except Exception as e:
+            log.exception(f"Error resuming ingestion jobs: {e}")
+        await asyncio.sleep(INGESTION_JOB_STALE_TIMEOUT)
+
+
+IngestionRunner = IngestionJobRunner(
+    concurrency=INGESTION_JOB_CONCURRENCY,
+    stale_timeout=INGESTION_JOB_STALE_TIMEOUT,
+)
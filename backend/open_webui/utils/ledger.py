@@ -0,0 +1,466 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+from redis.exceptions import WatchError
+
+from open_webui.models.billing import (
+    CreditTransactions,
+    UserCredits,
+    UserCreditsModel,
+)
+from open_webui.utils.redis import get_redis_connection, get_sentinels_from_env
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    REDIS_URL,
+    REDIS_SENTINEL_HOSTS,
+    REDIS_SENTINEL_PORT,
+    CREDIT_LEDGER_SETTLE_INTERVAL,
+    CREDIT_LEDGER_SETTLE_BATCH_SIZE,
+    CREDIT_LEDGER_ACCOUNT_TTL,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MODELS"])
+
+REDIS_KEY_PREFIX = "open-webui:credits"
+
+# How long a tx_id is remembered for idempotent debits (seconds)
+TX_ID_TTL = 24 * 60 * 60
+TX_ID_MEMORY_SIZE = 100000
+
+# Claim the tx_id, decrement the balance and queue the debit all at once, so
+# a failure can't leave a claimed tx_id that was never charged. Returns 0 for
+# a duplicate, nil if the balance isn't loaded ("reload from the DB")
+DEBIT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+if redis.call('EXISTS', KEYS[2]) == 0 then
+    return nil
+end
+redis.call('SET', KEYS[1], 1, 'EX', ARGV[4])
+redis.call('DECRBY', KEYS[2], ARGV[1])
+redis.call('HINCRBY', KEYS[3], ARGV[3], -tonumber(ARGV[1]))
+redis.call('RPUSH', KEYS[4], ARGV[2])
+return 1
+"""
+
+# Move the next batch from the pending list into this worker's processing
+# list, or return the batch still there from a settle that didn't finish
+CLAIM_PENDING = """
+if redis.call('LLEN', KEYS[2]) > 0 then
+    return redis.call('LRANGE', KEYS[2], 0, -1)
+end
+local items = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #items > 0 then
+    redis.call('LTRIM', KEYS[1], #items, -1)
+    redis.call('RPUSH', KEYS[2], unpack(items))
+end
+return items
+"""
+
+# Put a processing list back at the head of the pending list, unless its
+# worker is still alive (KEYS[4] is the worker's heartbeat, if any)
+REQUEUE_PROCESSING = """
+if KEYS[4] and redis.call('EXISTS', KEYS[4]) == 1 then
+    return -1
+end
+local items = redis.call('LRANGE', KEYS[1], 0, -1)
+for i = #items, 1, -1 do
+    redis.call('LPUSH', KEYS[2], items[i])
+end
+redis.call('DEL', KEYS[1])
+redis.call('SREM', KEYS[3], ARGV[1])
+return #items
+"""
+
+
+class CreditLedger:
+    """
+    Credit balances served from memory (single worker) or Redis (shared), with
+    one atomic decrement per debit. Debits are queued and settled to
+    `credit_transaction`/`user_credit` in batches by `settle`.
+
+    A loaded balance is always `DB balance + unsettled deltas`, so it can be
+    dropped (`invalidate`) at any time and reloaded consistently. Without
+    Redis, the DB balance is re-read every `account_ttl` seconds so debits
+    settled by other workers are seen.
+
+    With Redis, each worker claims a batch into its own processing list and
+    only removes it once the batch is committed; the lists of workers whose
+    heartbeat expired are put back in the pending list.
+    """
+
+    def __init__(
+        self,
+        redis=None,
+        batch_size: int = 500,
+        account_ttl: int = 60,
+        heartbeat_ttl: int = 60,
+    ):
+        self.redis = redis
+        self.batch_size = batch_size
+        self.account_ttl = account_ttl
+        self.heartbeat_ttl = heartbeat_ttl
+        self.lock = threading.RLock()
+        # One batch at a time per worker, it owns a single processing list
+        self.settle_lock = threading.Lock()
+
+        # Plan, status, quota... of each wallet: {user_id: (loaded_at, model)}
+        self.accounts: dict[str, tuple[float, UserCreditsModel]] = {}
+
+        # Used when Redis is not configured
+        self.pending_deltas: dict[str, int] = {}
+        self.pending: list[dict] = []
+        self.tx_ids: OrderedDict[str, None] = OrderedDict()
+
+        self.stats = {
+            "debits": 0,
+            "duplicate_debits": 0,
+            "settled": 0,
+            "settle_batches": 0,
+            "settle_errors": 0,
+            "requeued": 0,
+        }
+
+        self.worker_id = uuid.uuid4().hex
+        self.last_recovery = 0.0
+
+        if self.redis is not None:
+            self.debit_script = self.redis.register_script(DEBIT)
+            self.claim_pending = self.redis.register_script(CLAIM_PENDING)
+            self.requeue_processing = self.redis.register_script(REQUEUE_PROCESSING)
+
+    def _key(self, name: str) -> str:
+        return f"{REDIS_KEY_PREFIX}:{name}"
+
+    ####################
+    # Balances
+    ####################
+
+    def _load_account(self, user_id: str) -> Optional[UserCreditsModel]:
+        # Without Redis, the read must not interleave with a settle committing
+        # deltas that are still pending here
+        with self.lock:
+            account = UserCredits.get_user_credits(user_id)
+            if account is None:
+                self.accounts.pop(user_id, None)
+            else:
+                self.accounts[user_id] = (time.monotonic(), account)
+        return account
+
+    def _get_cached_account(self, user_id: str) -> Optional[UserCreditsModel]:
+        entry = self.accounts.get(user_id)
+        if entry is None or time.monotonic() - entry[0] > self.account_ttl:
+            return self._load_account(user_id)
+        return entry[1]
+
+    def _get_balance(self, user_id: str, account: UserCreditsModel) -> int:
+        if self.redis is None:
+            with self.lock:
+                # The cached account is updated by `settle` along with the
+                # pending deltas, and re-read from the DB past `account_ttl`
+                account = self._get_cached_account(user_id) or account
+                return account.credit_balance + self.pending_deltas.get(user_id, 0)
+
+        balance_key = self._key(f"balance:{user_id}")
+        balance = self.redis.get(balance_key)
+        if balance is None:
+            with self.redis.pipeline() as pipe:
+                while True:
+                    try:
+                        # A settle releasing deltas meanwhile makes the DB
+                        # balance and the pending deltas disagree, retry
+                        pipe.watch(self._key("settle_generation"))
+                        pending_delta = pipe.hget(self._key("pending_deltas"), user_id)
+                        account = self._load_account(user_id) or account
+                        pipe.multi()
+                        pipe.set(
+                            balance_key,
+                            account.credit_balance + int(pending_delta or 0),
+                            nx=True,
+                        )
+                        pipe.execute()
+                        break
+                    except WatchError:
+                        continue
+            balance = self.redis.get(balance_key)
+        return int(balance)
+
+    def get_account(self, user_id: str) -> Optional[UserCreditsModel]:
+        """The user's wallet with its live balance, or None if it has none."""
+        account = self._get_cached_account(user_id)
+        if account is None:
+            return None
+
+        return account.model_copy(
+            update={"credit_balance": self._get_balance(user_id, account)}
+        )
+
+    def invalidate(self, user_id: str):
+        """Reload the wallet on next access, e.g. after an admin top-up."""
+        with self.lock:
+            self.accounts.pop(user_id, None)
+
+        if self.redis is not None:
+            self.redis.delete(self._key(f"balance:{user_id}"))
+
+    ####################
+    # Debits
+    ####################
+
+    def _claim_tx_id(self, tx_id: str) -> bool:
+        # Called under `self.lock`
+        if tx_id in self.tx_ids:
+            return False
+        self.tx_ids[tx_id] = None
+        if len(self.tx_ids) > TX_ID_MEMORY_SIZE:
+            self.tx_ids.popitem(last=False)
+        return True
+
+    def debit(
+        self,
+        user_id: str,
+        tx_id: str,
+        credits: int,
+        usd_spend: float,
+        model_name: str,
+    ) -> bool:
+        """
+        Debit `credits` once per `tx_id`. Returns False if the transaction was
+        already debited or the user has no wallet.
+        """
+        account = self._get_cached_account(user_id)
+        if account is None:
+            return False
+
+        tx = {
+            "tx_id": tx_id,
+            "user_id": user_id,
+            "delta": -credits,
+            "usd_spend": usd_spend,
+            "model_name": model_name,
+            "created_at": int(time.time()),
+        }
+
+        if self.redis is None:
+            with self.lock:
+                debited = self._claim_tx_id(tx_id)
+                if debited:
+                    self.pending_deltas[user_id] = (
+                        self.pending_deltas.get(user_id, 0) - credits
+                    )
+                    self.pending.append(tx)
+        else:
+            balance_key = self._key(f"balance:{user_id}")
+            while True:
+                debited = self.debit_script(
+                    keys=[
+                        self._key(f"tx:{tx_id}"),
+                        balance_key,
+                        self._key("pending_deltas"),
+                        self._key("pending"),
+                    ],
+                    args=[credits, json.dumps(tx), user_id, TX_ID_TTL],
+                )
+                if debited is not None:
+                    break
+                # Dropped by a settle or an invalidation, load it and retry
+                self._get_balance(user_id, account)
+
+        if not debited:
+            self.stats["duplicate_debits"] += 1
+            return False
+
+        self.stats["debits"] += 1
+        return True
+
+    ####################
+    # Settlement
+    ####################
+
+    def _processing_key(self, worker_id: str) -> str:
+        return self._key(f"processing:{worker_id}")
+
+    def _heartbeat_key(self, worker_id: str) -> str:
+        return self._key(f"worker:{worker_id}")
+
+    def _claim_pending(self) -> list[dict]:
+        if self.redis is None:
+            with self.lock:
+                batch = self.pending[: self.batch_size]
+                del self.pending[: self.batch_size]
+                return batch
+
+        pipe = self.redis.pipeline()
+        pipe.set(self._heartbeat_key(self.worker_id), 1, ex=self.heartbeat_ttl)
+        pipe.sadd(self._key("workers"), self.worker_id)
+        pipe.execute()
+
+        items = self.claim_pending(
+            keys=[self._key("pending"), self._processing_key(self.worker_id)],
+            args=[self.batch_size],
+        )
+        return [json.loads(item) for item in items]
+
+    def _restore_pending(self, batch: list[dict]):
+        if self.redis is None:
+            with self.lock:
+                self.pending[:0] = batch
+            return
+
+        self.requeue_processing(
+            keys=[
+                self._processing_key(self.worker_id),
+                self._key("pending"),
+                self._key("workers"),
+            ],
+            args=[self.worker_id],
+        )
+
+    def _release_pending_deltas(self, batch: list[dict], skipped: list[dict]):
+        deltas: dict[str, int] = {}
+        for tx in batch:
+            deltas[tx["user_id"]] = deltas.get(tx["user_id"], 0) + tx["delta"]
+
+        if self.redis is None:
+            # Called under `self.lock`, right after the commit
+            skipped_ids = {tx["tx_id"] for tx in skipped}
+            for tx in batch:
+                entry = self.accounts.get(tx["user_id"])
+                if entry is not None and tx["tx_id"] not in skipped_ids:
+                    loaded_at, account = entry
+                    self.accounts[tx["user_id"]] = (
+                        loaded_at,
+                        account.model_copy(
+                            update={
+                                "credit_balance": account.credit_balance + tx["delta"]
+                            }
+                        ),
+                    )
+
+            for user_id, delta in deltas.items():
+                self.pending_deltas[user_id] = (
+                    self.pending_deltas.get(user_id, 0) - delta
+                )
+                if self.pending_deltas[user_id] == 0:
+                    del self.pending_deltas[user_id]
+            return
+
+        pipe = self.redis.pipeline(transaction=True)
+        for user_id, delta in deltas.items():
+            pipe.hincrby(self._key("pending_deltas"), user_id, -delta)
+            # May have been reloaded after the commit but before this release
+            pipe.delete(self._key(f"balance:{user_id}"))
+        pipe.delete(self._processing_key(self.worker_id))
+        pipe.incr(self._key("settle_generation"))
+        pipe.execute()
+
+    def _commit(self, batch: list[dict]) -> list[dict]:
+        skipped = CreditTransactions.settle_transactions(batch)
+        self._release_pending_deltas(batch, skipped)
+        return skipped
+
+    def settle(self) -> int:
+        """Settle one batch of pending debits, returns the batch size."""
+        with self.settle_lock:
+            return self._settle()
+
+    def _settle(self) -> int:
+        batch = self._claim_pending()
+        if not batch:
+            return 0
+
+        try:
+            if self.redis is None:
+                with self.lock:
+                    skipped = self._commit(batch)
+            else:
+                skipped = self._commit(batch)
+        except Exception as e:
+            self.stats["settle_errors"] += 1
+            log.exception(f"Error settling credit transactions: {e}")
+            self._restore_pending(batch)
+            return 0
+
+        # Already in the DB (e.g. billed before a restart): the live balance was
+        # debited without the DB being debited, so reload those wallets.
+        for user_id in {tx["user_id"] for tx in skipped}:
+            self.invalidate(user_id)
+
+        self.stats["settled"] += len(batch) - len(skipped)
+        self.stats["settle_batches"] += 1
+        return len(batch)
+
+    def requeue_dead_workers(self) -> int:
+        """Put the batches claimed by workers that stopped back in the queue."""
+        if self.redis is None:
+            return 0
+
+        requeued = 0
+        for worker_id in self.redis.smembers(self._key("workers")):
+            if worker_id == self.worker_id:
+                continue
+            count = self.requeue_processing(
+                keys=[
+                    self._processing_key(worker_id),
+                    self._key("pending"),
+                    self._key("workers"),
+                    self._heartbeat_key(worker_id),
+                ],
+                args=[worker_id],
+            )
+            if count > 0:
+                log.warning(
+                    f"Requeued {count} credit transactions of stopped worker {worker_id}"
+                )
+                requeued += count
+
+        self.stats["requeued"] += requeued
+        return requeued
+
+    def settle_all(self):
+        if time.monotonic() - self.last_recovery > self.heartbeat_ttl:
+            self.last_recovery = time.monotonic()
+            self.requeue_dead_workers()
+
+        while self.settle() == self.batch_size:
+            pass
+
+    def get_stats(self) -> dict:
+        if self.redis is None:
+            pending = len(self.pending)
+        else:
+            pending = self.redis.llen(self._key("pending"))
+        return {**self.stats, "pending": pending}
+
+
+async def periodic_credit_settlement():
+    while True:
+        await asyncio.sleep(CREDIT_LEDGER_SETTLE_INTERVAL)
+        try:
+            await asyncio.to_thread(Ledger.settle_all)
+        except Exception as e:
+            log.exception(f"Error in credit settlement: {e}")
+
+
+Ledger = CreditLedger(
+    redis=(
+        get_redis_connection(
+            REDIS_URL,
+            get_sentinels_from_env(REDIS_SENTINEL_HOSTS, REDIS_SENTINEL_PORT),
+            decode_responses=True,
+        )
+        if REDIS_URL
+        else None
+    ),
+    batch_size=CREDIT_LEDGER_SETTLE_BATCH_SIZE,
+    account_ttl=CREDIT_LEDGER_ACCOUNT_TTL,
+    heartbeat_ttl=max(60, int(CREDIT_LEDGER_SETTLE_INTERVAL * 10)),
+)
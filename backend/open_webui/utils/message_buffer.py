@@ -0,0 +1,233 @@
+import atexit
+import asyncio
+import logging
+import threading
+import time
+from typing import Optional
+
+from open_webui.models.chats import Chats
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    CHAT_MESSAGE_WRITE_BUFFER_INTERVAL,
+    CHAT_MESSAGE_WRITE_BUFFER_MAX_SIZE,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MODELS"])
+
+
+class BufferedMessage:
+    def __init__(self, content: Optional[str] = None):
+        # `content` is None until the message has been read from (or written to)
+        # the buffer, so appends know whether they still need the stored content.
+        self.content = content
+        self.fields = {}
+        self.pending_size = 0
+        self.pending_writes = 0
+        self.first_pending_at = None
+        self.timer = None
+
+
+class MessageWriteBuffer:
+    """
+    Write-behind buffer for streamed assistant messages.
+
+    Every write to a message rewrites the whole chat JSON, so streamed deltas are
+    coalesced in memory per (chat_id, message_id) and only persisted once the time
+    or size budget is exceeded, when the stream ends (`flush`) or on shutdown
+    (`flush_all`). A message left alone for the interval is flushed and dropped
+    from the buffer. Buffers are per process; a stream is always handled by the
+    worker that started it.
+    """
+
+    def __init__(self, interval: float, max_size: int):
+        self.interval = interval
+        self.max_size = max_size
+
+        self.messages: dict[tuple[str, str], BufferedMessage] = {}
+        self.lock = threading.RLock()
+
+        self.stats = {
+            "writes": 0,
+            "flushes": 0,
+            "flushes_avoided": 0,
+            "flush_errors": 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    def _get_or_create(self, key: tuple[str, str]) -> BufferedMessage:
+        entry = self.messages.get(key)
+        if entry is None:
+            entry = BufferedMessage()
+            self.messages[key] = entry
+        return entry
+
+    def _write(self, chat_id: str, message_id: str, fields: dict, size: int):
+        self.stats["writes"] += 1
+
+        if not self.enabled:
+            Chats.upsert_message_to_chat_by_id_and_message_id(
+                chat_id, message_id, fields
+            )
+            self.stats["flushes"] += 1
+            return
+
+        key = (chat_id, message_id)
+        with self.lock:
+            entry = self._get_or_create(key)
+            if "content" in fields:
+                entry.content = fields["content"]
+            entry.fields.update(fields)
+            entry.pending_size += size
+            entry.pending_writes += 1
+
+            if entry.first_pending_at is None:
+                entry.first_pending_at = time.monotonic()
+
+            if (
+                entry.pending_size >= self.max_size
+                or time.monotonic() - entry.first_pending_at >= self.interval
+            ):
+                self._flush_entry(key, entry)
+
+            if not self._schedule(key, entry):
+                # Nothing would ever flush or release it
+                self._flush_entry(key, entry)
+                if not entry.fields:
+                    self.messages.pop(key, None)
+
+    def _schedule(self, key: tuple[str, str], entry: BufferedMessage) -> bool:
+        # Make sure pending data is persisted, and the entry released, even if
+        # the stream stalls or is never flushed.
+        if entry.timer is not None:
+            return True
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+
+        entry.timer = loop.call_later(self.interval, self._flush_key, key)
+        return True
+
+    def _flush_key(self, key: tuple[str, str]):
+        with self.lock:
+            entry = self.messages.get(key)
+            if entry is None:
+                return
+
+            entry.timer = None
+            self._flush_entry(key, entry)
+            if entry.fields:
+                # Retry a failed flush
+                self._schedule(key, entry)
+            else:
+                # Not kept with its content past the interval: messages that are
+                # never flushed (e.g. `message` events of tools) would pile up,
+                # and the next append re-reads edits made elsewhere meanwhile
+                self.messages.pop(key, None)
+
+    def _flush_entry(self, key: tuple[str, str], entry: BufferedMessage):
+        if entry.timer is not None:
+            entry.timer.cancel()
+            entry.timer = None
+
+        if not entry.fields:
+            return
+
+        try:
+            Chats.upsert_message_to_chat_by_id_and_message_id(
+                key[0], key[1], entry.fields
+            )
+            self.stats["flushes"] += 1
+            self.stats["flushes_avoided"] += entry.pending_writes - 1
+        except Exception as e:
+            self.stats["flush_errors"] += 1
+            log.exception(f"Error flushing message {key[1]} of chat {key[0]}: {e}")
+            return
+
+        entry.fields = {}
+        entry.pending_size = 0
+        entry.pending_writes = 0
+        entry.first_pending_at = None
+
+    def append_content(self, chat_id: str, message_id: str, content: str):
+        """Append a delta to the message content (`message` events)."""
+        key = (chat_id, message_id)
+        with self.lock:
+            entry = self.messages.get(key)
+            if entry is None or entry.content is None:
+                # Only the first delta of a stream needs the stored content
+                message = Chats.get_message_by_id_and_message_id(chat_id, message_id)
+                if not message:
+                    return
+
+                entry = self._get_or_create(key)
+                entry.content = message.get("content", "")
+
+            self._write(
+                chat_id,
+                message_id,
+                {"content": f"{entry.content}{content}"},
+                len(content),
+            )
+
+    def replace_content(self, chat_id: str, message_id: str, content: str):
+        """Replace the message content (`replace` events and realtime saves)."""
+        self.update(chat_id, message_id, {"content": content})
+
+    def update(self, chat_id: str, message_id: str, fields: dict):
+        """Merge `fields` into the message, the same way the upsert does."""
+        size = len(fields.get("content") or "") if "content" in fields else 1
+        with self.lock:
+            entry = self.messages.get((chat_id, message_id))
+            if entry is not None and entry.content is not None and "content" in fields:
+                # A full rewrite only costs what it adds compared to the last one
+                size = max(size - len(entry.content), 1)
+
+            self._write(chat_id, message_id, fields, size)
+
+    def get_message(self, chat_id: str, message_id: str) -> Optional[dict]:
+        """Read a message, making sure buffered changes are visible."""
+        self.flush(chat_id, message_id, release=False)
+        return Chats.get_message_by_id_and_message_id(chat_id, message_id)
+
+    def flush(self, chat_id: str, message_id: str, release: bool = True):
+        """Persist pending changes, e.g. at the end of a stream."""
+        key = (chat_id, message_id)
+        with self.lock:
+            entry = self.messages.get(key)
+            if entry is None:
+                return
+
+            self._flush_entry(key, entry)
+            if release and not entry.fields:
+                self.messages.pop(key, None)
+
+    def flush_all(self):
+        with self.lock:
+            for key, entry in list(self.messages.items()):
+                self._flush_entry(key, entry)
+                if not entry.fields:
+                    self.messages.pop(key, None)
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            return {
+                **self.stats,
+                "pending_messages": sum(
+                    1 for entry in self.messages.values() if entry.fields
+                ),
+            }
+
+
+MessageBuffer = MessageWriteBuffer(
+    interval=CHAT_MESSAGE_WRITE_BUFFER_INTERVAL,
+    max_size=CHAT_MESSAGE_WRITE_BUFFER_MAX_SIZE,
+)
+
+# Last line of defence if the process exits without going through the lifespan
+atexit.register(MessageBuffer.flush_all)
@@ -44,10 +44,11 @@ from open_webui.routers.pipelines import (
 from open_webui.routers.memories import query_memory, QueryMemoryForm
 
 from open_webui.utils.webhook import post_webhook
+from open_webui.utils.message_buffer import MessageBuffer
+from open_webui.utils.stream import observe_stream
 
 
 from open_webui.models.users import UserModel
-from open_webui.models.functions import Functions
 from open_webui.models.models import Models
 
 from open_webui.retrieval.utils import get_sources_from_files
@@ -72,7 +73,7 @@ from open_webui.utils.misc import (
 from open_webui.utils.tools import get_tools
 from open_webui.utils.plugin import load_function_module_by_id
 from open_webui.utils.filter import (
-    get_sorted_filter_ids,
+    get_filter_chain,
     process_filter_functions,
 )
 from open_webui.utils.code_interpreter import execute_code_jupyter
@@ -782,12 +783,9 @@ async def process_chat_payload(request, form_data, user, metadata, model):
 
     try:
 
-        filter_functions = [
-            Functions.get_function_by_id(filter_id)
-            for filter_id in get_sorted_filter_ids(
-                request, model, metadata.get("filter_ids", [])
-            )
-        ]
+        filter_functions = get_filter_chain(
+            request, model, metadata.get("filter_ids", [])
+        )
 
         form_data, flags = await process_filter_functions(
             request=request,
@@ -1169,6 +1167,7 @@ async def process_chat_response(
 
                     # Add credit usage info for piggy-backing
                     from open_webui.models.billing import get_credit_usage_info
+
                     credit_usage = await get_credit_usage_info(user.id)
 
                     completion_data = {
@@ -1189,6 +1188,7 @@ async def process_chat_response(
                     )
 
                     # Save message in the database
+                    MessageBuffer.flush(metadata["chat_id"], metadata["message_id"])
                     Chats.upsert_message_to_chat_by_id_and_message_id(
                         metadata["chat_id"],
                         metadata["message_id"],
@@ -1266,12 +1266,7 @@ async def process_chat_response(
         "__request__": request,
         "__model__": model,
     }
-    filter_functions = [
-        Functions.get_function_by_id(filter_id)
-        for filter_id in get_sorted_filter_ids(
-            request, model, metadata.get("filter_ids", [])
-        )
-    ]
+    filter_functions = get_filter_chain(request, model, metadata.get("filter_ids", []))
 
     # Streaming response
     if event_emitter and event_caller:
@@ -1605,7 +1600,7 @@ async def process_chat_response(
 
                 return content, content_blocks, end_flag
 
-            message = Chats.get_message_by_id_and_message_id(
+            message = MessageBuffer.get_message(
                 metadata["chat_id"], metadata["message_id"]
             )
 
@@ -1664,7 +1659,7 @@ async def process_chat_response(
                     )
 
                     # Save message in the database
-                    Chats.upsert_message_to_chat_by_id_and_message_id(
+                    MessageBuffer.update(
                         metadata["chat_id"],
                         metadata["message_id"],
                         {
@@ -1678,24 +1673,9 @@ async def process_chat_response(
 
                     response_tool_calls = []
 
-                    async for line in response.body_iterator:
-                        line = line.decode("utf-8") if isinstance(line, bytes) else line
-                        data = line
-
-                        # Skip empty lines
-                        if not data.strip():
-                            continue
-
-                        # "data:" is the prefix for each event
-                        if not data.startswith("data:"):
-                            continue
-
-                        # Remove the prefix
-                        data = data[len("data:") :].strip()
-
+                    # Parsed once, shared with the subscribers of the stream (e.g. billing)
+                    async for data in observe_stream(response.body_iterator).events():
                         try:
-                            data = json.loads(data)
-
                             data, _ = await process_filter_functions(
                                 request=request,
                                 filter_functions=filter_functions,
@@ -1906,15 +1886,13 @@ async def process_chat_response(
                                             )
 
                                         if ENABLE_REALTIME_CHAT_SAVE:
-                                            # Save message in the database
-                                            Chats.upsert_message_to_chat_by_id_and_message_id(
+                                            # Save message in the database (write-behind)
+                                            MessageBuffer.replace_content(
                                                 metadata["chat_id"],
                                                 metadata["message_id"],
-                                                {
-                                                    "content": serialize_content_blocks(
-                                                        content_blocks
-                                                    ),
-                                                },
+                                                serialize_content_blocks(
+                                                    content_blocks
+                                                ),
                                             )
                                         else:
                                             data = {
@@ -1930,12 +1908,8 @@ async def process_chat_response(
                                     }
                                 )
                         except Exception as e:
-                            done = "data: [DONE]" in line
-                            if done:
-                                pass
-                            else:
-                                log.debug("Error: ", e)
-                                continue
+                            log.debug("Error: ", e)
+                            continue
 
                     if content_blocks:
                         # Clean up the last text block
@@ -2307,6 +2281,7 @@ async def process_chat_response(
 
                 # Add credit usage info for piggy-backing
                 from open_webui.models.billing import get_credit_usage_info
+
                 credit_usage = await get_credit_usage_info(user.id)
 
                 data = {
@@ -2321,13 +2296,12 @@ async def process_chat_response(
 
                 if not ENABLE_REALTIME_CHAT_SAVE:
                     # Save message in the database
-                    Chats.upsert_message_to_chat_by_id_and_message_id(
+                    MessageBuffer.replace_content(
                         metadata["chat_id"],
                         metadata["message_id"],
-                        {
-                            "content": serialize_content_blocks(content_blocks),
-                        },
+                        serialize_content_blocks(content_blocks),
                     )
+                MessageBuffer.flush(metadata["chat_id"], metadata["message_id"])
 
                 # Send a webhook notification if the user is not active
                 if not get_active_status_by_user_id(user.id):
@@ -2359,13 +2333,14 @@ async def process_chat_response(
 
                 if not ENABLE_REALTIME_CHAT_SAVE:
                     # Save message in the database
-                    Chats.upsert_message_to_chat_by_id_and_message_id(
+                    MessageBuffer.replace_content(
                         metadata["chat_id"],
                         metadata["message_id"],
-                        {
-                            "content": serialize_content_blocks(content_blocks),
-                        },
+                        serialize_content_blocks(content_blocks),
                     )
+            finally:
+                # Persist whatever is still buffered, even if the stream failed
+                MessageBuffer.flush(metadata["chat_id"], metadata["message_id"])
 
             if response.background is not None:
                 await response.background()
@@ -0,0 +1,193 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from open_webui.utils.redis import get_redis_connection, get_sentinels_from_env
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    REDIS_URL,
+    REDIS_SENTINEL_HOSTS,
+    REDIS_SENTINEL_PORT,
+    ENABLE_FORWARD_USER_INFO_HEADERS,
+    MODEL_CATALOG_CACHE_TTL,
+    MODEL_CATALOG_CACHE_STALE_TTL,
+)
+from open_webui.models.users import UserModel
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MODELS"])
+
+REDIS_KEY_PREFIX = "open-webui:model_catalog"
+
+
+class ModelCatalogCache:
+    """
+    Stale-while-revalidate cache for the model lists of each upstream connection
+    (OpenAI `/models`, Ollama `/api/tags`...), grouped by namespace.
+
+    Fresh entries are served as-is. Expired entries are served while a single
+    background task refetches them, so a slow connection never stalls the
+    catalog. Only missing (or too stale) entries are fetched inline.
+
+    Entries are stored as JSON (in Redis when configured, shared by all workers)
+    so every caller gets its own copy to mutate.
+    """
+
+    def __init__(self, redis=None, ttl: int = 60, stale_ttl: int = 3600):
+        self.redis = redis
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+
+        # {namespace: {key: json}}, used when Redis is not configured
+        self.entries: dict[str, dict[str, str]] = {}
+        # Bumped by `invalidate` so in-flight fetches don't write back old data
+        self.generations: dict[str, int] = {}
+        self.tasks: dict[str, asyncio.Task] = {}
+
+        self.stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+            "invalidations": 0,
+        }
+
+    def _redis_key(self, namespace: str) -> str:
+        return f"{REDIS_KEY_PREFIX}:{namespace}"
+
+    def _read(self, namespace: str, key: str) -> Optional[str]:
+        if self.redis is not None:
+            return self.redis.hget(self._redis_key(namespace), key)
+        return self.entries.get(namespace, {}).get(key)
+
+    def _write(self, namespace: str, key: str, value: str):
+        if self.redis is not None:
+            self.redis.hset(self._redis_key(namespace), key, value)
+        else:
+            self.entries.setdefault(namespace, {})[key] = value
+
+    async def _fetch(
+        self, namespace: str, key: str, fetch: Callable[[], Awaitable[Any]]
+    ) -> str:
+        generation = self.generations.get(namespace, 0)
+        self.stats["refreshes"] += 1
+
+        data = await fetch()
+
+        previous = self._read(namespace, key)
+        if data is None and previous is not None:
+            # Connection failed, keep serving the last good list until it is too stale
+            return previous
+
+        value = json.dumps({"data": data, "fetched_at": time.time()})
+        if self.generations.get(namespace, 0) == generation:
+            self._write(namespace, key, value)
+        return value
+
+    def _start_fetch(
+        self, namespace: str, key: str, fetch: Callable[[], Awaitable[Any]]
+    ) -> asyncio.Task:
+        task_id = f"{namespace}:{key}"
+        task = self.tasks.get(task_id)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(namespace, key, fetch))
+            self.tasks[task_id] = task
+
+            def done(task):
+                self.tasks.pop(task_id, None)
+                if not task.cancelled() and task.exception() is not None:
+                    self.stats["refresh_errors"] += 1
+                    log.error(f"Error refreshing {task_id}: {task.exception()}")
+
+            task.add_done_callback(done)
+        return task
+
+    def _revalidate(self, namespace: str, key: str, fetch):
+        if f"{namespace}:{key}" in self.tasks:
+            return
+
+        if self.redis is not None:
+            # One worker revalidates, the others keep serving the stale entry
+            lock = f"{self._redis_key(namespace)}:refreshing:{key}"
+            if not self.redis.set(lock, 1, nx=True, ex=max(self.ttl, 10)):
+                return
+
+        self._start_fetch(namespace, key, fetch)
+
+    async def get(
+        self, namespace: str, key: str, fetch: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        value = self._read(namespace, key)
+
+        if value is not None:
+            entry = json.loads(value)
+            age = time.time() - entry["fetched_at"]
+
+            if age < self.ttl:
+                self.stats["hits"] += 1
+                return entry["data"]
+
+            if age < self.ttl + self.stale_ttl:
+                self.stats["stale_hits"] += 1
+                self._revalidate(namespace, key, fetch)
+                return entry["data"]
+
+        self.stats["misses"] += 1
+        value = await asyncio.shield(self._start_fetch(namespace, key, fetch))
+        return json.loads(value)["data"]
+
+    def invalidate(self, namespace: Optional[str] = None):
+        """Drop the entries of `namespace` (all if None), e.g. after a config change."""
+        namespaces = (
+            [namespace]
+            if namespace
+            else list(set(self.entries) | set(self.generations))
+        )
+
+        for name in namespaces:
+            self.generations[name] = self.generations.get(name, 0) + 1
+            self.entries.pop(name, None)
+
+        if self.redis is not None:
+            if namespace:
+                self.redis.delete(self._redis_key(namespace))
+            else:
+                for redis_key in self.redis.scan_iter(f"{REDIS_KEY_PREFIX}:*"):
+                    self.redis.delete(redis_key)
+
+        self.stats["invalidations"] += 1
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "refreshing": len(self.tasks)}
+
+
+def get_connection_cache_key(
+    url: str, key: Optional[str] = None, user: Optional[UserModel] = None
+) -> str:
+    """
+    Cache key of one connection. The API key is hashed in so a rotated key is
+    a new entry; with user info headers forwarded, lists may differ per user.
+    """
+    parts = [url, hashlib.sha256((key or "").encode()).hexdigest()[:16]]
+    if ENABLE_FORWARD_USER_INFO_HEADERS and user:
+        parts.append(user.id)
+    return ":".join(parts)
+
+
+MODEL_CATALOG = ModelCatalogCache(
+    redis=(
+        get_redis_connection(
+            REDIS_URL,
+            get_sentinels_from_env(REDIS_SENTINEL_HOSTS, REDIS_SENTINEL_PORT),
+            decode_responses=True,
+        )
+        if REDIS_URL
+        else None
+    ),
+    ttl=MODEL_CATALOG_CACHE_TTL,
+    stale_ttl=MODEL_CATALOG_CACHE_STALE_TTL,
+)
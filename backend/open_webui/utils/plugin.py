@@ -6,10 +6,13 @@ from importlib import util
 import types
 import tempfile
 import logging
+import time
+from typing import Optional
 
 from open_webui.env import SRC_LOG_LEVELS, PIP_OPTIONS, PIP_PACKAGE_INDEX_OPTIONS
-from open_webui.models.functions import Functions
-from open_webui.models.tools import Tools
+from open_webui.models.functions import Functions, FunctionsVersion
+from open_webui.models.tools import Tools, ToolModel, ToolsVersion
+from open_webui.utils.redis import VersionCounter
 
 log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["MAIN"])
@@ -75,10 +78,9 @@ def load_tool_module_by_id(tool_id, content=None):
         if not tool:
             raise Exception(f"Toolkit not found: {tool_id}")
 
-        content = tool.content
-
-        content = replace_imports(content)
-        Tools.update_tool_by_id(tool_id, {"content": content})
+        content = replace_imports(tool.content)
+        if content != tool.content:
+            Tools.update_tool_by_id(tool_id, {"content": content})
     else:
         frontmatter = extract_frontmatter(content)
         # Install required packages found within the frontmatter
@@ -120,10 +122,9 @@ def load_function_module_by_id(function_id: str, content: str | None = None):
         function = Functions.get_function_by_id(function_id)
         if not function:
             raise Exception(f"Function not found: {function_id}")
-        content = function.content
-
-        content = replace_imports(content)
-        Functions.update_function_by_id(function_id, {"content": content})
+        content = replace_imports(function.content)
+        if content != function.content:
+            Functions.update_function_by_id(function_id, {"content": content})
     else:
         frontmatter = extract_frontmatter(content)
         install_frontmatter_requirements(frontmatter.get("requirements", ""))
@@ -166,11 +167,97 @@ def load_function_module_by_id(function_id: str, content: str | None = None):
         os.unlink(temp_file.name)
 
 
+class PluginModuleCache:
+    """
+    Remembers which version of a function/tool row the modules kept in
+    `app.state.FUNCTIONS` and `app.state.TOOLS` were checked against, so that
+    reusing them only costs a version check: a Redis read when the version
+    counters are shared, an indexed `updated_at` lookup otherwise. The source
+    is only read back when the version moved, and recompiled when it changed.
+    """
+
+    def __init__(self):
+        self.versions: dict[tuple[str, str], tuple] = {}
+        self.tools: dict[str, ToolModel] = {}
+
+        self.hits = 0
+        self.revalidations = 0
+        self.loads = 0
+        self.load_time = 0.0
+        self.max_load_time = 0.0
+
+    def get_version(
+        self, counter: VersionCounter, get_updated_at, id: str
+    ) -> Optional[tuple]:
+        if counter.redis is not None:
+            return (counter.get(), None)
+
+        # Without Redis, writes from other workers only show in the row itself
+        version = counter.get()
+        updated_at = get_updated_at(id)
+        if updated_at is None:
+            return None
+        return (version, updated_at)
+
+    def is_current(self, key: tuple[str, str], version: Optional[tuple]) -> bool:
+        if version is not None and self.versions.get(key) == version:
+            self.hits += 1
+            return True
+        return False
+
+    def set_version(self, key: tuple[str, str], version: Optional[tuple]):
+        # `updated_at` has a one second resolution: a row updated during the
+        # current second could still change without it moving
+        if version is not None and (
+            version[1] is None or version[1] < int(time.time())
+        ):
+            self.versions[key] = version
+        else:
+            self.versions.pop(key, None)
+
+    def revalidated(self, key: tuple[str, str], version: Optional[tuple]):
+        self.revalidations += 1
+        self.set_version(key, version)
+
+    def loaded(self, key: tuple[str, str], version: Optional[tuple], start: float):
+        load_time = time.perf_counter() - start
+        self.loads += 1
+        self.load_time += load_time
+        self.max_load_time = max(self.max_load_time, load_time)
+        self.set_version(key, version)
+
+    def get_stats(self) -> dict:
+        return {
+            "modules": len(self.versions),
+            "hits": self.hits,
+            "revalidations": self.revalidations,
+            "loads": self.loads,
+            "load_time_ms": round(self.load_time * 1000, 2),
+            "avg_load_time_ms": (
+                round(self.load_time * 1000 / self.loads, 2) if self.loads else 0
+            ),
+            "max_load_time_ms": round(self.max_load_time * 1000, 2),
+        }
+
+
+PluginModules = PluginModuleCache()
+
+
 def get_function_module_from_cache(request, function_id, load_from_db=True):
     if load_from_db:
-        # Always load from the database by default
-        # This is useful for hooks like "inlet" or "outlet" where the content might change
-        # and we want to ensure the latest content is used.
+        # Check the database by default, this is useful for hooks like "inlet"
+        # or "outlet" where the content might change and we want to ensure the
+        # latest content is used. Only the version is checked while it is unchanged.
+        key = ("function", function_id)
+        version = PluginModules.get_version(
+            FunctionsVersion, Functions.get_function_updated_at_by_id, function_id
+        )
+        if (
+            hasattr(request.app.state, "FUNCTIONS")
+            and function_id in request.app.state.FUNCTIONS
+            and PluginModules.is_current(key, version)
+        ):
+            return request.app.state.FUNCTIONS[function_id], None, None
 
         function = Functions.get_function_by_id(function_id)
         if not function:
@@ -191,11 +278,14 @@ def get_function_module_from_cache(request, function_id, load_from_db=True):
             and function_id in request.app.state.FUNCTIONS
         ):
             if request.app.state.FUNCTION_CONTENTS[function_id] == content:
+                PluginModules.revalidated(key, version)
                 return request.app.state.FUNCTIONS[function_id], None, None
 
+        start = time.perf_counter()
         function_module, function_type, frontmatter = load_function_module_by_id(
             function_id, content
         )
+        PluginModules.loaded(key, version, start)
     else:
         # Load from cache (e.g. "stream" hook)
         # This is useful for performance reasons
@@ -222,6 +312,46 @@ def get_function_module_from_cache(request, function_id, load_from_db=True):
     return function_module, function_type, frontmatter
 
 
+def get_tool_module_from_cache(request, tool_id):
+    """
+    Get the module of a tool along with its row (specs, meta...), returns
+    `(None, None)` if the tool does not exist.
+    """
+    key = ("tool", tool_id)
+    version = PluginModules.get_version(
+        ToolsVersion, Tools.get_tool_updated_at_by_id, tool_id
+    )
+    if tool_id in request.app.state.TOOLS and PluginModules.is_current(key, version):
+        return request.app.state.TOOLS[tool_id], PluginModules.tools[tool_id]
+
+    tool = Tools.get_tool_by_id(tool_id)
+    if tool is None:
+        PluginModules.versions.pop(key, None)
+        PluginModules.tools.pop(tool_id, None)
+        return None, None
+
+    # Loading the module writes the replaced imports back
+    tool.content = replace_imports(tool.content)
+
+    cached = PluginModules.tools.get(tool_id)
+    if (
+        tool_id in request.app.state.TOOLS
+        and cached is not None
+        and cached.content == tool.content
+    ):
+        PluginModules.tools[tool_id] = tool
+        PluginModules.revalidated(key, version)
+        return request.app.state.TOOLS[tool_id], tool
+
+    start = time.perf_counter()
+    module, _ = load_tool_module_by_id(tool_id)
+    request.app.state.TOOLS[tool_id] = module
+    PluginModules.tools[tool_id] = tool
+    PluginModules.loaded(key, version, start)
+
+    return module, tool
+
+
 def install_frontmatter_requirements(requirements: str):
     if requirements:
         try:
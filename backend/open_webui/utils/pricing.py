@@ -1,26 +1,231 @@
 # billing/test_pricing.py
 from __future__ import annotations
-import json, httpx, functools, decimal
+import asyncio, hashlib, json, logging, os, re, threading, time
+from collections import OrderedDict
 from decimal import Decimal
-from typing import Tuple
+from pathlib import Path
+from typing import Optional, Tuple
+
+import aiohttp
 import tiktoken
 
-PRICE_URL = (
-    "https://raw.githubusercontent.com/"
-    "BerriAI/litellm/main/model_prices_and_context_window.json"
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    MODEL_PRICE_SHEET_PATH,
+    MODEL_PRICE_SHEET_URL,
+    MODEL_PRICE_SHEET_REFRESH_INTERVAL,
+    MODEL_PRICE_ALIASES,
+    MODEL_PRICE_DEFAULT,
 )
 
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+BUNDLED_PRICE_SHEET_PATH = Path(__file__).parent / "model_prices.json"
+
+# How often admin overrides are re-read so every worker picks them up
+PRICE_OVERRIDES_REFRESH_INTERVAL = 60
+
+# Provider prefixes and date suffixes that do not change the price
+_PROVIDER_PREFIX_RE = re.compile(r"^[\w.\-]+/")
+_DATE_SUFFIX_RE = re.compile(r"-(\d{4}-\d{2}-\d{2}|\d{8}|\d{4})$")
+
+
+class ModelPriceNotFoundError(ValueError):
+    pass
+
+
+def normalize_model_name(model: str) -> str:
+    return model.lower().strip()
+
 
 # ────────────────────────────────────────────────────────────────
-# Internal: fetch-once JSON → {model: {"input_cost_per_token": …}}
+# Price sheet: {normalized model: (input_cost_per_token, output_cost_per_token)}
 # ────────────────────────────────────────────────────────────────
-@functools.lru_cache(maxsize=1)
-def _load_price_map() -> dict:
-    """Download and cache LiteLLM's live price sheet."""
-    resp = httpx.get(PRICE_URL, timeout=10)
-    resp.raise_for_status()
-    data = json.loads(resp.text)
-    return data  # top level is a dict keyed by model-name
+class PriceSheet:
+    """
+    In-memory price sheet. Lookups never do I/O: the sheet is loaded from disk at
+    startup and replaced atomically (single reference swap) by the background
+    refresh or when admin overrides change.
+    """
+
+    def __init__(self):
+        # (version, prices, aliases), replaced as a whole
+        self.sheet: Tuple[Optional[str], dict, dict] = (None, {}, {})
+        self.overrides: dict[str, Tuple[Decimal, Decimal]] = {}
+
+    @property
+    def version(self) -> Optional[str]:
+        return self.sheet[0]
+
+    @staticmethod
+    def parse(data: dict) -> Tuple[Optional[str], dict, dict]:
+        """Accept the bundled format or LiteLLM's raw price map."""
+        if "prices" in data:
+            version = data.get("version")
+            entries = data["prices"]
+            aliases = data.get("aliases", {})
+        else:
+            version = time.strftime("%Y-%m-%d")
+            entries = data
+            aliases = {}
+
+        prices = {}
+        for name, meta in entries.items():
+            if not isinstance(meta, dict):
+                continue
+            try:
+                prices[normalize_model_name(name)] = (
+                    Decimal(str(meta["input_cost_per_token"])),
+                    Decimal(str(meta["output_cost_per_token"])),
+                )
+            except (KeyError, TypeError, ArithmeticError):
+                continue
+
+        aliases = {
+            normalize_model_name(k): normalize_model_name(v) for k, v in aliases.items()
+        }
+        return version, prices, aliases
+
+    def load(self, data: dict):
+        version, prices, aliases = self.parse(data)
+        if not prices:
+            raise ValueError("price sheet does not contain any model prices")
+
+        aliases = {
+            **aliases,
+            **{
+                normalize_model_name(k): normalize_model_name(v)
+                for k, v in MODEL_PRICE_ALIASES.items()
+            },
+        }
+        self.sheet = (version, prices, aliases)
+
+    def load_file(self, path) -> bool:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.load(json.load(f))
+            log.info(f"Loaded model price sheet {self.version} from {path}")
+            return True
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            log.warning(f"Unable to load model price sheet from {path}: {e}")
+            return False
+
+    def set_overrides(self, overrides: dict[str, Tuple[Decimal, Decimal]]):
+        self.overrides = {normalize_model_name(k): v for k, v in overrides.items()}
+
+    def get(self, model: str) -> Optional[Tuple[Decimal, Decimal]]:
+        _, prices, aliases = self.sheet
+        overrides = self.overrides
+
+        name = normalize_model_name(model)
+        candidates = [name]
+
+        stripped = _PROVIDER_PREFIX_RE.sub("", name)
+        if stripped != name:
+            candidates.append(stripped)
+
+        for candidate in list(candidates):
+            undated = _DATE_SUFFIX_RE.sub("", candidate)
+            if undated != candidate:
+                candidates.append(undated)
+
+        for candidate in candidates:
+            for key in (candidate, aliases.get(candidate)):
+                price = overrides.get(key) or prices.get(key)
+                if price is not None:
+                    return price
+        return None
+
+
+PRICE_SHEET = PriceSheet()
+
+
+def parse_default_price(price: Optional[dict]) -> Optional[Tuple[Decimal, Decimal]]:
+    if not price:
+        return None
+    try:
+        return (
+            Decimal(str(price["input_cost_per_token"])),
+            Decimal(str(price["output_cost_per_token"])),
+        )
+    except (KeyError, TypeError, ArithmeticError) as e:
+        log.warning(f"Invalid MODEL_PRICE_DEFAULT, ignored: {e}")
+        return None
+
+
+# Price of the models the sheet doesn't cover, None to reject them
+DEFAULT_PRICE = parse_default_price(MODEL_PRICE_DEFAULT)
+
+
+def load_price_sheet():
+    """Load the price sheet from disk, falling back to the bundled copy."""
+    if MODEL_PRICE_SHEET_PATH and PRICE_SHEET.load_file(MODEL_PRICE_SHEET_PATH):
+        return
+    if not PRICE_SHEET.load_file(BUNDLED_PRICE_SHEET_PATH):
+        log.error("Bundled model price sheet is missing or invalid")
+
+
+def load_price_overrides():
+    from open_webui.models.billing import ModelPrices
+
+    try:
+        PRICE_SHEET.set_overrides(
+            {
+                price.model_name: (
+                    Decimal(str(price.input_cost_per_token)),
+                    Decimal(str(price.output_cost_per_token)),
+                )
+                for price in ModelPrices.get_model_prices()
+            }
+        )
+    except Exception as e:
+        log.warning(f"Unable to load model price overrides: {e}")
+
+
+async def refresh_price_sheet(url: str = MODEL_PRICE_SHEET_URL) -> bool:
+    """Download a new price sheet, persist it and swap it in."""
+    try:
+        timeout = aiohttp.ClientTimeout(total=30)
+        async with aiohttp.ClientSession(timeout=timeout, trust_env=True) as session:
+            async with session.get(url) as r:
+                r.raise_for_status()
+                data = await r.json(content_type=None)
+
+        PRICE_SHEET.load(data)
+    except Exception as e:
+        log.warning(f"Unable to refresh model price sheet from {url}: {e}")
+        return False
+
+    if MODEL_PRICE_SHEET_PATH:
+        try:
+            tmp_path = f"{MODEL_PRICE_SHEET_PATH}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, MODEL_PRICE_SHEET_PATH)
+        except Exception as e:
+            log.warning(f"Unable to persist model price sheet: {e}")
+
+    log.info(f"Refreshed model price sheet from {url}")
+    return True
+
+
+async def periodic_price_sheet_refresh():
+    # Due on the first pass, monotonic() may be smaller than the interval
+    last_refresh = -float(MODEL_PRICE_SHEET_REFRESH_INTERVAL)
+    while True:
+        await asyncio.sleep(PRICE_OVERRIDES_REFRESH_INTERVAL)
+        await asyncio.to_thread(load_price_overrides)
+
+        if (
+            MODEL_PRICE_SHEET_URL
+            and MODEL_PRICE_SHEET_REFRESH_INTERVAL > 0
+            and time.monotonic() - last_refresh >= MODEL_PRICE_SHEET_REFRESH_INTERVAL
+        ):
+            await refresh_price_sheet()
+            last_refresh = time.monotonic()
 
 
 def estimate_cost(
@@ -29,29 +234,136 @@ def estimate_cost(
         completion_tokens: int,
 ) -> Decimal:
     """
-    Return (prompt_cost, completion_cost, total_cost) in USD.
-    Uses LiteLLM's public price map; caches the JSON in-process.
+    Return the total cost in USD.
+    Uses the in-memory price sheet; never does any network I/O.
     """
-    model = model.lower().strip()
-    price_map = _load_price_map()
-
-    if model not in price_map:
-        raise ValueError(
-            f"model '{model}' not found in LiteLLM price map @ {PRICE_URL}"
+    price = PRICE_SHEET.get(model) or DEFAULT_PRICE
+    if price is None:
+        raise ModelPriceNotFoundError(
+            f"model '{normalize_model_name(model)}' not found in price sheet {PRICE_SHEET.version}"
         )
 
-    meta = price_map[model]
-    try:
-        in_rate = Decimal(str(meta["input_cost_per_token"]))
-        out_rate = Decimal(str(meta["output_cost_per_token"]))
-    except KeyError as e:
-        raise KeyError(f"price map missing expected key: {e}") from None
-
+    in_rate, out_rate = price
     prompt_cost = Decimal(prompt_tokens) * in_rate
     completion_cost = Decimal(completion_tokens) * out_rate
     return prompt_cost + completion_cost
 
 
+# ────────────────────────────────────────────────────────────────
+# Tokenizers: one encoding instance per family, loaded once
+# ────────────────────────────────────────────────────────────────
+# Ordered, first match wins. Non-OpenAI families have no public tiktoken
+# encoding; cl100k_base is a much closer estimate for them than len // 4.
+TOKENIZER_FAMILIES = [
+    (("gpt-4o", "gpt-4.1", "gpt-4.5", "o1", "o3", "o4", "chatgpt-4o"), "o200k_base"),
+    (("gpt-4", "gpt-3.5", "text-embedding"), "cl100k_base"),
+    (("claude", "gemini", "gemma", "llama", "mistral", "mixtral", "deepseek", "qwen"), "cl100k_base"),
+]
+DEFAULT_TOKENIZER = "cl100k_base"
+
+
+class TokenizerRegistry:
+    def __init__(self):
+        self.encodings: dict[str, Optional[tiktoken.Encoding]] = {}
+        self.models: dict[str, Optional[str]] = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def get_encoding_name(model: str) -> str:
+        model = _PROVIDER_PREFIX_RE.sub("", normalize_model_name(model))
+        for prefixes, encoding_name in TOKENIZER_FAMILIES:
+            if model.startswith(prefixes):
+                return encoding_name
+        return DEFAULT_TOKENIZER
+
+    def _load(self, encoding_name: str) -> Optional[tiktoken.Encoding]:
+        with self.lock:
+            if encoding_name not in self.encodings:
+                try:
+                    self.encodings[encoding_name] = tiktoken.get_encoding(encoding_name)
+                except Exception as e:
+                    # e.g. BPE files not cached on an offline node, don't retry
+                    log.warning(f"Unable to load tokenizer {encoding_name}: {e}")
+                    self.encodings[encoding_name] = None
+            return self.encodings[encoding_name]
+
+    def preload(self):
+        """
+        Load every configured encoding, at startup: loading may download BPE
+        files and must not happen on the request path.
+        """
+        encoding_names = {DEFAULT_TOKENIZER}
+        encoding_names.update(name for _, name in TOKENIZER_FAMILIES)
+        for encoding_name in sorted(encoding_names):
+            self._load(encoding_name)
+
+    def get(self, model: str) -> Tuple[Optional[str], Optional[tiktoken.Encoding]]:
+        """
+        Return (encoding name, encoding), the encoding is None while it is not
+        (or could not be) loaded, in which case counts are estimated.
+        """
+        if model not in self.models:
+            self.models[model] = self.get_encoding_name(model)
+
+        encoding_name = self.models[model]
+        return encoding_name, self.encodings.get(encoding_name)
+
+
+TOKENIZERS = TokenizerRegistry()
+
+
+class TokenCountCache:
+    """LRU of token counts keyed by (encoding, content hash)."""
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self.counts: OrderedDict[Tuple[str, str], int] = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def count(self, encoding_name: str, encoding, text: str) -> int:
+        # Estimates are kept apart, so they are replaced once the encoding loads
+        key = (
+            encoding_name if encoding is not None else "estimate",
+            hashlib.sha1(text.encode("utf-8")).hexdigest(),
+        )
+        with self.lock:
+            if key in self.counts:
+                self.counts.move_to_end(key)
+                self.hits += 1
+                return self.counts[key]
+
+        if encoding is not None:
+            count = len(encoding.encode(text, disallowed_special=()))
+        else:
+            count = max(1, len(text) // 4)  # heuristic fallback
+
+        with self.lock:
+            self.misses += 1
+            self.counts[key] = count
+            if len(self.counts) > self.maxsize:
+                self.counts.popitem(last=False)
+        return count
+
+    def get_stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.counts)}
+
+
+TOKEN_COUNTS = TokenCountCache()
+
+
+def get_message_text(msg: dict) -> str:
+    content = msg.get("content") or ""
+    if isinstance(content, list):
+        content = " ".join(
+            part.get("text", "")
+            for part in content
+            if isinstance(part, dict) and part.get("type") == "text"
+        )
+    return content.strip()
+
+
 def extract_prompt_text(messages: list[dict]) -> str:
     """
     Convert messages into a role-tagged prompt string for accurate estimation.
@@ -59,7 +371,7 @@ def extract_prompt_text(messages: list[dict]) -> str:
     parts = []
     for msg in messages:
         role = msg.get("role", "unknown").strip()
-        content = msg.get("content", "").strip()
+        content = get_message_text(msg)
         if content:
             parts.append(f"{role}: {content}")
     return "\n".join(parts)
@@ -67,16 +379,30 @@ def extract_prompt_text(messages: list[dict]) -> str:
 
 def estimate_prompt_tokens(prompt: str, model: str) -> int:
     """
-    Estimate token count for the prompt using tiktoken or a fallback heuristic.
+    Estimate token count for the prompt using the model family's tokenizer.
     """
-    model = model.lower().strip()
-    try:
-        if "gpt" in model or "openai" in model:
-            encoding = tiktoken.encoding_for_model(model)
-            return len(encoding.encode(prompt))
-    except Exception:
-        pass
-    return max(1, len(prompt) // 4)  # heuristic fallback
+    encoding_name, encoding = TOKENIZERS.get(model)
+    return TOKEN_COUNTS.count(encoding_name, encoding, prompt)
+
+
+def estimate_messages_tokens(messages: list[dict], model: str) -> int:
+    """
+    Same estimate as tokenizing `extract_prompt_text(messages)`, but counted per
+    message so only messages not seen before are tokenized.
+    """
+    encoding_name, encoding = TOKENIZERS.get(model)
+
+    total = 0
+    parts = 0
+    for msg in messages:
+        role = msg.get("role", "unknown").strip()
+        content = get_message_text(msg)
+        if content:
+            total += TOKEN_COUNTS.count(encoding_name, encoding, f"{role}: {content}")
+            parts += 1
+
+    # One token for each newline joining the messages
+    return max(1, total + max(parts - 1, 0))
 
 
 def estimate_completion_tokens(model: str, prompt_tokens: int) -> int:
@@ -107,12 +433,13 @@ def affordable(model: str, messages: list[dict], user_credit_usd: int, buffer: f
     """
     Main function to check if the user can afford an LLM request.
     """
-    print("Checking if user can afford an LLM request.")
-    prompt_text = extract_prompt_text(messages)
-    prompt_tokens = estimate_prompt_tokens(prompt_text, model)
+    prompt_tokens = estimate_messages_tokens(messages, model)
     completion_tokens = estimate_completion_tokens(model, prompt_tokens)
 
     estimated_cost = estimate_cost(model, prompt_tokens, completion_tokens)
     total_cost = estimated_cost * Decimal(str(buffer))
 
     return total_cost <= user_credit_usd
+
+
+load_price_sheet()
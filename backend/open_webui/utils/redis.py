@@ -1,8 +1,12 @@
+import logging
+
 import socketio
 import redis
 from redis import asyncio as aioredis
 from urllib.parse import urlparse
 
+log = logging.getLogger(__name__)
+
 
 def parse_redis_service_url(redis_url):
     parsed_url = urlparse(redis_url)
@@ -37,6 +41,25 @@ def get_redis_connection(redis_url, redis_sentinels, decode_responses=True):
         return redis.Redis.from_url(redis_url, decode_responses=decode_responses)
 
 
+def get_async_redis_connection(redis_url, redis_sentinels, decode_responses=True):
+    if redis_sentinels:
+        redis_config = parse_redis_service_url(redis_url)
+        sentinel = aioredis.sentinel.Sentinel(
+            redis_sentinels,
+            port=redis_config["port"],
+            db=redis_config["db"],
+            username=redis_config["username"],
+            password=redis_config["password"],
+            decode_responses=decode_responses,
+        )
+
+        # Get a master connection from Sentinel
+        return sentinel.master_for(redis_config["service"])
+    else:
+        # Standard Redis connection
+        return aioredis.Redis.from_url(redis_url, decode_responses=decode_responses)
+
+
 def get_sentinels_from_env(sentinel_hosts_env, sentinel_port_env):
     if sentinel_hosts_env:
         sentinel_hosts = sentinel_hosts_env.split(",")
@@ -56,3 +79,32 @@ def get_sentinel_url_from_env(redis_url, sentinel_hosts_env, sentinel_port_env):
         f"{host}:{sentinel_port_env}" for host in sentinel_hosts_env.split(",")
     )
     return f"redis+sentinel://{auth_part}{hosts_part}/{redis_config['db']}/{redis_config['service']}"
+
+
+class VersionCounter:
+    """
+    Counter bumped whenever some stored data changes, so whatever was built
+    from it (compiled modules, filter chains...) can tell it is outdated with
+    one cheap read. Shared by all workers through Redis when configured.
+    """
+
+    def __init__(self, name: str, redis=None):
+        self.key = f"open-webui:version:{name}"
+        self.redis = redis
+        self.value = 0
+
+    def get(self) -> int:
+        if self.redis is not None:
+            try:
+                return int(self.redis.get(self.key) or 0)
+            except Exception as e:
+                log.warning(f"Error reading {self.key}: {e}")
+        return self.value
+
+    def bump(self):
+        self.value += 1
+        if self.redis is not None:
+            try:
+                self.redis.incr(self.key)
+            except Exception as e:
+                log.warning(f"Error bumping {self.key}: {e}")
@@ -0,0 +1,115 @@
+import logging
+from urllib.parse import urlparse
+
+import aiohttp
+
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    AIOHTTP_CLIENT_POOL_LIMIT,
+    AIOHTTP_CLIENT_POOL_LIMIT_PER_HOST,
+    AIOHTTP_CLIENT_POOL_KEEPALIVE_TIMEOUT,
+    AIOHTTP_CLIENT_POOL_DNS_CACHE_TTL,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+
+class ClientSessionPool:
+    """
+    App-lifetime `aiohttp.ClientSession`s, one per upstream base URL, so requests
+    to the same provider reuse keep-alive connections instead of paying a new
+    TCP/TLS handshake each time.
+
+    Sessions carry no timeout of their own: pass `timeout=` per request.
+    Responses must be released (`response.close()`/`release()`), never the session.
+    """
+
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 0,
+        keepalive_timeout: float = 30,
+        dns_cache_ttl: int = 300,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+
+        self.sessions: dict[str, aiohttp.ClientSession] = {}
+        self.stats = {"sessions_created": 0, "requests": 0, "saturated": 0}
+
+    @staticmethod
+    def get_base_url(url: str) -> str:
+        parsed_url = urlparse(url)
+        return f"{parsed_url.scheme}://{parsed_url.netloc}"
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.dns_cache_ttl,
+            use_dns_cache=True,
+        )
+        self.stats["sessions_created"] += 1
+        return aiohttp.ClientSession(
+            connector=connector,
+            trust_env=True,
+            # Shared by all users, upstream cookies must not leak between them
+            cookie_jar=aiohttp.DummyCookieJar(),
+            # Per-request timeouts only, the session outlives any single request
+            timeout=aiohttp.ClientTimeout(total=None),
+        )
+
+    @staticmethod
+    def _in_use(session: aiohttp.ClientSession) -> int:
+        return len(getattr(session.connector, "_acquired", ()))
+
+    def get_session(self, url: str) -> aiohttp.ClientSession:
+        """The shared session for the base URL of `url`."""
+        base_url = self.get_base_url(url)
+
+        session = self.sessions.get(base_url)
+        if session is None or session.closed:
+            session = self._create_session()
+            self.sessions[base_url] = session
+
+        self.stats["requests"] += 1
+        if self.limit and self._in_use(session) >= self.limit:
+            self.stats["saturated"] += 1
+
+        return session
+
+    async def close(self):
+        for base_url, session in list(self.sessions.items()):
+            try:
+                await session.close()
+            except Exception as e:
+                log.error(f"Error closing session for {base_url}: {e}")
+        self.sessions = {}
+
+    def get_stats(self) -> dict:
+        pools = {}
+        for base_url, session in self.sessions.items():
+            connector = session.connector
+            waiters = getattr(connector, "_waiters", {})
+            pools[base_url] = {
+                "in_use": self._in_use(session),
+                "idle": sum(
+                    len(conns) for conns in getattr(connector, "_conns", {}).values()
+                ),
+                "waiting": sum(len(w) for w in waiters.values()),
+                "limit": self.limit,
+                "limit_per_host": self.limit_per_host,
+            }
+        return {**self.stats, "pools": pools}
+
+
+SessionPool = ClientSessionPool(
+    limit=AIOHTTP_CLIENT_POOL_LIMIT,
+    limit_per_host=AIOHTTP_CLIENT_POOL_LIMIT_PER_HOST,
+    keepalive_timeout=AIOHTTP_CLIENT_POOL_KEEPALIVE_TIMEOUT,
+    dns_cache_ttl=AIOHTTP_CLIENT_POOL_DNS_CACHE_TTL,
+)
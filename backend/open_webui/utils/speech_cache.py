@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["AUDIO"])
+
+
+class SpeechFileCache:
+    """
+    Synthesized speech kept in `directory` as `{key}.mp3`, next to the
+    `{key}.json` payload it was made from:
+
+    - entries are dropped past `ttl` seconds (0 keeps them forever),
+    - the least recently used ones are removed past `max_size` bytes,
+    - concurrent requests for the same speech share a single synthesis.
+    """
+
+    def __init__(self, directory: Path, max_size: int, ttl: int):
+        self.directory = directory
+        self.max_size = max_size
+        self.ttl = ttl
+
+        # key -> {"size": ..., "created_at": ...}, least recently used first
+        self.entries: OrderedDict[str, dict] = OrderedDict()
+        self.size = 0
+        self.loaded = False
+        self.last_sweep = 0.0
+        self.inflight: dict[str, asyncio.Task] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.adopted = 0
+        self.shared = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.failures = 0
+
+    def get_path(self, key: str) -> Path:
+        return self.directory.joinpath(f"{key}.mp3")
+
+    def _load(self):
+        """Index the speech left by earlier runs, least recently used first."""
+        if self.loaded:
+            return
+        self.loaded = True
+
+        files = []
+        if self.directory.is_dir():
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and entry.name.endswith(".mp3"):
+                    stat = entry.stat()
+                    files.append(
+                        (stat.st_atime, entry.name[:-4], stat.st_size, stat.st_mtime)
+                    )
+        for _, key, size, created_at in sorted(files):
+            self.entries[key] = {"size": size, "created_at": created_at}
+            self.size += size
+
+    def _remove(self, key: str):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry["size"]
+        for path in (self.get_path(key), self.directory.joinpath(f"{key}.json")):
+            try:
+                path.unlink(missing_ok=True)
+            except Exception as e:
+                log.warning(f"Error removing cached speech {path}: {e}")
+
+    def _is_expired(self, entry: dict, now: float) -> bool:
+        return bool(self.ttl) and now - entry["created_at"] > self.ttl
+
+    def _evict(self, keep: str):
+        now = time.time()
+        # Expired entries are not necessarily the least recently used ones
+        if self.ttl and now - self.last_sweep > 60:
+            self.last_sweep = now
+            for key, entry in list(self.entries.items()):
+                if key != keep and self._is_expired(entry, now):
+                    self._remove(key)
+                    self.expirations += 1
+
+        while self.max_size and self.size > self.max_size and len(self.entries) > 1:
+            key = next(iter(self.entries))
+            if key == keep:
+                self.entries.move_to_end(key)
+                continue
+            self._remove(key)
+            self.evictions += 1
+
+    def _adopt(self, key: str) -> Optional[dict]:
+        """Index the speech another worker (or replica) cached since `_load`."""
+        try:
+            stat = self.get_path(key).stat()
+        except OSError:
+            return None
+        # The payload is written once the speech is complete
+        if not self.directory.joinpath(f"{key}.json").is_file():
+            return None
+
+        entry = {"size": stat.st_size, "created_at": stat.st_mtime}
+        if self._is_expired(entry, time.time()):
+            return None
+
+        self.entries[key] = entry
+        self.size += entry["size"]
+        self.adopted += 1
+        self._evict(keep=key)
+        return entry
+
+    def get(self, key: str) -> Optional[Path]:
+        """The cached speech for `key`, if any."""
+        self._load()
+        entry = self.entries.get(key) or self._adopt(key)
+        if entry is None:
+            return None
+
+        path = self.get_path(key)
+        if self._is_expired(entry, time.time()) or not path.is_file():
+            self._remove(key)
+            self.expirations += 1
+            return None
+
+        self.entries.move_to_end(key)
+        return path
+
+    def put(self, key: str):
+        """Record the speech just written for `key`."""
+        self._load()
+        path = self.get_path(key)
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry["size"]
+        self.entries[key] = {"size": path.stat().st_size, "created_at": time.time()}
+        self.size += self.entries[key]["size"]
+        self._evict(keep=key)
+
+    async def _synthesize(
+        self, key: str, synthesize: Callable[[Path], Awaitable[None]]
+    ) -> Path:
+        path = self.get_path(key)
+        try:
+            await synthesize(path)
+            if not path.is_file():
+                raise Exception("No speech was synthesized")
+        except BaseException:
+            # Don't leave partial files to be indexed on the next start
+            self.failures += 1
+            self._remove(key)
+            raise
+
+        self.put(key)
+        return path
+
+    async def get_or_create(
+        self, key: str, synthesize: Callable[[Path], Awaitable[None]]
+    ) -> Path:
+        """
+        The cached speech for `key`, or the one `synthesize(path)` writes.
+        Synthesis runs as its own task, so it still completes (and is cached)
+        when the request that started it goes away.
+        """
+        path = self.get(key)
+        if path is not None:
+            self.hits += 1
+            return path
+
+        task = self.inflight.get(key)
+        if task is not None:
+            self.shared += 1
+        else:
+            self.misses += 1
+            task = asyncio.create_task(self._synthesize(key, synthesize))
+            self.inflight[key] = task
+
+            def done(task: asyncio.Task):
+                self.inflight.pop(key, None)
+                # Retrieved here in case every request waiting for it is gone
+                if not task.cancelled():
+                    task.exception()
+
+            task.add_done_callback(done)
+
+        return await asyncio.shield(task)
+
+    def get_stats(self) -> dict:
+        self._load()
+        requests = self.hits + self.misses + self.shared
+        return {
+            "entries": len(self.entries),
+            "size": self.size,
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "inflight": len(self.inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "adopted": self.adopted,
+            "shared": self.shared,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "failures": self.failures,
+            "hit_rate": (self.hits + self.shared) / requests if requests else 0.0,
+        }
@@ -0,0 +1,108 @@
+import contextlib
+import json
+import logging
+from typing import AsyncIterator, Awaitable, Callable, Optional, Union
+
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+
+StreamCallback = Callable[[dict], Union[Awaitable[None], None]]
+
+
+def parse_sse_chunk(chunk: bytes) -> list[dict]:
+    """
+    Parse the `data:` events of an SSE chunk. Lines that are not JSON
+    (e.g. `data: [DONE]` or a partial line) are skipped.
+    """
+    events = []
+    for line in chunk.split(b"\n"):
+        line = line.strip()
+        if not line.startswith(b"data:"):
+            continue
+
+        payload = line[len(b"data:") :].strip()
+        if not payload or payload == b"[DONE]":
+            continue
+
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            continue
+
+        if isinstance(data, dict):
+            events.append(data)
+    return events
+
+
+class StreamObserver:
+    """
+    Wraps the body iterator of a streamed completion so each SSE chunk is parsed
+    at most once, however many parties (billing, usage events, filters) look at it.
+
+    Iterating the observer passes the raw chunks through. Subscribers registered
+    with a `needle` are only called for chunks containing those bytes, so a
+    stream nobody else parses is only scanned, never decoded. `events()` yields
+    the parsed events to the consumer and feeds the subscribers from the same parse.
+    """
+
+    def __init__(self, body_iterator):
+        self.body_iterator = body_iterator
+        self.subscribers: list[tuple[Optional[bytes], StreamCallback]] = []
+
+    def subscribe(self, callback: StreamCallback, needle: Optional[bytes] = None):
+        self.subscribers.append((needle, callback))
+
+    async def _notify(self, chunk: bytes, events: list[dict]):
+        for needle, callback in self.subscribers:
+            if needle is not None and needle not in chunk:
+                continue
+            for data in events:
+                try:
+                    result = callback(data)
+                    if result is not None:
+                        await result
+                except Exception as e:
+                    log.exception(f"Error in stream subscriber: {e}")
+
+    async def _iterate(self, parse_all: bool):
+        try:
+            async for chunk in self.body_iterator:
+                raw = chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+
+                events = None
+                if parse_all or any(
+                    needle is None or needle in raw for needle, _ in self.subscribers
+                ):
+                    events = parse_sse_chunk(raw)
+                    await self._notify(raw, events)
+
+                yield chunk, events
+        finally:
+            await self.aclose()
+
+    async def __aiter__(self):
+        async for chunk, _ in self._iterate(parse_all=False):
+            yield chunk
+
+    async def events(self) -> AsyncIterator[dict]:
+        async for _, events in self._iterate(parse_all=True):
+            for data in events:
+                yield data
+
+    async def aclose(self):
+        # Whether the client disconnected or not, close what we wrapped
+        with contextlib.suppress(Exception):
+            if hasattr(self.body_iterator, "aclose"):
+                await self.body_iterator.aclose()
+            elif hasattr(self.body_iterator, "close"):
+                self.body_iterator.close()
+
+
+def observe_stream(body_iterator) -> StreamObserver:
+    """The observer already wrapping `body_iterator`, or a new one."""
+    if isinstance(body_iterator, StreamObserver):
+        return body_iterator
+    return StreamObserver(body_iterator)
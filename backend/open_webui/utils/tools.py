@@ -33,13 +33,14 @@ from langchain_core.utils.function_calling import (
 )
 
 
-from open_webui.models.tools import Tools
+from open_webui.models.tools import Tools, ToolModel
 from open_webui.models.users import UserModel
-from open_webui.utils.plugin import load_tool_module_by_id
+from open_webui.utils.plugin import get_tool_module_from_cache
 from open_webui.env import (
     SRC_LOG_LEVELS,
     AIOHTTP_CLIENT_TIMEOUT_TOOL_SERVER_DATA,
     AIOHTTP_CLIENT_SESSION_TOOL_SERVER_SSL,
+    TOOL_SERVER_REFRESH_INTERVAL,
 )
 
 import copy
@@ -67,13 +68,118 @@ def get_async_tool_function_and_apply_extra_params(
         return new_function
 
 
+class CompiledTool:
+    """The specs, functions and valves of one version of a tool."""
+
+    def __init__(self, tool_id: str, module: Any, tool: ToolModel):
+        self.module = module
+        self.updated_at = tool.updated_at
+
+        self.valves = None
+        if hasattr(module, "valves") and hasattr(module, "Valves"):
+            valves = Tools.get_tool_valves_by_id(tool_id) or {}
+            self.valves = module.Valves(**valves)
+
+        # [(spec, function)]
+        self.functions = []
+        for spec in copy.deepcopy(tool.specs):
+            # TODO: Fix hack for OpenAI API
+            # Some times breaks OpenAI but others don't. Leaving the comment
+            for val in spec.get("parameters", {}).get("properties", {}).values():
+                if val.get("type") == "str":
+                    val["type"] = "string"
+
+            # Remove internal reserved parameters (e.g. __id__, __user__)
+            spec["parameters"]["properties"] = {
+                key: val
+                for key, val in spec["parameters"]["properties"].items()
+                if not key.startswith("__")
+            }
+
+            function_name = spec["name"]
+            function = getattr(module, function_name)
+
+            # TODO: Support Pydantic models as parameters
+            if function.__doc__ and function.__doc__.strip() != "":
+                s = re.split(":(param|return)", function.__doc__, 1)
+                spec["description"] = s[0]
+            else:
+                spec["description"] = function_name
+
+            self.functions.append((spec, function))
+
+
+class ToolSpecRegistry:
+    """
+    Tool specs ready to be sent to models, compiled once per tool version
+    instead of on every chat request. OpenAPI documents of tool servers are
+    revalidated with their ETag and only converted again when they changed.
+    Compiled specs are shared between requests and must not be modified.
+    """
+
+    def __init__(self):
+        self.tools: dict[str, CompiledTool] = {}
+        # {url: (etag, tool server data)}
+        self.documents: dict[str, tuple[str, dict]] = {}
+        # {url: (openapi document, {operationId: (path, method, operation)})}
+        self.operations: dict[str, tuple[dict, dict]] = {}
+
+        self.hits = 0
+        self.compiles = 0
+        self.server_fetches = 0
+        self.server_not_modified = 0
+
+    def get_tool(self, tool_id: str, module: Any, tool: ToolModel) -> CompiledTool:
+        compiled = self.tools.get(tool_id)
+        if (
+            compiled is not None
+            and compiled.module is module
+            and compiled.updated_at == tool.updated_at
+        ):
+            self.hits += 1
+            return compiled
+
+        compiled = CompiledTool(tool_id, module, tool)
+        self.tools[tool_id] = compiled
+        self.compiles += 1
+        return compiled
+
+    def get_operation(self, url: str, openapi: dict, name: str) -> Optional[tuple]:
+        entry = self.operations.get(url)
+        if entry is None or entry[0] is not openapi:
+            operations = {}
+            for route_path, methods in openapi.get("paths", {}).items():
+                for http_method, operation in methods.items():
+                    if isinstance(operation, dict) and operation.get("operationId"):
+                        operations.setdefault(
+                            operation["operationId"],
+                            (route_path, http_method.lower(), operation),
+                        )
+            entry = (openapi, operations)
+            self.operations[url] = entry
+        return entry[1].get(name)
+
+    def get_stats(self) -> dict:
+        return {
+            "tools": len(self.tools),
+            "hits": self.hits,
+            "compiles": self.compiles,
+            "server_documents": len(self.documents),
+            "server_fetches": self.server_fetches,
+            "server_not_modified": self.server_not_modified,
+        }
+
+
+TOOL_SPECS = ToolSpecRegistry()
+
+
 def get_tools(
     request: Request, tool_ids: list[str], user: UserModel, extra_params: dict
 ) -> dict[str, dict]:
     tools_dict = {}
 
     for tool_id in tool_ids:
-        tool = Tools.get_tool_by_id(tool_id)
+        module, tool = get_tool_module_from_cache(request, tool_id)
         if tool is None:
             if tool_id.startswith("server:"):
                 server_idx = int(tool_id.split(":")[1])
@@ -140,50 +246,24 @@ def get_tools(
             else:
                 continue
         else:
-            module = request.app.state.TOOLS.get(tool_id, None)
-            if module is None:
-                module, _ = load_tool_module_by_id(tool_id)
-                request.app.state.TOOLS[tool_id] = module
-
+            compiled = TOOL_SPECS.get_tool(tool_id, module, tool)
             extra_params["__id__"] = tool_id
 
             # Set valves for the tool
-            if hasattr(module, "valves") and hasattr(module, "Valves"):
-                valves = Tools.get_tool_valves_by_id(tool_id) or {}
-                module.valves = module.Valves(**valves)
+            if compiled.valves is not None:
+                module.valves = compiled.valves
             if hasattr(module, "UserValves"):
                 extra_params["__user__"]["valves"] = module.UserValves(  # type: ignore
                     **Tools.get_user_valves_by_id_and_user_id(tool_id, user.id)
                 )
 
-            for spec in tool.specs:
-                # TODO: Fix hack for OpenAI API
-                # Some times breaks OpenAI but others don't. Leaving the comment
-                for val in spec.get("parameters", {}).get("properties", {}).values():
-                    if val.get("type") == "str":
-                        val["type"] = "string"
-
-                # Remove internal reserved parameters (e.g. __id__, __user__)
-                spec["parameters"]["properties"] = {
-                    key: val
-                    for key, val in spec["parameters"]["properties"].items()
-                    if not key.startswith("__")
-                }
-
+            for spec, tool_function in compiled.functions:
                 # convert to function that takes only model params and inserts custom params
                 function_name = spec["name"]
-                tool_function = getattr(module, function_name)
                 callable = get_async_tool_function_and_apply_extra_params(
                     tool_function, extra_params
                 )
 
-                # TODO: Support Pydantic models as parameters
-                if callable.__doc__ and callable.__doc__.strip() != "":
-                    s = re.split(":(param|return)", callable.__doc__, 1)
-                    spec["description"] = s[0]
-                else:
-                    spec["description"] = function_name
-
                 tool_dict = {
                     "tool_id": tool_id,
                     "callable": callable,
@@ -448,6 +528,11 @@ async def get_tool_server_data(token: str, url: str) -> Dict[str, Any]:
     if token:
         headers["Authorization"] = f"Bearer {token}"
 
+    # Only download and convert the document again when it changed
+    cached = TOOL_SPECS.documents.get(url)
+    if cached is not None:
+        headers["If-None-Match"] = cached[0]
+
     error = None
     try:
         timeout = aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT_TOOL_SERVER_DATA)
@@ -455,6 +540,10 @@ async def get_tool_server_data(token: str, url: str) -> Dict[str, Any]:
             async with session.get(
                 url, headers=headers, ssl=AIOHTTP_CLIENT_SESSION_TOOL_SERVER_SSL
             ) as response:
+                if response.status == 304 and cached is not None:
+                    TOOL_SPECS.server_not_modified += 1
+                    return cached[1]
+
                 if response.status != 200:
                     error_body = await response.json()
                     raise Exception(error_body)
@@ -465,6 +554,7 @@ async def get_tool_server_data(token: str, url: str) -> Dict[str, Any]:
                     res = yaml.safe_load(text_content)
                 else:
                     res = await response.json()
+                etag = response.headers.get("ETag")
     except Exception as err:
         log.exception(f"Could not fetch tool server spec from {url}")
         if isinstance(err, dict) and "detail" in err:
@@ -478,6 +568,11 @@ async def get_tool_server_data(token: str, url: str) -> Dict[str, Any]:
         "info": res.get("info", {}),
         "specs": convert_openapi_to_tool_payload(res),
     }
+    TOOL_SPECS.server_fetches += 1
+    if etag:
+        TOOL_SPECS.documents[url] = (etag, data)
+    else:
+        TOOL_SPECS.documents.pop(url, None)
 
     log.info("Fetched data:", data)
     return data
@@ -550,38 +645,50 @@ async def get_tool_servers_data(
     return results
 
 
+async def refresh_tool_servers(app):
+    connections = app.state.config.TOOL_SERVER_CONNECTIONS
+    servers = {
+        server["idx"]: server for server in await get_tool_servers_data(connections)
+    }
+
+    # Keep the last known specs of servers that could not be reached
+    for server in app.state.TOOL_SERVERS:
+        idx = server["idx"]
+        if (
+            idx not in servers
+            and idx < len(connections)
+            and connections[idx].get("config", {}).get("enable")
+            and connections[idx].get("url") == server["url"]
+        ):
+            servers[idx] = server
+
+    app.state.TOOL_SERVERS = [servers[idx] for idx in sorted(servers)]
+
+
+async def periodic_tool_server_refresh(app):
+    if TOOL_SERVER_REFRESH_INTERVAL <= 0:
+        return
+
+    while True:
+        try:
+            await refresh_tool_servers(app)
+        except Exception as e:
+            log.exception(f"Error refreshing tool servers: {e}")
+        await asyncio.sleep(TOOL_SERVER_REFRESH_INTERVAL)
+
+
 async def execute_tool_server(
     token: str, url: str, name: str, params: Dict[str, Any], server_data: Dict[str, Any]
 ) -> Any:
     error = None
     try:
-        openapi = server_data.get("openapi", {})
-        paths = openapi.get("paths", {})
-
-        matching_route = None
-        for route_path, methods in paths.items():
-            for http_method, operation in methods.items():
-                if isinstance(operation, dict) and operation.get("operationId") == name:
-                    matching_route = (route_path, methods)
-                    break
-            if matching_route:
-                break
-
-        if not matching_route:
+        operation_entry = TOOL_SPECS.get_operation(
+            url, server_data.get("openapi", {}), name
+        )
+        if not operation_entry:
             raise Exception(f"No matching route found for operationId: {name}")
 
-        route_path, methods = matching_route
-
-        method_entry = None
-        for http_method, operation in methods.items():
-            if operation.get("operationId") == name:
-                method_entry = (http_method.lower(), operation)
-                break
-
-        if not method_entry:
-            raise Exception(f"No matching method found for operationId: {name}")
-
-        http_method, operation = method_entry
+        route_path, http_method, operation = operation_entry
 
         path_params = {}
         query_params = {}